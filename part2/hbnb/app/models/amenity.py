@@ -3,6 +3,8 @@
 from .basemodel import BaseModel
 
 class Amenity(BaseModel):
+    __slots__ = ('_name',)
+
     def __init__(self, name):
         super().__init__()
         self.name = name
@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
 """Base model class for all models in the HolbertonBnB application."""
 
+import time
 import uuid
 from datetime import datetime
 from flask import Flask
 
 
+def _now():
+    """Microseconds since the epoch."""
+    return time.time_ns() // 1000
+
+
+def _to_datetime(micros):
+    seconds, micros = divmod(micros, 1000000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros)
+
+
+def _to_micros(value):
+    seconds = int(value.replace(microsecond=0).timestamp())
+    return seconds * 1000000 + value.microsecond
+
+
 class BaseModel:
     """Base class for all models.
 
@@ -13,7 +29,13 @@ class BaseModel:
     - Unique identifier
     - Creation timestamp
     - Last update timestamp
+
+    Models declare __slots__ so that instances carry no __dict__. The id
+    is kept as the 16 bytes of the UUID (binary_id) and the timestamps
+    as microseconds since the epoch; id, created_at and updated_at
+    present them as a string and datetimes.
     """
+    __slots__ = ('binary_id', '_created_at', '_updated_at')
 
     def __init__(self):
         """Initialize a new BaseModel instance.
@@ -23,13 +45,37 @@ class BaseModel:
         - Creation timestamp
         - Last update timestamp (initially same as creation)
         """
-        self.id = str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self.binary_id = uuid.uuid4().bytes
+        self._created_at = self._updated_at = _now()
+
+    @property
+    def id(self):
+        """The UUID as a 36-character string."""
+        return str(uuid.UUID(bytes=self.binary_id))
+
+    @id.setter
+    def id(self, value):
+        self.binary_id = uuid.UUID(value).bytes
+
+    @property
+    def created_at(self):
+        return _to_datetime(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        self._created_at = _to_micros(value)
+
+    @property
+    def updated_at(self):
+        return _to_datetime(self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value):
+        self._updated_at = _to_micros(value)
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified."""
-        self.updated_at = datetime.now()
+        self._updated_at = _now()
 
     def update(self, data):
         """Update the attributes of the object based
@@ -17,6 +17,8 @@ class Place(BaseModel):
         reviews (list): List of Review objects for this place
         amenities (list): List of Amenity objects for this place
     """
+    __slots__ = ('_title', 'description', '_price', '_latitude', '_longitude',
+                 'owner', 'reviews', 'amenities')
 
     def __init__(self, title, description, price, latitude, longitude, owner):
         """Initialize a new Place.
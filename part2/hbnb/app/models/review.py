@@ -13,6 +13,7 @@ class Review(BaseModel):
         place (Place): Place being reviewed
         user (User): User who wrote the review
     """
+    __slots__ = ('_text', '_rating', '_place', '_user')
 
     def __init__(self, text, rating, place, user):
         """Initialize a new Review.
@@ -3,6 +3,8 @@
 from .basemodel import BaseModel
 
 class User(BaseModel):
+    __slots__ = ('_first_name', '_last_name', '_email', 'is_admin', 'places')
+
     def __init__(self, first_name, last_name, email, is_admin=False):
         super().__init__()
         self.first_name = first_name
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Durable persistence for the in-memory repositories.
+
+A Journal is a directory shared by the JournaledRepository instances of
+an application:
+
+    snapshot      - every object at the time of the last compaction
+    wal.<number>  - write-ahead log segments, one per compaction
+
+Every add, update and delete appends the full state of the object to
+the current segment as a binary frame (length, CRC32, pickle). Frames
+are queued under the repository's lock, which fixes their order, and
+made durable after it is released: the first writer waiting for its
+frame writes and fsyncs every queued frame at once, so concurrent
+writers share one fsync (group commit).
+
+Objects reference each other across repositories (a place's owner, a
+review's user); a reference is stored as the key of the object (the
+`key` attribute given to the Journal), so each record stays small and
+the graph is rebuilt on load, cycles included.
+
+The state of an object is the tuple of its slot values in a fixed
+order per class, followed by its __dict__ if it has one. Loading
+assigns the values through the slot descriptors of the class, looked
+up once per class rather than once per attribute.
+
+On open the snapshot is loaded and the segments written since are
+replayed; a torn frame left by a crash ends the replay. When the
+current segment exceeds `compact_bytes`, a background thread starts a
+new segment and writes every object to a new snapshot, then removes
+the older segments. The snapshot is fuzzy (objects may change while it
+is written), which is harmless since records hold full states and
+every change made after the new segment started is replayed on top.
+"""
+
+import gc
+import io
+import os
+import pickle
+import struct
+import threading
+import zlib
+from operator import attrgetter
+from app.persistence.repository import (ConcurrentInMemoryRepository,
+                                        _Snapshot)
+
+_FRAME = struct.Struct('<II')
+_PUT, _DELETE = 0, 1
+
+
+class _Unset:
+    """Value recorded for a slot that is not set."""
+
+    def __reduce__(self):
+        return '_UNSET'
+
+
+_UNSET = _Unset()
+
+
+class _Layout:
+    """The slots of a class, in the order their values are stored."""
+
+    def __init__(self, cls):
+        slots = [(name, klass.__dict__[name])
+                 for klass in reversed(cls.__mro__)
+                 for name in _slot_names(klass)
+                 if name not in ('__dict__', '__weakref__')]
+        self.names = tuple(name for name, _ in slots)
+        self.setters = tuple(descriptor.__set__ for _, descriptor in slots)
+        self.has_dict = bool(cls.__dictoffset__)
+        getter = attrgetter(*self.names) if self.names else lambda obj: ()
+        self._get = (getter if len(self.names) != 1
+                     else lambda obj: (getter(obj),))
+
+    def state(self, obj):
+        try:
+            values = self._get(obj)
+        except AttributeError:
+            values = tuple(getattr(obj, name, _UNSET) for name in self.names)
+        if self.has_dict:
+            values += (dict(vars(obj)),)
+        return values
+
+    def restore(self, obj, state):
+        for setter, value in zip(self.setters, state):
+            if value is not _UNSET:
+                setter(obj, value)
+        if self.has_dict:
+            obj.__dict__.update(state[-1])
+
+
+def _slot_names(klass):
+    slots = klass.__dict__.get('__slots__', ())
+    return (slots,) if isinstance(slots, str) else slots
+
+
+_LAYOUTS = {}
+
+
+def _layout(cls):
+    layout = _LAYOUTS.get(cls)
+    if layout is None:
+        layout = _LAYOUTS[cls] = _Layout(cls)
+    return layout
+
+
+class _Pickler(pickle.Pickler):
+    """Pickle an object's state, storing other entities by id."""
+
+    def __init__(self, file, entity_type, key):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._entity_type = entity_type
+        self._key = key
+
+    def persistent_id(self, obj):
+        if isinstance(obj, self._entity_type):
+            return type(obj), self._key(obj)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    """Resolve entity references to the objects being loaded."""
+
+    def __init__(self, file, objects):
+        super().__init__(file)
+        self._objects = objects
+
+    def persistent_load(self, pid):
+        cls, key = pid
+        obj = self._objects.get(key)
+        if obj is None:
+            # Referenced before its own record: filled in when it comes
+            obj = self._objects[key] = cls.__new__(cls)
+        return obj
+
+
+class Journal:
+    """Snapshot and write-ahead log of a set of repositories."""
+
+    SNAPSHOT_BATCH = 10000
+
+    def __init__(self, directory, entity_type, key='id', fsync=True,
+                 compact_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Where the snapshot and the segments live
+            entity_type (type): Base class of the stored objects;
+                attributes holding one are stored as references
+            key (str): Attribute identifying an object across the
+                repositories, written in records and references
+            fsync (bool): Wait for the disk on each commit
+            compact_bytes (int): Segment size starting a compaction
+        """
+        self.directory = directory
+        self.entity_type = entity_type
+        self.key = attrgetter(key)
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._repositories = {}
+        self._cond = threading.Condition()
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._error = None
+        self._file = None
+        self._segment = 0
+        self._compacting = threading.Lock()
+        self._compactor = None
+
+    def register(self, name, repository):
+        if self._file is not None:
+            raise RuntimeError("Repositories must be registered before open")
+        self._repositories[name] = repository
+
+    # Loading
+
+    def _segments(self):
+        numbers = [int(name[4:]) for name in os.listdir(self.directory)
+                   if name.startswith('wal.') and name[4:].isdigit()]
+        return sorted(numbers)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_snapshot(self, objects, members):
+        try:
+            file = open(self._path('snapshot'), 'rb')
+        except FileNotFoundError:
+            return 0
+        with file:
+            unpickler = _Unpickler(file, objects)
+            segment = unpickler.load()
+            while True:
+                try:
+                    batch = unpickler.load()
+                except EOFError:
+                    return segment
+                for name, cls, keys, states in batch:
+                    restore = _layout(cls).restore
+                    stored = members[name]
+                    for key, state in zip(keys, states):
+                        obj = objects.get(key)
+                        if obj is None:
+                            obj = objects[key] = cls.__new__(cls)
+                        restore(obj, state)
+                        stored[key] = obj
+
+    @staticmethod
+    def _apply(objects, members, op, name, cls, key, state):
+        if op == _DELETE:
+            members[name].pop(key, None)
+            return
+        obj = objects.get(key)
+        if obj is None:
+            obj = objects[key] = cls.__new__(cls)
+        _layout(cls).restore(obj, state)
+        members[name][key] = obj
+
+    def _replay(self, number, objects, members):
+        """Apply the frames of a segment; return the end of the valid ones."""
+        with open(self._path('wal.{:06d}'.format(number)), 'rb') as file:
+            data = file.read()
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, offset)
+            start = offset + _FRAME.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            record = _Unpickler(io.BytesIO(payload), objects).load()
+            self._apply(objects, members, *record)
+            offset = start + length
+        return offset
+
+    def open(self):
+        """Load the repositories from disk and start logging."""
+        os.makedirs(self.directory, exist_ok=True)
+        objects = {}
+        members = {name: {} for name in self._repositories}
+        # The collector would rescan the growing heap many times over
+        # while millions of objects are created; they all stay alive
+        collect = gc.isenabled()
+        gc.disable()
+        try:
+            first = self._load_snapshot(objects, members)
+            segments = [number for number in self._segments()
+                        if number >= first]
+            for number in segments:
+                end = self._replay(number, objects, members)
+                if number == segments[-1]:
+                    # Drop a torn frame so that new frames follow valid ones
+                    os.truncate(self._path('wal.{:06d}'.format(number)), end)
+            for name, repository in self._repositories.items():
+                repository._load(members[name].values())
+        finally:
+            if collect:
+                gc.enable()
+        self._segment = max(segments, default=first)
+        self._file = open(self._path('wal.{:06d}'.format(self._segment)), 'ab')
+
+    # Logging
+
+    def _encode(self, record):
+        buffer = io.BytesIO()
+        _Pickler(buffer, self.entity_type, self.key).dump(record)
+        payload = buffer.getvalue()
+        return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def put(self, name, obj):
+        """Queue the state of an object; return a ticket for commit."""
+        cls = type(obj)
+        return self._queue(self._encode(
+            (_PUT, name, cls, self.key(obj), _layout(cls).state(obj))))
+
+    def delete(self, name, obj):
+        """Queue the deletion of an object; return a ticket for commit."""
+        return self._queue(self._encode(
+            (_DELETE, name, None, self.key(obj), None)))
+
+    def _queue(self, frame):
+        with self._cond:
+            if self._file is None:
+                raise RuntimeError("The journal is not open")
+            self._pending.append(frame)
+            self._appended += 1
+            return self._appended
+
+    def _write(self, frames):
+        self._file.write(b''.join(frames))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def commit(self, ticket):
+        """Return once the frame of `ticket` and all before it are durable."""
+        with self._cond:
+            while self._durable < ticket:
+                if self._error is not None:
+                    raise self._error
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                frames, self._pending = self._pending, []
+                last = self._appended
+                self._flushing = True
+                self._cond.release()
+                try:
+                    self._write(frames)
+                except OSError as error:
+                    self._error = error
+                    raise
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._cond.notify_all()
+                self._durable = last
+            size = self._file.tell()
+        if size >= self.compact_bytes:
+            self._compact_in_background()
+
+    def _flush_locked(self):
+        """Write the queued frames while holding the condition."""
+        while self._flushing:
+            self._cond.wait()
+        if self._pending:
+            self._write(self._pending)
+            self._pending = []
+            self._durable = self._appended
+
+    # Compaction
+
+    def _compact_in_background(self):
+        with self._cond:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact,
+                                               daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Write a new snapshot and remove the segments it covers."""
+        with self._compacting:
+            with self._cond:
+                self._flush_locked()
+                self._file.close()
+                self._segment += 1
+                segment = self._segment
+                self._file = open(
+                    self._path('wal.{:06d}'.format(segment)), 'ab')
+                views = [(name, repository._storage)
+                         for name, repository in self._repositories.items()]
+            self._write_snapshot(segment, views)
+            for number in self._segments():
+                if number < segment:
+                    os.remove(self._path('wal.{:06d}'.format(number)))
+
+    def _write_snapshot(self, segment, views):
+        path = self._path('snapshot.tmp')
+        with open(path, 'wb') as file:
+            pickler = _Pickler(file, self.entity_type, self.key)
+            pickler.dump(segment)
+            # Batches of (name, class, keys, states): objects of one
+            # class in a row share the class and its layout
+            batch, size, group = [], 0, None
+            for name, storage in views:
+                for obj in storage.values():
+                    cls = type(obj)
+                    if group is None or group[:2] != (name, cls):
+                        group = (name, cls, [], [])
+                        batch.append(group)
+                    group[2].append(self.key(obj))
+                    group[3].append(_layout(cls).state(obj))
+                    size += 1
+                    if size >= self.SNAPSHOT_BATCH:
+                        pickler.dump(batch)
+                        pickler.clear_memo()
+                        batch, size, group = [], 0, None
+            if batch:
+                pickler.dump(batch)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path, self._path('snapshot'))
+
+    def close(self):
+        """Flush the queued frames, wait for compaction, close the log."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._cond:
+            if self._file is not None:
+                self._flush_locked()
+                self._file.close()
+                self._file = None
+
+
+class JournaledRepository(ConcurrentInMemoryRepository):
+    """ConcurrentInMemoryRepository whose writes go to a Journal.
+
+    add, update, delete and reindex return once the change is durable.
+    Code changing a stored object directly must call reindex(obj_id),
+    which also logs the object's new state.
+    """
+    def __init__(self, journal, name, unique=(), indexes=(), ranges=(),
+                 binary_ids=False):
+        super().__init__(unique, indexes, ranges, binary_ids)
+        self._journal = journal
+        self._name = name
+        journal.register(name, self)
+
+    def _load(self, objects):
+        """Replace the content with objects loaded from the journal."""
+        objects = list(objects)
+        self._storage = _Snapshot.build(
+            (self._key_of(obj), obj) for obj in objects)
+        if self._indexed:
+            for obj in objects:
+                self._index(self._key_of(obj), self._values(obj))
+
+    def add(self, obj):
+        with self._lock:
+            super().add(obj)
+            ticket = self._journal.put(self._name, obj)
+        self._journal.commit(ticket)
+
+    def update(self, obj_id, data):
+        with self._lock:
+            obj = self.get(obj_id)
+            if obj is None:
+                return None
+            try:
+                super().update(obj_id, data)
+            finally:
+                # Logged even on a validation error: obj.update may have
+                # changed some attributes before raising
+                ticket = self._journal.put(self._name, obj)
+        self._journal.commit(ticket)
+        return obj
+
+    def delete(self, obj_id):
+        with self._lock:
+            obj = self.get(obj_id)
+            if obj is None:
+                return
+            super().delete(obj_id)
+            ticket = self._journal.delete(self._name, obj)
+        self._journal.commit(ticket)
+
+    def reindex(self, obj_id):
+        with self._lock:
+            self._reindex(self._key(obj_id))
+            obj = self.get(obj_id)
+            if obj is None:
+                return
+            ticket = self._journal.put(self._name, obj)
+        self._journal.commit(ticket)
@@ -1,4 +1,10 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from collections.abc import Mapping, ValuesView
+from operator import attrgetter
+import threading
+import uuid
 
 class Repository(ABC):
     @abstractmethod
@@ -26,28 +32,421 @@ class Repository(ABC):
         pass
 
 
-class InMemoryRepository(Repository):
+class Range(namedtuple('Range', 'low high')):
+    """Inclusive bounds for find_by; None leaves a side open."""
+
+    def __contains__(self, value):
+        return (value is not None
+                and (self.low is None or value >= self.low)
+                and (self.high is None or value <= self.high))
+
+
+def _uuid_bytes(obj_id):
+    """The 16 bytes of a UUID string, or None if it is not one."""
+    try:
+        return uuid.UUID(obj_id).bytes
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _same(obj_id):
+    return obj_id
+
+
+class _Above:
+    """Sorts after any id, so (value, _ABOVE) bounds the pairs of a value."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_ABOVE = _Above()
+
+
+class _RangeIndex:
+    """(value, id) pairs of one attribute, kept sorted for range queries.
+
+    The pairs live in sorted buckets of at most 2 * LOAD items, so an
+    insertion or removal only shifts one bucket instead of the whole
+    list, which stays cheap at millions of objects.
+    """
+    LOAD = 1000
+
     def __init__(self):
+        self._buckets = []
+        self._maxes = []
+
+    def add(self, value, obj_id):
+        pair = (value, obj_id)
+        if not self._buckets:
+            self._buckets.append([pair])
+            self._maxes.append(pair)
+            return
+        position = bisect_left(self._maxes, pair)
+        if position == len(self._maxes):
+            position -= 1
+            bucket = self._buckets[position]
+            bucket.append(pair)
+            self._maxes[position] = pair
+        else:
+            bucket = self._buckets[position]
+            insort(bucket, pair)
+        if len(bucket) > 2 * self.LOAD:
+            half = bucket[self.LOAD:]
+            del bucket[self.LOAD:]
+            self._buckets.insert(position + 1, half)
+            self._maxes[position] = bucket[-1]
+            self._maxes.insert(position + 1, half[-1])
+
+    def remove(self, value, obj_id):
+        pair = (value, obj_id)
+        position = bisect_left(self._maxes, pair)
+        bucket = self._buckets[position]
+        del bucket[bisect_left(bucket, pair)]
+        if not bucket:
+            del self._buckets[position]
+            del self._maxes[position]
+        else:
+            self._maxes[position] = bucket[-1]
+
+    def select(self, low, high):
+        """(count, function returning the ids) of the values in [low, high]."""
+        buckets = self._buckets
+        if low is None:
+            first, start = 0, 0
+        else:
+            first = bisect_left(self._maxes, (low,))
+            start = (bisect_left(buckets[first], (low,))
+                     if first < len(buckets) else 0)
+        if high is None:
+            last = len(buckets) - 1
+            stop = len(buckets[last]) if buckets else 0
+        else:
+            last = min(bisect_right(self._maxes, (high, _ABOVE)),
+                       len(buckets) - 1)
+            stop = (bisect_right(buckets[last], (high, _ABOVE))
+                    if buckets else 0)
+        if first > last or (first == last and start >= stop):
+            return 0, lambda: []
+        count = (sum(map(len, buckets[first:last])) - start + stop)
+
+        def ids():
+            for position in range(first, last + 1):
+                bucket = buckets[position]
+                begin = start if position == first else 0
+                end = stop if position == last else len(bucket)
+                for _, obj_id in bucket[begin:end]:
+                    yield obj_id
+        return count, ids
+
+
+class InMemoryRepository(Repository):
+    """Repository keeping the objects in a dict keyed by id.
+
+    Attributes can be indexed so that lookups do not scan every object:
+        unique  - value -> object, adding a second object with the same
+                  value raises ValueError (e.g. users' email)
+        indexes - value -> objects having it
+        ranges  - values kept sorted for Range queries (e.g. price)
+    Indexes follow add, update and delete; code changing an indexed
+    attribute of a stored object directly must call reindex(obj_id).
+    None values are not indexed.
+
+    With binary_ids the objects are stored under their binary_id, the
+    16 bytes of their UUID, instead of the 36-character id string; ids
+    passed to get, update and delete are still strings.
+    """
+    def __init__(self, unique=(), indexes=(), ranges=(), binary_ids=False):
+        self._key_of = attrgetter('binary_id' if binary_ids else 'id')
+        self._key = _uuid_bytes if binary_ids else _same
         self._storage = {}
+        self._unique = {name: {} for name in unique}
+        self._indexes = {name: {} for name in indexes}
+        self._ranges = {name: _RangeIndex() for name in ranges}
+        self._indexed = tuple(dict.fromkeys((*unique, *indexes, *ranges)))
+        # id -> values of the indexed attributes when last indexed
+        self._keys = {}
+
+    def _values(self, obj):
+        return tuple([getattr(obj, name, None) for name in self._indexed])
+
+    def _check_unique(self, obj_id, pairs):
+        """Raise ValueError if a (name, value) pair is another object's."""
+        for name, value in pairs:
+            index = self._unique.get(name)
+            if (index is not None and value is not None
+                    and index.get(value, obj_id) != obj_id):
+                raise ValueError("{} {} is already used".format(name, value))
+
+    def _index(self, obj_id, keys):
+        for name, value in zip(self._indexed, keys):
+            if value is None:
+                continue
+            if name in self._unique:
+                self._unique[name][value] = obj_id
+            if name in self._indexes:
+                self._indexes[name].setdefault(value, {})[obj_id] = None
+            if name in self._ranges:
+                self._ranges[name].add(value, obj_id)
+        self._keys[obj_id] = keys
+
+    def _unindex(self, obj_id):
+        for name, value in zip(self._indexed, self._keys.pop(obj_id)):
+            if value is None:
+                continue
+            if name in self._unique:
+                del self._unique[name][value]
+            if name in self._indexes:
+                ids = self._indexes[name][value]
+                del ids[obj_id]
+                if not ids:
+                    del self._indexes[name][value]
+            if name in self._ranges:
+                self._ranges[name].remove(value, obj_id)
+
+    def reindex(self, obj_id):
+        """Bring the indexes up to date after an object changed in place."""
+        self._reindex(self._key(obj_id))
+
+    def _reindex(self, key):
+        obj = self._storage.get(key)
+        if obj is None or not self._indexed:
+            return
+        keys = self._values(obj)
+        if keys != self._keys[key]:
+            self._check_unique(key, zip(self._indexed, keys))
+            self._unindex(key)
+            self._index(key, keys)
 
     def add(self, obj):
-        self._storage[obj.id] = obj
+        if self._indexed:
+            key = self._key_of(obj)
+            keys = self._values(obj)
+            self._check_unique(key, zip(self._indexed, keys))
+            if key in self._keys:
+                self._unindex(key)
+            self._index(key, keys)
+        self._store(obj)
+
+    def _store(self, obj):
+        self._storage[self._key_of(obj)] = obj
+
+    def _discard(self, key):
+        del self._storage[key]
 
     def get(self, obj_id):
-        return self._storage.get(obj_id)
+        return self._storage.get(self._key(obj_id))
 
     def get_all(self):
         return list(self._storage.values())
 
     def update(self, obj_id, data):
-        obj = self.get(obj_id)
+        key = self._key(obj_id)
+        obj = self._storage.get(key)
         if obj:
-            obj.update(data)
+            self._check_unique(key, data.items())
+            try:
+                obj.update(data)
+            finally:
+                self._reindex(key)
         return obj
 
     def delete(self, obj_id):
-        if obj_id in self._storage:
-            del self._storage[obj_id]
+        key = self._key(obj_id)
+        if key in self._storage:
+            if self._indexed:
+                self._unindex(key)
+            self._discard(key)
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next((obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value), None)
\ No newline at end of file
+        return next(self._find({attr_name: attr_value}), None)
+
+    def find_by(self, **criteria):
+        """Return the objects matching every criterion.
+
+        A criterion is attr=value, or attr=Range(low, high) for values
+        within inclusive bounds. The candidates come from the most
+        selective index available, the other criteria are checked on
+        them; without a usable index every object is scanned.
+        """
+        return list(self._find(criteria))
+
+    def _lookup(self, name, value):
+        """(candidate count, function returning their ids), or None."""
+        if isinstance(value, Range):
+            if name not in self._ranges:
+                return None
+            return self._ranges[name].select(value.low, value.high)
+        if name in self._unique:
+            obj_id = self._unique[name].get(value)
+            ids = () if obj_id is None else (obj_id,)
+            return len(ids), lambda: ids
+        if name in self._indexes:
+            ids = self._indexes[name].get(value, {})
+            return len(ids), lambda: ids
+        return None
+
+    def _candidates(self, criteria):
+        """Objects from the most selective index, or None to scan."""
+        lookups = [lookup for lookup in
+                   (self._lookup(name, value)
+                    for name, value in criteria.items())
+                   if lookup is not None]
+        if not lookups:
+            return None
+        _, ids = min(lookups, key=lambda lookup: lookup[0])
+        return [self._storage[obj_id] for obj_id in ids()]
+
+    def _find(self, criteria):
+        candidates = self._candidates(criteria)
+        if candidates is None:
+            candidates = self._storage.values()
+        for obj in candidates:
+            if all(getattr(obj, name) in value if isinstance(value, Range)
+                   else getattr(obj, name) == value
+                   for name, value in criteria.items()):
+                yield obj
+
+
+def _replace(items, position, value):
+    """Copy of a tuple with items[position] set, or value appended."""
+    return items[:position] + (value,) + items[position + 1:]
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for chunk in self._mapping._chunks:
+            yield from chunk.values()
+
+
+class _Snapshot(Mapping):
+    """Immutable id -> object mapping that is cheap to derive.
+
+    Objects sit in chunks of at most CHUNK entries, in insertion order,
+    and a locator sharded by hash maps each id to its chunk. set() and
+    remove() return a new snapshot that copies one chunk and one locator
+    shard, O(CHUNK + n / SHARDS), and shares everything else with the
+    old one, which stays valid for whoever still holds it.
+    """
+    CHUNK = 4096
+    SHARDS = 256
+    __slots__ = ('_chunks', '_locator', '_len')
+
+    def __init__(self, chunks=(), locator=None, length=0):
+        self._chunks = chunks
+        if locator is None:
+            locator = tuple({} for _ in range(self.SHARDS))
+        self._locator = locator
+        self._len = length
+
+    @classmethod
+    def build(cls, items):
+        """Snapshot of (key, value) pairs with distinct keys, in one pass."""
+        chunks, locator = [], tuple({} for _ in range(cls.SHARDS))
+        for key, value in items:
+            if not chunks or len(chunks[-1]) >= cls.CHUNK:
+                chunks.append({})
+            locator[hash(key) % cls.SHARDS][key] = len(chunks) - 1
+            chunks[-1][key] = value
+        return cls(tuple(chunks), locator, sum(map(len, chunks)))
+
+    def _shard(self, key):
+        return hash(key) % len(self._locator)
+
+    def __getitem__(self, key):
+        return self._chunks[self._locator[self._shard(key)][key]][key]
+
+    def get(self, key, default=None):
+        chunk = self._locator[self._shard(key)].get(key)
+        return default if chunk is None else self._chunks[chunk][key]
+
+    def __contains__(self, key):
+        return key in self._locator[self._shard(key)]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __len__(self):
+        return self._len
+
+    def values(self):
+        return _Values(self)
+
+    def set(self, key, value):
+        locator, length = self._locator, self._len
+        shard = self._shard(key)
+        chunk = locator[shard].get(key)
+        if chunk is None:
+            chunk = len(self._chunks) - 1
+            if chunk < 0 or len(self._chunks[chunk]) >= self.CHUNK:
+                chunk += 1
+            ids = dict(locator[shard])
+            ids[key] = chunk
+            locator = _replace(locator, shard, ids)
+            length += 1
+        data = dict(self._chunks[chunk]) if chunk < len(self._chunks) else {}
+        data[key] = value
+        return _Snapshot(_replace(self._chunks, chunk, data), locator, length)
+
+    def remove(self, key):
+        shard = self._shard(key)
+        ids = dict(self._locator[shard])
+        chunk = ids.pop(key)
+        data = dict(self._chunks[chunk])
+        del data[key]
+        return _Snapshot(_replace(self._chunks, chunk, data),
+                         _replace(self._locator, shard, ids), self._len - 1)
+
+
+class ConcurrentInMemoryRepository(InMemoryRepository):
+    """InMemoryRepository safe to share between the threads of a server.
+
+    The objects live in an immutable _Snapshot. Readers (get, get_all,
+    scans) use whichever snapshot is current without locking; writers
+    serialise on a lock, derive a new snapshot and publish it with one
+    attribute assignment, so a reader never sees a half-applied write
+    and never iterates a dict being resized. get_all returns a view of
+    the current snapshot instead of copying it into a list; the view
+    does not change when the repository does.
+
+    Index lookups (find_by, get_by_attribute on an indexed attribute)
+    read the indexes under the lock. Objects are shared between
+    snapshots: an update changes them in place for every reader.
+    """
+    def __init__(self, unique=(), indexes=(), ranges=(), binary_ids=False):
+        super().__init__(unique, indexes, ranges, binary_ids)
+        self._storage = _Snapshot()
+        self._lock = threading.RLock()
+
+    def _store(self, obj):
+        self._storage = self._storage.set(self._key_of(obj), obj)
+
+    def _discard(self, key):
+        self._storage = self._storage.remove(key)
+
+    def add(self, obj):
+        with self._lock:
+            super().add(obj)
+
+    def get_all(self):
+        return self._storage.values()
+
+    def update(self, obj_id, data):
+        with self._lock:
+            return super().update(obj_id, data)
+
+    def delete(self, obj_id):
+        with self._lock:
+            super().delete(obj_id)
+
+    def reindex(self, obj_id):
+        with self._lock:
+            super().reindex(obj_id)
+
+    def _candidates(self, criteria):
+        with self._lock:
+            return super()._candidates(criteria)
@@ -1,3 +1,5 @@
+import os
 from app.services.facade import HBnBFacade
 
-facade = HBnBFacade()
\ No newline at end of file
+# Set HBNB_DATA_DIR to keep the data on disk across restarts
+facade = HBnBFacade(os.getenv('HBNB_DATA_DIR'))
\ No newline at end of file
@@ -1,17 +1,36 @@
 #!/usr/bin/env python3
 
-from app.persistence.repository import InMemoryRepository
+from app.persistence.journal import Journal, JournaledRepository
+from app.persistence.repository import ConcurrentInMemoryRepository, Range
+from app.models.basemodel import BaseModel
 from app.models.place import Place
 from app.models.user import User
 from app.models.amenity import Amenity
 import uuid
 
 class HBnBFacade:
-    def __init__(self):
-        self.user_repo = InMemoryRepository()
-        self.place_repo = InMemoryRepository()
-        self.review_repo = InMemoryRepository()
-        self.amenity_repo = InMemoryRepository()
+    def __init__(self, data_dir=None, **journal_options):
+        """Create the repositories, persisted in data_dir if given.
+
+        journal_options are passed to the Journal (fsync, compact_bytes).
+        """
+        self.journal = None
+        if data_dir:
+            self.journal = Journal(data_dir, BaseModel, key='binary_id',
+                                   **journal_options)
+            def repository(name, **indexes):
+                return JournaledRepository(self.journal, name, **indexes)
+        else:
+            def repository(name, **indexes):
+                return ConcurrentInMemoryRepository(**indexes)
+        self.user_repo = repository('users', unique=('email',),
+                                    binary_ids=True)
+        self.place_repo = repository('places', ranges=('price',),
+                                     binary_ids=True)
+        self.review_repo = repository('reviews', binary_ids=True)
+        self.amenity_repo = repository('amenities', binary_ids=True)
+        if self.journal is not None:
+            self.journal.open()
 
     def create_user(self, user_data):
         user = User(**user_data)
@@ -28,11 +47,7 @@ class HBnBFacade:
         return self.user_repo.get_all()
     
     def put_user(self, user_id, data):
-        user = self.user_repo.get(user_id)
-        if not user:
-            return None
-        user.update(data)
-        return user
+        return self.user_repo.update(user_id, data)
    
     def get_all_user(self):
         return self.user_repo.get_all()
@@ -51,11 +66,7 @@ class HBnBFacade:
         return self.amenity_repo.get_all()
 
     def update_amenity(self, amenity_id, amenity_data):
-        amenity = self.amenity_repo.get(amenity_id)
-        if amenity is None:
-            return None
-        amenity.update(amenity_data)
-        return amenity
+        return self.amenity_repo.update(amenity_id, amenity_data)
 
     
     def create_place(self, place_data):
@@ -95,6 +106,7 @@ class HBnBFacade:
 
         self.place_repo.add(new_place)
         owner.add_place(new_place)
+        self.user_repo.reindex(owner.id)
         return new_place
 
     def get_place(self, place_id):
@@ -106,6 +118,10 @@ class HBnBFacade:
     def get_all_places(self):
         return self.place_repo.get_all()
 
+    def get_places_by_price(self, min_price=None, max_price=None):
+        """Retrieve the places priced within the bounds, cheapest first"""
+        return self.place_repo.find_by(price=Range(min_price, max_price))
+
     def update_place(self, place_id, place_data):
         """Update a place with the given data"""
         place = self.get_place(place_id)
@@ -113,26 +129,27 @@ class HBnBFacade:
             raise ValueError("Place with id {} does not exist.".format(place_id))
     
         updatable_attrs = ['title', 'description', 'price', 'latitude', 'longitude']
-        for attr in updatable_attrs:
-            if attr in place_data and place_data[attr] is not None:
-                setattr(place, attr, place_data[attr])
+        self.place_repo.update(place_id, {attr: place_data[attr] for attr in updatable_attrs
+                                          if place_data.get(attr) is not None})
     
         if 'amenities' in place_data:
             place.amenities = []
-        
-            for amenity_item in place_data['amenities']:
-                if isinstance(amenity_item, dict):
-                    amenity_id = amenity_item.get('id')
-                elif isinstance(amenity_item, str):
-                    amenity_id = amenity_item
-                else:
-                    continue
-                
-                if amenity_id:
-                    amenity = self.amenity_repo.get(amenity_id)
-                    if amenity is None:
-                        raise ValueError("Amenity with id {} does not exist.".format(amenity_id))
-                    place.add_amenity(amenity)
+            try:
+                for amenity_item in place_data['amenities']:
+                    if isinstance(amenity_item, dict):
+                        amenity_id = amenity_item.get('id')
+                    elif isinstance(amenity_item, str):
+                        amenity_id = amenity_item
+                    else:
+                        continue
+
+                    if amenity_id:
+                        amenity = self.amenity_repo.get(amenity_id)
+                        if amenity is None:
+                            raise ValueError("Amenity with id {} does not exist.".format(amenity_id))
+                        place.add_amenity(amenity)
+            finally:
+                self.place_repo.reindex(place_id)
     
         return place
     
@@ -166,6 +183,7 @@ class HBnBFacade:
         self.review_repo.add(new_review)
     
         place.add_review(new_review)
+        self.place_repo.reindex(place.id)
     
         return new_review
 
@@ -190,15 +208,18 @@ class HBnBFacade:
     def update_review(self, review_id, review_data):
         """Update a review"""
         review = self.get_review(review_id)
-    
-        if 'text' in review_data:
-            review.text = review_data['text']
-    
-        if 'rating' in review_data:
-            rating = review_data['rating']
-            if not isinstance(rating, int) or not (1 <= rating <= 5):
-                raise ValueError("Rating must be an integer between 1 and 5")
-            review.rating = rating
+
+        try:
+            if 'text' in review_data:
+                review.text = review_data['text']
+
+            if 'rating' in review_data:
+                rating = review_data['rating']
+                if not isinstance(rating, int) or not (1 <= rating <= 5):
+                    raise ValueError("Rating must be an integer between 1 and 5")
+                review.rating = rating
+        finally:
+            self.review_repo.reindex(review_id)
     
         return review
 
@@ -209,6 +230,7 @@ class HBnBFacade:
         if hasattr(review, 'place') and review.place:
             if review in review.place.reviews:
                 review.place.reviews.remove(review)
+                self.place_repo.reindex(review.place.id)
     
         self.review_repo.delete(review_id)
     
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import pytest
+import uuid
+from datetime import datetime
 from app.models.amenity import Amenity
 from app import create_app
 
@@ -36,6 +38,18 @@ def test_amenity_to_dict():
     assert "created_at" in d
     assert "updated_at" in d
 
+def test_amenity_compact_representation():
+    amenity = Amenity(name="Wi-Fi")
+    assert not hasattr(amenity, "__dict__")
+    assert len(amenity.binary_id) == 16
+    assert str(uuid.UUID(bytes=amenity.binary_id)) == amenity.id
+    assert amenity.created_at == amenity.updated_at
+    created = datetime(2024, 5, 17, 10, 30, 15, 123456)
+    amenity.created_at = created
+    assert amenity.created_at == created
+    with pytest.raises(AttributeError):
+        amenity.nickname = "wifi"
+
 def test_amenity_multiple_setter():
     amenity = Amenity(name="Piscine")
     amenity.name = "Barbecue"
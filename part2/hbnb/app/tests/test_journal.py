@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests for the Journal persistence of the repositories."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from app.services.facade import HBnBFacade
+
+
+class TestJournal(unittest.TestCase):
+    """Test cases for restoring the facade from its data directory."""
+
+    def setUp(self):
+        """Open a facade on an empty data directory."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.facade = self.reopen()
+        self.user = self.facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com"
+        })
+        self.wifi = self.facade.create_amenity({"name": "Wifi"})
+        self.place = self.facade.create_place({
+            "title": "Cozy Apartment", "price": 100, "latitude": 10,
+            "longitude": 20, "owner_id": self.user.id,
+            "amenities": [self.wifi.id]
+        })
+        self.review = self.facade.create_review({
+            "text": "Great place to stay!", "rating": 4,
+            "user_id": self.user.id, "place_id": self.place.id
+        })
+
+    def reopen(self, **options):
+        facade = getattr(self, 'facade', None)
+        if facade is not None:
+            facade.journal.close()
+        self.facade = HBnBFacade(self.directory, fsync=False, **options)
+        self.addCleanup(self.facade.journal.close)
+        return self.facade
+
+    def assertRestored(self, facade):
+        user = facade.get_user(self.user.id)
+        place = facade.get_place(self.place.id)
+        self.assertEqual(user.email, "alice.smith@example.com")
+        self.assertIs(place.owner, user)
+        self.assertEqual(user.places, [place])
+        self.assertEqual(place.amenities,
+                         [facade.get_amenity(self.wifi.id)])
+        review = facade.get_review(self.review.id)
+        self.assertEqual(place.reviews, [review])
+        self.assertIs(review.user, user)
+        self.assertEqual(review.created_at, self.review.created_at)
+
+    def test_restore(self):
+        """Objects and the references between them survive a restart."""
+        self.assertRestored(self.reopen())
+
+    def test_updates_and_deletes(self):
+        """Changes are replayed, indexes are rebuilt."""
+        self.facade.put_user(self.user.id, {"email": "alice@example.com"})
+        self.facade.update_review(self.review.id, {"rating": 2})
+        self.facade.update_place(self.place.id, {"price": 80,
+                                                 "amenities": []})
+        self.facade.delete_review(self.review.id)
+        facade = self.reopen()
+        user = facade.get_user_by_email("alice@example.com")
+        self.assertEqual(user.id, self.user.id)
+        place = facade.get_place(self.place.id)
+        self.assertEqual((place.price, place.amenities, place.reviews),
+                         (80.0, [], []))
+        self.assertEqual(facade.get_places_by_price(max_price=90), [place])
+        self.assertEqual(list(facade.get_all_reviews()), [])
+
+    def test_compaction(self):
+        """A snapshot replaces the segments written before it."""
+        self.facade.journal.compact()
+        self.facade.create_amenity({"name": "Pool"})
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(files, ['snapshot', 'wal.000001'])
+        facade = self.reopen()
+        self.assertRestored(facade)
+        self.assertEqual(len(facade.get_all_amenities()), 2)
+
+    def test_background_compaction(self):
+        """Compaction starts on its own past compact_bytes."""
+        facade = self.reopen(compact_bytes=1)
+        facade.create_amenity({"name": "Pool"})
+        facade.journal.close()
+        self.assertIn('snapshot', os.listdir(self.directory))
+        self.assertRestored(self.reopen())
+
+    def test_torn_frame(self):
+        """A partly written frame at the end of the log is ignored."""
+        self.facade.journal.close()
+        with open(os.path.join(self.directory, 'wal.000000'), 'ab') as file:
+            file.write(b'\x40\x00\x00\x00partial')
+        facade = self.reopen()
+        self.assertRestored(facade)
+        facade.create_amenity({"name": "Pool"})
+        self.assertEqual(len(self.reopen().get_all_amenities()), 2)
+
+    def test_concurrent_writers(self):
+        """Writes committed from several threads are all restored."""
+        def write(n):
+            for i in range(20):
+                self.facade.create_amenity({"name": "A{}-{}".format(n, i)})
+
+        threads = [threading.Thread(target=write, args=(n,))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.reopen().get_all_amenities()), 81)
+
+
+if __name__ == '__main__':
+    unittest.main()
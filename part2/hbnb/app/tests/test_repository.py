@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Tests for the indexed and the concurrent InMemoryRepository."""
+
+import threading
+import unittest
+from unittest import mock
+from app.models.user import User
+from app.models.place import Place
+from app.persistence.repository import (ConcurrentInMemoryRepository,
+                                        InMemoryRepository, Range, _Snapshot)
+
+
+class TestInMemoryIndexes(unittest.TestCase):
+    """Test cases for the secondary indexes of InMemoryRepository."""
+
+    def setUp(self):
+        """Create users indexed by email and places by owner and price."""
+        self.users = InMemoryRepository(unique=('email',),
+                                        indexes=('last_name',))
+        self.places = InMemoryRepository(indexes=('owner',),
+                                         ranges=('price',))
+        self.alice = User("Alice", "Smith", "alice@example.com")
+        self.bob = User("Bob", "Smith", "bob@example.com")
+        self.users.add(self.alice)
+        self.users.add(self.bob)
+        self.prices = {}
+        for price in (80, 120, 50, 120, 300):
+            place = Place("Place", "", price, 0, 0, self.alice)
+            self.places.add(place)
+            self.prices[place.id] = price
+
+    def test_unique_lookup(self):
+        """Email lookups go through the unique index."""
+        self.assertIs(self.users.get_by_attribute('email', 'bob@example.com'),
+                      self.bob)
+        self.assertIsNone(self.users.get_by_attribute('email', 'x@example.com'))
+        self.users.update(self.bob.id, {'email': 'robert@example.com'})
+        self.assertIsNone(self.users.get_by_attribute('email', 'bob@example.com'))
+        self.assertIs(self.users.get_by_attribute('email', 'robert@example.com'),
+                      self.bob)
+
+    def test_unique_violation(self):
+        """A second object with an indexed unique value is rejected."""
+        with self.assertRaises(ValueError):
+            self.users.add(User("Eve", "Smith", "alice@example.com"))
+        with self.assertRaises(ValueError):
+            self.users.update(self.bob.id, {'email': 'alice@example.com'})
+        self.assertEqual(self.bob.email, 'bob@example.com')
+
+    def test_non_unique_and_delete(self):
+        """Non-unique indexes return every match and follow deletions."""
+        self.assertEqual(len(self.users.find_by(last_name='Smith')), 2)
+        self.users.delete(self.alice.id)
+        self.assertEqual(self.users.find_by(last_name='Smith'), [self.bob])
+        self.assertIsNone(self.users.get_by_attribute('email', 'alice@example.com'))
+
+    def test_range(self):
+        """Range criteria return the values within inclusive bounds, sorted."""
+        prices = [place.price for place in
+                  self.places.find_by(price=Range(80, 120))]
+        self.assertEqual(prices, [80, 120, 120])
+        self.assertEqual([place.price for place in
+                          self.places.find_by(price=Range(None, 60))], [50])
+        self.assertEqual(self.places.find_by(price=Range(400, None)), [])
+
+    def test_range_follows_updates(self):
+        """Updating a price moves the place in the range index."""
+        cheapest = self.places.find_by(price=Range(None, 50))[0]
+        self.places.update(cheapest.id, {'price': 500})
+        self.assertEqual(self.places.find_by(price=Range(None, 60)), [])
+        self.assertEqual(self.places.find_by(price=Range(400, None)),
+                         [cheapest])
+        self.places.delete(cheapest.id)
+        self.assertEqual(self.places.find_by(price=Range(400, None)), [])
+
+    def test_combined_criteria(self):
+        """Several criteria are all applied, whichever index is used."""
+        carol = User("Carol", "Jones", "carol@example.com")
+        self.places.add(Place("Other", "", 120, 0, 0, carol))
+        found = self.places.find_by(owner=carol, price=Range(100, 200))
+        self.assertEqual([place.title for place in found], ["Other"])
+        self.assertEqual(len(self.places.find_by(price=120, owner=self.alice)), 2)
+
+    def test_unindexed_scan(self):
+        """Attributes without an index are still found by scanning."""
+        self.assertIs(self.users.get_by_attribute('first_name', 'Bob'), self.bob)
+        self.assertEqual(self.users.find_by(first_name='Nobody'), [])
+
+    def test_reindex(self):
+        """Objects changed in place are reindexed on request."""
+        self.alice.email = 'alice@work.example.com'
+        self.users.reindex(self.alice.id)
+        self.assertIs(self.users.get_by_attribute('email', 'alice@work.example.com'),
+                      self.alice)
+
+
+class TestConcurrentInMemoryRepository(unittest.TestCase):
+    """Test cases for the snapshot based ConcurrentInMemoryRepository."""
+
+    def setUp(self):
+        """Use tiny chunks so a few objects span several of them."""
+        patcher = mock.patch.object(_Snapshot, 'CHUNK', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = ConcurrentInMemoryRepository(unique=('email',))
+        self.added = []
+        for i in range(10):
+            user = User("User", str(i), "user{}@example.com".format(i))
+            self.users.add(user)
+            self.added.append(user)
+
+    def test_insertion_order(self):
+        """get_all keeps insertion order across chunks and deletes."""
+        self.assertEqual(list(self.users.get_all()), self.added)
+        self.users.delete(self.added[4].id)
+        del self.added[4]
+        user = User("User", "new", "new@example.com")
+        self.users.add(user)
+        self.added.append(user)
+        self.assertEqual(list(self.users.get_all()), self.added)
+        self.assertEqual(len(self.users.get_all()), 10)
+        self.assertIsNone(self.users.get(user.id + "x"))
+
+    def test_snapshot_is_stable(self):
+        """A view from get_all does not see later writes."""
+        view = self.users.get_all()
+        self.users.delete(self.added[0].id)
+        self.users.add(User("User", "new", "new@example.com"))
+        self.assertEqual(list(view), self.added)
+        self.assertEqual(len(view), 10)
+        self.assertNotIn(self.added[0], list(self.users.get_all()))
+
+    def test_indexes(self):
+        """Unique indexes still apply and follow updates."""
+        user = self.added[0]
+        self.users.update(user.id, {'email': 'first@example.com'})
+        self.assertIs(self.users.get_by_attribute('email',
+                                                  'first@example.com'), user)
+        with self.assertRaises(ValueError):
+            self.users.add(User("Dup", "User", "user1@example.com"))
+
+    def test_concurrent_writers_and_readers(self):
+        """Readers iterate while writers add and delete."""
+        errors = []
+
+        def write(offset):
+            try:
+                for i in range(200):
+                    user = User("T", str(i),
+                                "t{}-{}@example.com".format(offset, i))
+                    self.users.add(user)
+                    if i % 2:
+                        self.users.delete(user.id)
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        def read():
+            try:
+                for _ in range(200):
+                    view = self.users.get_all()
+                    self.assertEqual(len(list(view)), len(view))
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        threads = [threading.Thread(target=write, args=(n,))
+                   for n in range(4)]
+        threads += [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.users.get_all()), 10 + 4 * 100)
+
+
+class TestBinaryIds(unittest.TestCase):
+    """Test cases for repositories keyed by 16-byte ids."""
+
+    def setUp(self):
+        """Store users under their binary_id."""
+        self.users = ConcurrentInMemoryRepository(unique=('email',),
+                                                  binary_ids=True)
+        self.alice = User("Alice", "Smith", "alice@example.com")
+        self.users.add(self.alice)
+
+    def test_string_ids(self):
+        """Objects are found, updated and deleted by their string id."""
+        self.assertIs(self.users.get(self.alice.id), self.alice)
+        self.assertIs(self.users.get(self.alice.id.upper()), self.alice)
+        self.users.update(self.alice.id, {'email': 'alice@example.org'})
+        self.assertIs(self.users.get_by_attribute('email',
+                                                  'alice@example.org'),
+                      self.alice)
+        self.users.delete(self.alice.id)
+        self.assertIsNone(self.users.get(self.alice.id))
+
+    def test_stored_under_binary_id(self):
+        """The storage keys are the 16-byte ids."""
+        self.assertEqual(list(self.users._storage), [self.alice.binary_id])
+
+    def test_invalid_ids(self):
+        """Strings that are not UUIDs are not found."""
+        for obj_id in ("", "nope", None, 42):
+            self.assertIsNone(self.users.get(obj_id))
+            self.users.delete(obj_id)
+        self.assertEqual(len(self.users.get_all()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
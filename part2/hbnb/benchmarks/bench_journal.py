@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure the commit throughput and the startup time of a Journal.
+
+Run from part2/hbnb:
+
+    python -m benchmarks.bench_journal [--users N] [--writes N] [--threads N]
+
+Commits: --writes users are added with fsync, from one thread then from
+--threads threads, which share fsyncs through group commit.
+
+Startup: --users users are loaded without fsync, then the data
+directory is reopened twice: replaying the whole log, and after a
+compaction, from the snapshot alone.
+"""
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from app.models.user import User
+from app.services.facade import HBnBFacade
+
+
+def add_users(facade, start, count):
+    for i in range(start, start + count):
+        facade.user_repo.add(User("User", str(i),
+                                  "user{}@example.com".format(i)))
+
+
+def commits(directory, writes, threads):
+    """Users committed per second with `threads` writers."""
+    facade = HBnBFacade(directory)
+    per_thread = writes // threads
+    workers = [threading.Thread(target=add_users,
+                                args=(facade, n * per_thread, per_thread))
+               for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    facade.journal.close()
+    return per_thread * threads / elapsed
+
+
+def open_facade(directory):
+    start = time.perf_counter()
+    facade = HBnBFacade(directory)
+    return facade, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    directories = []
+    try:
+        for threads in (1, args.threads):
+            directories.append(tempfile.mkdtemp())
+            print("commits, {:>2} thread(s) {:>10.0f} users/s".format(
+                threads, commits(directories[-1], args.writes, threads)))
+
+        directories.append(tempfile.mkdtemp())
+        facade = HBnBFacade(directories[-1], fsync=False,
+                            compact_bytes=float('inf'))
+        add_users(facade, 0, args.users)
+        facade.journal.close()
+
+        facade, elapsed = open_facade(directories[-1])
+        print("open from log      {:>10.2f}s {:>9} users".format(
+            elapsed, len(facade.get_all_user())))
+        start = time.perf_counter()
+        facade.journal.compact()
+        facade.journal.close()
+        print("compaction         {:>10.2f}s".format(
+            time.perf_counter() - start))
+        facade, elapsed = open_facade(directories[-1])
+        print("open from snapshot {:>10.2f}s {:>9} users".format(
+            elapsed, len(facade.get_all_user())))
+        facade.journal.close()
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure the memory used per stored object by the in-memory backend.
+
+Run from part2/hbnb:
+
+    python -m benchmarks.bench_memory [--objects N]
+
+'compact' stores the models as they are: __slots__, 16-byte ids and
+integer timestamps, in repositories keyed by binary id. 'dict' stores
+objects with the former layout (a __dict__, a 36-character uuid string
+and two datetimes) under their string id. The figures include the
+repository's storage.
+"""
+
+import argparse
+import tracemalloc
+import uuid
+from datetime import datetime
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.repository import ConcurrentInMemoryRepository
+
+
+class DictModel:
+    """An object laid out like the models before __slots__."""
+
+    def __init__(self, **attributes):
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.now()
+        self.updated_at = datetime.now()
+        self.__dict__.update(attributes)
+
+
+def compact_review(i, place, user):
+    return Review("Review number {}".format(i), 1 + i % 5, place, user)
+
+
+def dict_review(i, place, user):
+    return DictModel(_text="Review number {}".format(i), _rating=1 + i % 5,
+                     _place=place, _user=user)
+
+
+def compact_user(i):
+    return User("User", str(i), "user{}@example.com".format(i))
+
+
+def dict_user(i):
+    return DictModel(_first_name="User", _last_name=str(i),
+                     _email="user{}@example.com".format(i), is_admin=False,
+                     places=[])
+
+
+def measure(make, count, binary_ids, *args):
+    """Bytes allocated per object for `count` stored objects."""
+    repository = ConcurrentInMemoryRepository(binary_ids=binary_ids)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        repository.add(make(i, *args))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, default=200000)
+    args = parser.parse_args()
+
+    owner = User("Owner", "Place", "owner@example.com")
+    place = Place("Place", "", 100, 0, 0, owner)
+    print("{:<8} {:>14} {:>14} {:>8}".format(
+        'model', 'dict B/obj', 'compact B/obj', 'saved'))
+    for name, legacy, compact, extra in (
+            ('review', dict_review, compact_review, (place, owner)),
+            ('user', dict_user, compact_user, ())):
+        before = measure(legacy, args.objects, False, *extra)
+        after = measure(compact, args.objects, True, *extra)
+        print("{:<8} {:>14.0f} {:>14.0f} {:>8.0%}".format(
+            name, before, after, 1 - after / before))
+
+
+if __name__ == '__main__':
+    main()
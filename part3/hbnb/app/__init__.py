@@ -3,10 +3,16 @@ from flask_restx import Api
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
+from app.passwords import PasswordHasher
+from app.user_cache import UserCache
+from app.object_cache import ObjectCache
 
 bcrypt = Bcrypt()
 jwt = JWTManager()
 db = SQLAlchemy()
+password_hasher = PasswordHasher()
+user_cache = UserCache()
+object_cache = ObjectCache()
 
 def create_app(config_class="config.DevelopmentConfig"):
     app = Flask(__name__)
@@ -14,6 +20,9 @@ def create_app(config_class="config.DevelopmentConfig"):
     api = Api(app, version='1.0', title='HBnB API', description='HBnB Application API')
     bcrypt.init_app(app)
     jwt.init_app(app)
+    password_hasher.init_app(app)
+    user_cache.init_app(app, jwt)
+    object_cache.init_app(app)
     # Placeholder for API namespaces (endpoints will be added later)
     # Additional namespaces for places, reviews, and amenities will be added later
     
@@ -23,6 +32,7 @@ def create_app(config_class="config.DevelopmentConfig"):
     from app.api.v1.reviews import api as reviews_ns
     from app.api.v1.auth import api as auth_ns
     from app.api.v1.protected import api as protected_ns
+    from app.api.v1.export import api as export_ns
 
     # Register the users namespace
     api.add_namespace(users_ns, path='/api/v1/users')
@@ -31,7 +41,20 @@ def create_app(config_class="config.DevelopmentConfig"):
     api.add_namespace(reviews_ns, path='/api/v1/reviews')
     api.add_namespace(auth_ns, path='/api/v1/auth')
     api.add_namespace(protected_ns, path='/api/v1/protected')
+    api.add_namespace(export_ns, path='/api/v1/export')
     
     db.init_app(app)
-    
+
+    from app.instrumentation import init_query_stats
+    init_query_stats(app)
+
+    from app.serialization import init_serialization
+    init_serialization(app, api)
+
+    from app.compression import init_compression
+    init_compression(app)
+
+    from app.cli import hbnb_cli
+    app.cli.add_command(hbnb_cli)
+
     return app
\ No newline at end of file
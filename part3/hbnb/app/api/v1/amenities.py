@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.api.v1.batch import MAX_BATCH_IDS, batch_response, parse_ids
+from app.api.v1.fieldsets import Fieldset
+from flask_jwt_extended import jwt_required, get_current_user
 
 api = Namespace('amenities', description='Amenity operations')
 
@@ -9,6 +11,14 @@ amenity_model = api.model('Amenity', {
     'name': fields.String(required=True, description='Name of the amenity')
 })
 
+AMENITY_FIELDS = Fieldset({
+    'id': 'id',
+    'name': 'name',
+})
+
+FIELDS_DOC = {'fields': 'Comma-separated subset of: {}'
+                        .format(', '.join(AMENITY_FIELDS.fields))}
+
 @api.route('/')
 class AmenityList(Resource):
     @api.expect(amenity_model, validate=True)
@@ -18,8 +28,7 @@ class AmenityList(Resource):
     @jwt_required()
     def post(self):
         """Register a new amenity (admin only)"""
-        current_user_id = get_jwt_identity()
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -34,22 +43,49 @@ class AmenityList(Resource):
             return {"error": "Invalid input data: {}".format(str(e))}, 400
         return {"id": new_amenity.id, "name": new_amenity.name}, 201
 
+    @api.doc(params=dict(FIELDS_DOC, ids='Comma-separated amenity ids (max {}); '
+                                         'answers {{"items": [...], '
+                                         '"missing": [...]}}'
+                                         .format(MAX_BATCH_IDS)))
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(400, 'Bad Request')
     def get(self):
         """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        return [amenity.to_dict() for amenity in amenities], 200
+        try:
+            selected = AMENITY_FIELDS.parse()
+            ids = parse_ids()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        if ids is not None:
+            amenities, missing = facade.get_amenities_by_ids(ids)
+            return batch_response(
+                amenities, missing,
+                lambda amenity: AMENITY_FIELDS.render(amenity, selected)), 200
+        if selected is None:
+            amenities = facade.get_all_amenities()
+            return [amenity.to_dict() for amenity in amenities], 200
+        amenities = facade.get_all_amenities(AMENITY_FIELDS.paths(selected))
+        return [AMENITY_FIELDS.render(amenity, selected)
+                for amenity in amenities], 200
 
 @api.route('/<amenity_id>')
 class AmenityResource(Resource):
+    @api.doc(params=FIELDS_DOC)
     @api.response(200, 'Amenity details retrieved successfully')
+    @api.response(400, 'Bad Request')
     @api.response(404, 'Not found')
     def get(self, amenity_id):
         """Get amenity details by ID"""
-        amenity = facade.get_amenity(amenity_id)
+        try:
+            selected = AMENITY_FIELDS.parse()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        amenity = facade.get_amenity(
+            amenity_id,
+            None if selected is None else AMENITY_FIELDS.paths(selected))
         if amenity is None:
             api.abort(404, "Amenity not found")
-        return amenity.to_dict(), 200
+        return AMENITY_FIELDS.render(amenity, selected), 200
 
     @api.expect(amenity_model, validate=True)
     @api.response(200, 'Amenity updated successfully')
@@ -59,8 +95,7 @@ class AmenityResource(Resource):
     @jwt_required()
     def put(self, amenity_id):
         """Update an amenity's information (admin only)"""
-        current_user_id = get_jwt_identity()
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
 
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -1,5 +1,7 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_current_user
+from app import password_hasher
+from app.passwords import PasswordHasherBusy
 from app.services import facade
 
 
@@ -14,6 +16,9 @@ login_model = api.model('Login', {
 @api.route('/login')
 class Login(Resource):
     @api.expect(login_model)
+    @api.response(200, 'Login successful')
+    @api.response(401, 'Invalid credentials')
+    @api.response(503, 'Password hashing saturated')
     def post(self):
         """Authenticate user and return a JWT token"""
         credentials = api.payload  # Get the email and password from the request payload
@@ -22,12 +27,33 @@ class Login(Resource):
         user = facade.get_user_by_email(credentials['email'])
         
         # Step 2: Check if the user exists and the password is correct
-        if not user or not user.verify_password(credentials['password']):
-            return {'error': 'Invalid credentials'}, 401
+        try:
+            if not user or not user.verify_password(credentials['password']):
+                return {'error': 'Invalid credentials'}, 401
+        except PasswordHasherBusy:
+            return {'error': 'Server busy, retry later'}, 503, {'Retry-After': '1'}
+
+        # Upgrade an outdated hash in the background while we still
+        # have the plain password
+        facade.rehash_password_if_needed(user, credentials['password'])
 
         # Step 3: Create a JWT token with the user's id and is_admin flag
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(
+            identity=str(user.id),
+            additional_claims={'is_admin': bool(user.is_admin)})
         
         # Step 4: Return the JWT token to the client
         return {'access_token': access_token}, 200
 
+
+@api.route('/hasher-metrics')
+class HasherMetrics(Resource):
+    @api.response(200, 'Password hashing pool metrics')
+    @api.response(403, 'Admin privileges required')
+    @jwt_required()
+    def get(self):
+        """Queue depth and throughput of the password hashing pool (admin only)"""
+        current_user = get_current_user()
+        if not current_user or not current_user.is_admin:
+            return {'error': 'Admin privileges required'}, 403
+        return password_hasher.metrics(), 200
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Batch reads (the `ids=` query parameter) and batch writes.
+
+Clients holding a list of ids (favourites, search hits) fetch them with
+one request instead of one GET per id; the repository resolves them with
+a single IN query (Repository.get_many). The response keeps the order of
+the request and lists the ids that do not exist:
+
+    {"items": [...], "missing": ["..."]}
+
+Batch writes take a JSON array of up to MAX_BATCH_ITEMS objects and
+answer one result per item, in order:
+
+    {"results": [{"status": 201, "id": "..."},
+                 {"status": 400, "error": "..."}]}
+
+The status is 201 when every item was created, else 207.
+"""
+
+from flask import request
+
+MAX_BATCH_IDS = 100
+MAX_BATCH_ITEMS = 100
+
+
+def parse_ids():
+    """Return the ids requested with `?ids=`, or None without it.
+
+    Raises:
+        ValueError: If the list is empty or longer than MAX_BATCH_IDS
+    """
+    value = request.args.get('ids')
+    if value is None:
+        return None
+    ids = list(dict.fromkeys(
+        item.strip() for item in value.split(',') if item.strip()))
+    if not 1 <= len(ids) <= MAX_BATCH_IDS:
+        raise ValueError("ids must list between 1 and {} ids"
+                         .format(MAX_BATCH_IDS))
+    return ids
+
+
+def batch_response(found, missing, render):
+    """Body of a batch read: rendered objects and the missing ids."""
+    return {'items': [render(obj) for obj in found], 'missing': missing}
+
+
+def parse_items():
+    """Return the objects of a batch write body.
+
+    Raises:
+        ValueError: If the body is not an array of 1 to MAX_BATCH_ITEMS
+            objects
+    """
+    items = request.get_json(silent=True)
+    if (not isinstance(items, list) or not 1 <= len(items) <= MAX_BATCH_ITEMS
+            or not all(isinstance(item, dict) for item in items)):
+        raise ValueError("The body must be an array of 1 to {} objects"
+                         .format(MAX_BATCH_ITEMS))
+    return items
+
+
+def batch_results(results):
+    """Body and status code of a batch write.
+
+    Args:
+        results (list): (new id, None) or (None, error message) per item
+    """
+    body = [{'status': 201, 'id': obj_id} if error is None
+            else {'status': 400, 'error': error}
+            for obj_id, error in results]
+    failed = any(error is not None for _, error in results)
+    return {'results': body}, 207 if failed else 201
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Conditional GET support (ETag / If-None-Match, Last-Modified).
+
+Handlers ask the facade for a validator - the timestamps and counts a
+response depends on, read from indexes - and call `conditional()`
+before loading anything. When the client copy is current the handler
+returns a 304 straight away.
+
+ETags are weak: they identify the data, not the bytes, which may vary
+with the negotiated encoding.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from flask import request
+from werkzeug.http import http_date
+
+
+def conditional(validator, vary=''):
+    """Compare the request preconditions with a validator.
+
+    Args:
+        validator (tuple): Timestamps and counts the response depends on
+        vary (str): Anything else the body depends on, e.g. the query
+            string of a collection
+
+    Returns:
+        tuple: (not_modified, headers) where headers holds the ETag and
+        Last-Modified to send with either response
+    """
+    digest = hashlib.sha1(
+        '{}|{}|{}'.format(request.path, vary, validator).encode('utf-8'))
+    etag = digest.hexdigest()[:20]
+    headers = {'ETag': 'W/"{}"'.format(etag)}
+
+    timestamps = [value for value in validator if isinstance(value, datetime)]
+    last_modified = None
+    if timestamps:
+        last_modified = max(timestamps).replace(tzinfo=timezone.utc,
+                                                microsecond=0)
+        headers['Last-Modified'] = http_date(last_modified)
+
+    if request.if_none_match:
+        # If-Modified-Since is ignored when If-None-Match is present
+        return request.if_none_match.contains_weak(etag), headers
+    since = request.if_modified_since
+    if since is not None and last_modified is not None:
+        return last_modified <= since, headers
+    return False, headers
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""API endpoint streaming the catalog as NDJSON."""
+
+from datetime import datetime
+from flask import Response, request, stream_with_context
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required, get_current_user
+from app.services import facade
+from app.services.exporter import EXPORTABLE, iter_gzip, iter_ndjson
+
+
+api = Namespace('export', description='Bulk export operations')
+
+
+@api.route('/<entity>')
+@api.param('entity', 'One of: {}'.format(', '.join(EXPORTABLE)))
+class Export(Resource):
+    """Resource streaming every row of an entity."""
+
+    @api.doc(params={
+        'updated_since': 'ISO 8601 timestamp; only rows updated since then'
+    })
+    @api.response(200, 'NDJSON stream, gzipped if the client accepts it')
+    @api.response(400, 'Bad Request')
+    @api.response(403, 'Admin privileges required')
+    @api.response(404, 'Not found')
+    @jwt_required()
+    def get(self, entity):
+        """Stream users, places or reviews as NDJSON (admin only)."""
+        current_user = get_current_user()
+        if not current_user or not current_user.is_admin:
+            return {'error': 'Admin privileges required'}, 403
+
+        if entity not in EXPORTABLE:
+            return {'error': 'Unknown entity: {}'.format(entity)}, 404
+
+        updated_since = request.args.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = datetime.fromisoformat(updated_since)
+            except ValueError:
+                return {'error': 'updated_since must be an ISO 8601 '
+                                 'timestamp'}, 400
+
+        body = iter_ndjson(facade.export_records(entity, updated_since))
+        headers = {'Vary': 'Accept-Encoding'}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = iter_gzip(body)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(stream_with_context(body),
+                        mimetype='application/x-ndjson', headers=headers)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Sparse fieldsets and expansions: the `fields=` and `expand=` parameters.
+
+A Fieldset maps the fields a resource can render to the attribute path
+each one reads on the model, e.g. 'rating' -> 'rating_avg' or
+'first_name' -> 'user.first_name'. Handlers parse the requested fields,
+ask the facade for only those columns, then render the result. Fields
+mapped to None are nested structures (relationships) rendered by a
+function the handler passes to `render`.
+
+Rendering works both on ORM objects and on the narrow rows returned by
+SQLAlchemyRepository.select_fields.
+
+`expand` names the related resources to embed, e.g. 'owner,reviews.user';
+handlers load them in batches through the facade (expand_places,
+expand_reviews).
+"""
+
+from flask import request
+
+
+class Fieldset:
+    """Fields of a resource and the attribute paths they read."""
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def parse(self):
+        """Return the fields requested with `?fields=`, or None for all.
+
+        Raises:
+            ValueError: If a requested field does not exist
+        """
+        value = request.args.get('fields')
+        if value is None:
+            return None
+        selected = list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in selected if name not in self.fields]
+        if unknown or not selected:
+            raise ValueError("fields must be a comma-separated list of: {}"
+                             .format(', '.join(self.fields)))
+        return selected
+
+    def paths(self, selected):
+        """Attribute paths to load for the selected fields."""
+        names = self.fields if selected is None else selected
+        return [self.fields[name] for name in names
+                if self.fields[name] is not None]
+
+    def render(self, obj, selected, nested=None):
+        """Dict of the selected fields of an object or row.
+
+        Args:
+            nested (dict): Field name -> function rendering it from obj,
+                for the fields mapped to None
+        """
+        names = self.fields if selected is None else selected
+        return {name: read(obj, self.fields[name])
+                if self.fields[name] is not None else nested[name](obj)
+                for name in names}
+
+
+def parse_expand(allowed):
+    """Return the relations requested with `?expand=`, in `allowed` order.
+
+    'a.b' implies 'a'. Without the parameter the tuple is empty.
+
+    Raises:
+        ValueError: If a requested relation cannot be expanded
+    """
+    value = request.args.get('expand')
+    if value is None:
+        return ()
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    if not names or not names.issubset(allowed):
+        raise ValueError("expand must be a comma-separated list of: {}"
+                         .format(', '.join(allowed)))
+    names |= {name.split('.')[0] for name in names}
+    return tuple(name for name in allowed if name in names)
+
+
+def read(obj, path):
+    """Read 'attr' or 'relation.attr' from an ORM object or a row."""
+    mapping = getattr(obj, '_mapping', None)
+    if mapping is not None:
+        return mapping[path]
+    for attr in path.split('.'):
+        obj = getattr(obj, attr)
+    return obj
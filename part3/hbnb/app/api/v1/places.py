@@ -3,12 +3,60 @@
 
 from flask_restx import Namespace, Resource, fields
 from flask import request
+from urllib.parse import urlencode
+from app import object_cache
+from app.api.v1.batch import (MAX_BATCH_IDS, batch_response, batch_results,
+                              parse_ids, parse_items)
+from app.api.v1.conditional import conditional
+from app.api.v1.fieldsets import Fieldset, parse_expand
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 
 
 api = Namespace('places', description='Place operations')
 
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+MAX_SEARCH_RADIUS_KM = 200
+# Sort parameter -> column sort understood by the repository
+PLACE_SORTS = {
+    'created_at': 'created_at',
+    '-created_at': '-created_at',
+    'price': 'price',
+    '-price': '-price',
+    'rating': 'rating_avg',
+    '-rating': '-rating_avg',
+}
+
+PLACE_LIST_FIELDS = Fieldset({
+    'id': 'id',
+    'title': 'title',
+    'price': 'price',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'image': 'image',
+    'review_count': 'review_count',
+    'rating': 'rating_avg',
+})
+
+DETAIL_RELATIONS = ('owner', 'amenities', 'reviews')
+
+PLACE_DETAIL_FIELDS = Fieldset({
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'price': 'price',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'owner': None,
+    'image': 'image',
+    'review_count': 'review_count',
+    'rating': 'rating_avg',
+    'rating_histogram': None,
+    'amenities': None,
+    'reviews': None,
+})
+
 amenity_model = api.model('PlaceAmenity', {
     'id': fields.String(description='Amenity ID'),
     'name': fields.String(description='Name of the amenity')
@@ -47,6 +95,26 @@ place_model = api.model('Place', {
 })
 
 
+def _price(value):
+    """Parse an optional price query parameter."""
+    if value is None:
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        raise ValueError("Price filters must be numbers")
+    if price < 0:
+        raise ValueError("Price filters cannot be negative")
+    return price
+
+
+def _id_list(value):
+    """Split a comma-separated list of ids."""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
 @api.route('/')
 class PlaceList(Resource):
     """Resource for collection of places."""
@@ -92,89 +160,337 @@ class PlaceList(Resource):
             return {'error': "An unexpected error occurred: {}"
                     .format(str(e))}, 500
 
+    @api.doc(params={
+        'limit': 'Maximum number of places to return (default {}, max {})'
+                 .format(DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT),
+        'after': 'Cursor returned in X-Next-Cursor by the previous page',
+        'min_price': 'Lowest price per night',
+        'max_price': 'Highest price per night',
+        'sort': 'One of: {} (default created_at)'.format(', '.join(PLACE_SORTS)),
+        'amenities': 'Comma-separated amenity ids the places must all have',
+        'fields': 'Comma-separated subset of: {}'
+                  .format(', '.join(PLACE_LIST_FIELDS.fields)),
+        'expand': 'Relations to embed: {}'
+                  .format(', '.join(facade.PLACE_EXPANSIONS)),
+        'ids': 'Comma-separated place ids (max {}) to fetch instead of a '
+               'page; answers {{"items": [...], "missing": [...]}}'
+               .format(MAX_BATCH_IDS)
+    })
     @api.response(200, 'List of places retrieved successfully')
+    @api.response(304, 'Not modified since the ETag or date sent')
+    @api.response(400, 'Bad Request')
     @api.response(500, 'An unexpected error occurred')
     def get(self):
-        """Retrieve a list of all places."""
+        """Retrieve a page of places.
+
+        The cursor of the next page is sent in the X-Next-Cursor header
+        (and a Link header) and is absent on the last page.
+        """
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_LIMIT))
+        except ValueError:
+            return {'error': 'limit must be an integer'}, 400
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            return {'error': 'limit must be between 1 and {}'
+                    .format(MAX_PAGE_LIMIT)}, 400
+
+        sort = request.args.get('sort', 'created_at')
+        if sort not in PLACE_SORTS:
+            return {'error': 'sort must be one of: {}'
+                    .format(', '.join(PLACE_SORTS))}, 400
+        try:
+            min_price = _price(request.args.get('min_price'))
+            max_price = _price(request.args.get('max_price'))
+            selected = PLACE_LIST_FIELDS.parse()
+            expand = parse_expand(facade.PLACE_EXPANSIONS)
+            ids = parse_ids()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        paths = None
+        if selected is not None:
+            paths = PLACE_LIST_FIELDS.paths(selected)
+            if 'owner' in expand:
+                paths.append('owner_id')
+
+        not_modified, headers = conditional(
+            facade.get_places_validator(expand),
+            request.query_string.decode('utf-8'))
+        if not_modified:
+            return None, 304, headers
+
+        if ids is not None:
+            places, missing = facade.get_places_by_ids(ids)
+            response = batch_response(
+                places, missing,
+                lambda place: PLACE_LIST_FIELDS.render(place, selected))
+            if expand:
+                _expand_places(response['items'], places, expand)
+            return response, 200, headers
+
         try:
-            places = facade.get_all_places()
-            return [
-                {
-                    'id': place.id,
-                    'title': place.title,
-                    'price': place.price,
-                    'latitude': place.latitude,
-                    'longitude': place.longitude,
-                    'image': place.image
-                }
-                for place in places
-            ], 200
+            places, next_cursor = facade.get_places_page(
+                limit, request.args.get('after'), PLACE_SORTS[sort],
+                min_price, max_price,
+                _id_list(request.args.get('amenities')), paths)
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except Exception as e:
             return {'error': "An unexpected error occurred: {}"
                     .format(str(e))}, 500
 
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+            args = request.args.to_dict()
+            args.update(limit=limit, after=next_cursor)
+            headers['Link'] = '<{}?{}>; rel="next"'.format(
+                request.base_url, urlencode(args))
+        response = [PLACE_LIST_FIELDS.render(place, selected)
+                    for place in places]
+        if expand:
+            _expand_places(response, places, expand)
+        return response, 200, headers
+
+
+@api.route('/batch')
+class PlaceBatch(Resource):
+    """Resource for creating many places at once."""
+
+    @api.expect([place_model])
+    @api.response(201, 'Every place was created')
+    @api.response(207, 'Some places were rejected, see each result')
+    @api.response(400, 'Bad Request')
+    @jwt_required()
+    def post(self):
+        """Register a batch of places owned by the current user.
+
+        The body is an array of places; the answer holds one result per
+        item, in order. Valid items are saved together.
+        """
+        try:
+            items = parse_items()
+            results = facade.create_places(get_jwt_identity(), items)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return batch_results(results)
+
+
+@api.route('/search')
+class PlaceSearch(Resource):
+    """Resource for proximity searches."""
+
+    @api.doc(params={
+        'lat': 'Latitude of the centre',
+        'lng': 'Longitude of the centre',
+        'radius_km': 'Search radius in km (max {})'
+                     .format(MAX_SEARCH_RADIUS_KM),
+        'limit': 'Maximum number of places to return (default {}, max {})'
+                 .format(DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
+    })
+    @api.response(200, 'Places sorted by distance')
+    @api.response(400, 'Bad Request')
+    def get(self):
+        """Find the places near a point, nearest first."""
+        try:
+            latitude = float(request.args['lat'])
+            longitude = float(request.args['lng'])
+            radius_km = float(request.args.get('radius_km', 10))
+            limit = int(request.args.get('limit', DEFAULT_PAGE_LIMIT))
+        except KeyError as e:
+            return {'error': 'Missing parameter: {}'.format(e.args[0])}, 400
+        except ValueError:
+            return {'error': 'lat, lng, radius_km and limit must be '
+                             'numbers'}, 400
+        if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+            return {'error': 'lat or lng out of range'}, 400
+        if not 0 < radius_km <= MAX_SEARCH_RADIUS_KM:
+            return {'error': 'radius_km must be between 0 and {}'
+                    .format(MAX_SEARCH_RADIUS_KM)}, 400
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            return {'error': 'limit must be between 1 and {}'
+                    .format(MAX_PAGE_LIMIT)}, 400
+
+        results = facade.search_places_nearby(latitude, longitude,
+                                              radius_km, limit)
+        return [
+            {
+                'id': place.id,
+                'title': place.title,
+                'price': place.price,
+                'latitude': place.latitude,
+                'longitude': place.longitude,
+                'image': place.image,
+                'distance_km': round(distance, 3)
+            }
+            for place, distance in results
+        ], 200
+
+
+@api.route('/cache-metrics')
+class PlaceCacheMetrics(Resource):
+    @api.response(200, 'Place detail cache metrics')
+    @api.response(403, 'Admin privileges required')
+    @jwt_required()
+    def get(self):
+        """Hit ratio of the place detail cache (admin only)"""
+        current_user = get_current_user()
+        if not current_user or not current_user.is_admin:
+            return {'error': 'Admin privileges required'}, 403
+        return object_cache.metrics(), 200
+
+
+def _user(user):
+    return {
+        'id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email
+    }
+
+
+def _owner(place):
+    return _user(place.owner)
+
+
+def _amenity(amenity):
+    return {
+        'id': amenity.id,
+        'name': amenity.name
+    }
+
+
+def _amenities(place):
+    return [_amenity(amenity) for amenity in place.amenities]
+
+
+def _reviews(place):
+    return [
+        {
+            'id': review.id,
+            'text': review.text,
+            'rating': review.rating,
+            'user_id': review.user_id,
+            'first_name': review.user.first_name,
+            'last_name': review.user.last_name
+        }
+        for review in place.reviews
+    ]
+
+
+def _expanded_review(review, authors=None):
+    response = {
+        'id': review.id,
+        'text': review.text,
+        'rating': review.rating,
+        'user_id': review.user_id
+    }
+    if authors is not None:
+        author = authors[review.user_id]
+        response['user'] = {
+            'id': author.id,
+            'first_name': author.first_name,
+            'last_name': author.last_name
+        }
+    return response
+
+
+def _expand_places(responses, places, expand):
+    """Embed the `expand` relations into rendered places, in batches."""
+    loaded = facade.expand_places(places, expand)
+    authors = loaded.get('reviews.user')
+    for response, place in zip(responses, places):
+        if 'owner' in loaded:
+            response['owner'] = _user(loaded['owner'][place.owner_id])
+        if 'amenities' in loaded:
+            response['amenities'] = [
+                _amenity(amenity) for amenity in loaded['amenities'][place.id]]
+        if 'reviews' in loaded:
+            response['reviews'] = [
+                _expanded_review(review, authors)
+                for review in loaded['reviews'][place.id]]
+    return responses
+
+
+PLACE_DETAIL_NESTED = {
+    'owner': _owner,
+    'rating_histogram': lambda place: place.rating_histogram,
+    'amenities': _amenities,
+    'reviews': _reviews,
+}
+
+
+def _place_detail(place, selected=None):
+    """Render a place loaded by facade.get_place_detail as a dict."""
+    response = PLACE_DETAIL_FIELDS.render(place, selected, PLACE_DETAIL_NESTED)
+    if selected is None:
+        # The full view leaves out empty lists
+        for key in ('amenities', 'reviews'):
+            if not response[key]:
+                del response[key]
+    return response
+
+
+def _load_place_detail(place_id, selected, expand=()):
+    """Load only the columns and relations the selected fields need."""
+    columns = PLACE_DETAIL_FIELDS.paths(selected)
+    if 'rating_histogram' in selected:
+        columns += ['rating_{}'.format(rating) for rating in range(1, 6)]
+    if 'owner' in selected or 'owner' in expand:
+        columns.append('owner_id')
+    relations = [name for name in DETAIL_RELATIONS if name in selected]
+    return facade.get_place_detail(place_id, columns, relations)
+
 
 @api.route('/<place_id>')
 class PlaceResource(Resource):
     """Resource for individual place operations."""
 
+    @api.doc(params={
+        'fields': 'Comma-separated subset of: {}'
+                  .format(', '.join(PLACE_DETAIL_FIELDS.fields)),
+        'expand': 'Relations to embed, instead of the default inline ones: '
+                  '{}'.format(', '.join(facade.PLACE_EXPANSIONS))
+    })
     @api.response(200, 'Place details retrieved successfully')
+    @api.response(304, 'Not modified since the ETag or date sent')
+    @api.response(400, 'Bad Request')
     @api.response(404, 'Not found')
     @api.response(500, 'An unexpected error occurred')
     def get(self, place_id):
         """Get place details by ID."""
         try:
+            selected = PLACE_DETAIL_FIELDS.parse()
+            expand = parse_expand(facade.PLACE_EXPANSIONS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            validator = facade.get_place_detail_validator(place_id)
+            if validator is None:
+                return {'error': 'Place not found'}, 404
+            not_modified, headers = conditional(
+                validator, request.query_string.decode('utf-8'))
+            if not_modified:
+                return None, 304, headers
+
             try:
-                place = facade.get_place(place_id)
+                if selected is None and not expand:
+                    response = facade.get_place_detail_view(place_id,
+                                                            _place_detail)
+                else:
+                    # Narrow views skip the cache of full details.
+                    # With expand, only the expanded relations are embedded
+                    if selected is None:
+                        selected = [name for name in PLACE_DETAIL_FIELDS.fields
+                                    if name not in DETAIL_RELATIONS]
+                    selected = [name for name in selected
+                                if name not in expand]
+                    place = _load_place_detail(place_id, selected, expand)
+                    response = _place_detail(place, selected)
+                    if expand:
+                        _expand_places([response], [place], expand)
             except KeyError:
                 return {'error': 'Place not found'}, 404
 
-            owner = place.owner
-            owner_data = {
-                'id': owner.id,
-                'first_name': owner.first_name,
-                'last_name': owner.last_name,
-                'email': owner.email
-            }
-
-            response = {
-                'id': place.id,
-                'title': place.title,
-                'description': place.description,
-                'price': place.price,
-                'latitude': place.latitude,
-                'longitude': place.longitude,
-                'owner': owner_data,
-                'image': place.image
-            }
-
-            amenities_data = [
-                {
-                    'id': amenity.id,
-                    'name': amenity.name
-                }
-                for amenity in place.amenities
-            ]
-
-            if amenities_data:
-                response['amenities'] = amenities_data
-
-            reviews_data = [
-                {
-                    'id': review.id,
-                    'text': review.text,
-                    'rating': review.rating,
-                    'user_id': review.user.id,
-                    'first_name': review.user.first_name,
-                    'last_name': review.user.last_name
-                }
-                for review in place.reviews
-            ]
-
-            if reviews_data:
-                response['reviews'] = reviews_data
-
-            return response, 200
+            return response, 200, headers
 
         except Exception as e:
             return {'error': "An unexpected error occurred: {}"
@@ -190,7 +506,7 @@ class PlaceResource(Resource):
     def put(self, place_id):
         """Update a place's information."""
         current_user_id = get_jwt_identity()
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -1,7 +1,11 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.batch import batch_results, parse_items
+from app.api.v1.conditional import conditional
+from app.api.v1.fieldsets import Fieldset, parse_expand
 from flask import request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 
 api = Namespace('reviews', description='Review operations')
 
@@ -12,11 +16,71 @@ review_model = api.model('PlaceReview', {
     'place_id': fields.String(description='ID of the place')
 })
 
+REVIEW_LIST_FIELDS = Fieldset({
+    'id': 'id',
+    'text': 'text',
+    'rating': 'rating',
+    'first_name': 'user.first_name',
+    'last_name': 'user.last_name',
+})
+
+REVIEW_FIELDS = Fieldset(dict(REVIEW_LIST_FIELDS.fields,
+                              user_id='user_id', place_id='place_id'))
+
+EXPAND_DOC = 'Relations to embed: {}'.format(
+    ', '.join(facade.REVIEW_EXPANSIONS))
+LIST_FIELDS_DOC = {'fields': 'Comma-separated subset of: {}'
+                             .format(', '.join(REVIEW_LIST_FIELDS.fields)),
+                   'expand': EXPAND_DOC}
+FIELDS_DOC = {'fields': 'Comma-separated subset of: {}'
+                        .format(', '.join(REVIEW_FIELDS.fields)),
+              'expand': EXPAND_DOC}
+
+
+def _paths(fieldset, selected, expand):
+    """Columns to select, or None to load whole reviews.
+
+    Expanded reads always go through narrow rows, which join the author
+    names instead of lazy loading them per review.
+    """
+    if selected is None and not expand:
+        return None
+    paths = fieldset.paths(selected)
+    if 'user' in expand:
+        paths.append('user_id')
+    if 'place' in expand:
+        paths.append('place_id')
+    return paths
+
+
+def _expand_reviews(responses, reviews, expand):
+    """Embed the `expand` relations into rendered reviews, in batches."""
+    loaded = facade.expand_reviews(reviews, expand)
+    for response, review in zip(responses, reviews):
+        if 'user' in loaded:
+            user = loaded['user'][review.user_id]
+            response['user'] = {
+                'id': user.id,
+                'first_name': user.first_name,
+                'last_name': user.last_name
+            }
+        if 'place' in loaded:
+            place = loaded['place'][review.place_id]
+            response['place'] = {
+                'id': place.id,
+                'title': place.title,
+                'price': place.price,
+                'latitude': place.latitude,
+                'longitude': place.longitude
+            }
+    return responses
+
 @api.route('/')
 class ReviewList(Resource):
     @api.expect(review_model)
     @api.response(201, 'Review successfully created')
     @api.response(400, 'Bad Request')
+    @api.response(409, 'The place was reviewed concurrently')
     @api.response(500, 'An unexpected error occurred')
     @jwt_required()
     def post(self):
@@ -29,10 +93,6 @@ class ReviewList(Resource):
             if place.owner_id == current_user_id:
                 return {'error': 'You cannot review your own place'}, 400
 
-            for review in place.reviews:
-                if review.user_id == current_user_id:
-                    return {'error': 'You have already reviewed this place'}, 400
-
             review_data['user_id'] = current_user_id
             new_review = facade.create_review(review_data)
 
@@ -46,48 +106,76 @@ class ReviewList(Resource):
 
         except ValueError as e:
             return {'error': str(e)}, 400
+        except IntegrityError:
+            return {'error': 'You have already reviewed this place'}, 409
         except Exception as e:
             return {'error': "An unexpected error occurred: {}".format(str(e))}, 500
 
+    @api.doc(params=LIST_FIELDS_DOC)
     @api.response(200, 'List of reviews retrieved successfully')
+    @api.response(400, 'Bad Request')
     @api.response(500, 'An unexpected error occurred')
     def get(self):
         """Retrieve a list of all reviews."""
         try:
-            reviews = facade.get_all_reviews()
-            return [
-                {
-                    'id': review.id,
-                    'text': review.text,
-                    'rating': review.rating,
-                    'first_name': review.user.first_name,
-                    'last_name': review.user.last_name
-                }
-                for review in reviews
-            ], 200
+            selected = REVIEW_LIST_FIELDS.parse()
+            expand = parse_expand(facade.REVIEW_EXPANSIONS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            reviews = facade.get_all_reviews(
+                _paths(REVIEW_LIST_FIELDS, selected, expand))
+            return _expand_reviews(
+                [REVIEW_LIST_FIELDS.render(review, selected)
+                 for review in reviews], reviews, expand), 200
         except Exception as e:
             return {'error': "An unexpected error occurred: {}".format(str(e))}, 500
 
+@api.route('/batch')
+class ReviewBatch(Resource):
+    @api.expect([review_model])
+    @api.response(201, 'Every review was created')
+    @api.response(207, 'Some reviews were rejected, see each result')
+    @api.response(400, 'Bad Request')
+    @api.response(409, 'A review was created concurrently, nothing was saved')
+    @jwt_required()
+    def post(self):
+        """Register a batch of reviews by the current user.
+
+        The body is an array of reviews; the answer holds one result per
+        item, in order. Valid items are saved together.
+        """
+        try:
+            items = parse_items()
+            results = facade.create_reviews(get_jwt_identity(), items)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        except IntegrityError:
+            return {'error': 'A review of one of these places was created '
+                             'concurrently, retry the batch'}, 409
+        return batch_results(results)
+
 @api.route('/<review_id>')
 class ReviewResource(Resource):
+    @api.doc(params=FIELDS_DOC)
     @api.response(200, 'Review details retrieved successfully')
+    @api.response(400, 'Bad Request')
     @api.response(404, 'Not found')
     @api.response(500, 'An unexpected error occurred')
     def get(self, review_id):
         """Get review details by ID."""
         try:
-            review = facade.get_review(review_id)
+            selected = REVIEW_FIELDS.parse()
+            expand = parse_expand(facade.REVIEW_EXPANSIONS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            review = facade.get_review(
+                review_id, _paths(REVIEW_FIELDS, selected, expand))
             if not review:
                 return {'error': 'Review not found'}, 404
-            return {
-                'id': review.id,
-                'text': review.text,
-                'rating': review.rating,
-                'first_name': review.user.first_name,
-                'last_name': review.user.last_name,
-                'user_id': str(review.user_id),
-                'place_id': str(review.place_id)
-            }, 200
+            return _expand_reviews([REVIEW_FIELDS.render(review, selected)],
+                                   [review], expand)[0], 200
         except Exception as e:
             return {'error': "An unexpected error occurred: {}".format(str(e))}, 500
 
@@ -100,7 +188,7 @@ class ReviewResource(Resource):
     @jwt_required()
     def put(self, review_id):
         current_user_id = get_jwt_identity()
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -138,7 +226,7 @@ class ReviewResource(Resource):
     def delete(self, review_id):
         """Delete a review (admin can delete any, user only own)."""
         current_user_id = get_jwt_identity()
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
 
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -160,23 +248,33 @@ class ReviewResource(Resource):
         
 @api.route('/places/<place_id>/reviews')
 class PlaceReviewList(Resource):
+    @api.doc(params=LIST_FIELDS_DOC)
     @api.response(200, 'List of reviews for the place retrieved successfully')
+    @api.response(304, 'Not modified since the ETag or date sent')
+    @api.response(400, 'Bad Request')
     @api.response(404, 'Not found')
     @api.response(500, 'An unexpected error occurred')
     def get(self, place_id):
         """Get all reviews for a specific place."""
         try:
-            reviews = facade.get_reviews_by_place(place_id)
-            return [
-                {
-                    'id': review.id,
-                    'text': review.text,
-                    'rating': review.rating,
-                    'first_name': review.user.first_name,
-                    'last_name': review.user.last_name,
-                }
-                for review in reviews
-            ], 200
+            selected = REVIEW_LIST_FIELDS.parse()
+            expand = parse_expand(facade.REVIEW_EXPANSIONS)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            validator = facade.get_place_reviews_validator(place_id, expand)
+            if validator is None:
+                return {'error': 'Place not found'}, 404
+            not_modified, headers = conditional(
+                validator, request.query_string.decode('utf-8'))
+            if not_modified:
+                return None, 304, headers
+
+            reviews = facade.get_reviews_by_place(
+                place_id, _paths(REVIEW_LIST_FIELDS, selected, expand))
+            return _expand_reviews(
+                [REVIEW_LIST_FIELDS.render(review, selected)
+                 for review in reviews], reviews, expand), 200, headers
         except KeyError:
             return {'error': 'Place not found'}, 404
         except Exception as e:
@@ -1,8 +1,11 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from app import bcrypt
+from app.api.v1.batch import MAX_BATCH_IDS, batch_response, parse_ids
+from app.api.v1.fieldsets import Fieldset
+from app import password_hasher
+from app.passwords import PasswordHasherBusy
 import re
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, get_current_user
 from flask import request
 
 
@@ -15,6 +18,17 @@ user_model = api.model('User', {
     'password': fields.String(required=True, description='Password of the user')
 })
 
+USER_FIELDS = Fieldset({
+    'id': 'id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+    'is_admin': 'is_admin',
+})
+
+FIELDS_DOC = {'fields': 'Comma-separated subset of: {}'
+                        .format(', '.join(USER_FIELDS.fields))}
+
 def is_valid_email(email):
     pattern = r"^[^@]+@[^@]+\.[^@]+$"
     return re.match(pattern, email) is not None
@@ -26,13 +40,12 @@ class UserList(Resource):
     @api.response(400, 'Bad request')
     @api.response(403, "Unauthorized action")
     @api.response(409, 'Conflict')
+    @api.response(503, 'Password hashing saturated')
     @jwt_required()
     def post(self):
         """Create a new user (admin only)"""
-        current_user_id = get_jwt_identity()
-
-        # Récupère l'utilisateur complet depuis la base de données
-        current_user = facade.get_user(current_user_id)
+        # Utilisateur courant, chargé une fois par requête (via le cache)
+        current_user = get_current_user()
 
         if not current_user or not current_user.is_admin:
             return {'error': 'Admin privileges required'}, 403
@@ -44,9 +57,10 @@ class UserList(Resource):
         if not is_valid_email(user_data["email"]):
             return {"error": "Invalid email"}, 400
 
-        hashed_password = bcrypt.generate_password_hash(
-            user_data['password']).decode('utf-8')
-        user_data['password'] = hashed_password
+        try:
+            user_data['password'] = password_hasher.hash(user_data['password'])
+        except PasswordHasherBusy:
+            return {'error': 'Server busy, retry later'}, 503, {'Retry-After': '1'}
 
         try:
             new_user = facade.create_user(user_data)
@@ -54,36 +68,66 @@ class UserList(Resource):
         except ValueError:
             return {"error": "Invalid input data"}, 400
             
+    @api.doc(params=dict(FIELDS_DOC, ids='Comma-separated user ids (max {}); '
+                                         'answers {{"items": [...], '
+                                         '"missing": [...]}}'
+                                         .format(MAX_BATCH_IDS)))
     @api.response(200, "OK")
+    @api.response(400, "Bad Request")
     def get(self):
         """Get a list of user"""
-        users = facade.get_all_users()
-        return [user.to_dict() for user in users], 200
+        try:
+            selected = USER_FIELDS.parse()
+            ids = parse_ids()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        if ids is not None:
+            users, missing = facade.get_users_by_ids(ids)
+            return batch_response(
+                users, missing,
+                lambda user: USER_FIELDS.render(user, selected)), 200
+        if selected is None:
+            users = facade.get_all_users()
+            return [user.to_dict() for user in users], 200
+        users = facade.get_all_users(USER_FIELDS.paths(selected))
+        return [USER_FIELDS.render(user, selected) for user in users], 200
              
 
 @api.route("/<user_id>")
 class UserRessource(Resource):
+    @api.doc(params=FIELDS_DOC)
     @api.response(200, "User details retrieved successfully")
+    @api.response(400, "Bad Request")
     @api.response(404, "Not found")
     def get(self, user_id):
         """Get user details by ID"""
-        user = facade.get_user(user_id)
+        try:
+            selected = USER_FIELDS.parse()
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        if selected is None:
+            user = facade.get_user(user_id)
+            if not user:
+                return {"error": "User not found"}, 404
+            return user.to_dict(), 200
+        user = facade.get_user(user_id, USER_FIELDS.paths(selected))
         if not user:
             return {"error": "User not found"}, 404
-        return user.to_dict(), 200
+        return USER_FIELDS.render(user, selected), 200
     
     @api.response(200, "OK")
     @api.response(400, "Bad Request")
     @api.response(403, "Unauthorized action")
     @api.response(404, "Not Found")
     @api.response(409, "Conflict")
+    @api.response(503, "Password hashing saturated")
     @api.expect(user_model, validate=False)
     @jwt_required()
     def put(self, user_id):
         """Update the data of user (admin: tout, user: limité)"""
         current_user_id = get_jwt_identity()
         
-        current_user = facade.get_user(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return {'error': 'Invalid user'}, 401
@@ -112,9 +156,10 @@ class UserRessource(Resource):
                     return {'error': 'Email already in use'}, 409
             
             if "password" in data:
-                hashed_password = bcrypt.generate_password_hash(
-                    data['password']).decode('utf-8')
-                data['password'] = hashed_password
+                try:
+                    data['password'] = password_hasher.hash(data['password'])
+                except PasswordHasherBusy:
+                    return {'error': 'Server busy, retry later'}, 503, {'Retry-After': '1'}
 
         try:
             updated_user = facade.put_user(user_id, data)
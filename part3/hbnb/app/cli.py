@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""`flask hbnb ...` management commands."""
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+
+hbnb_cli = AppGroup('hbnb', help='HBnB management commands.')
+
+
+@hbnb_cli.command('import')
+@click.option('--users', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of users.')
+@click.option('--amenities', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of amenities.')
+@click.option('--places', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of places.')
+@click.option('--reviews', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of reviews.')
+@click.option('--chunk-size', default=5000, show_default=True,
+              help='Rows inserted per transaction.')
+@click.option('--max-errors', default=20, show_default=True,
+              help='Rejected rows printed per file.')
+def import_command(users, amenities, places, reviews, chunk_size,
+                   max_errors):
+    """Bulk load entities from NDJSON (.ndjson/.jsonl) or CSV files.
+
+    Files are loaded in dependency order (users, amenities, places,
+    reviews) so foreign keys can point at rows from earlier files.
+    """
+    from app.services import facade
+    from app.services.importer import BulkImporter, ENTITIES, read_rows
+
+    paths = {'users': users, 'amenities': amenities,
+             'places': places, 'reviews': reviews}
+    importer = BulkImporter(facade, chunk_size=chunk_size)
+    for entity in ENTITIES:
+        if not paths[entity]:
+            continue
+        try:
+            report = importer.run(entity, read_rows(paths[entity]))
+        except IntegrityError as e:
+            raise click.ClickException(
+                '{}: chunk rejected by the database: {}'.format(
+                    entity, e.orig))
+        click.echo('{}: {} imported, {} rejected'.format(
+            entity, report.imported, len(report.errors)))
+        for number, message in report.errors[:max_errors]:
+            click.echo('  line {}: {}'.format(number, message), err=True)
+
+
+@hbnb_cli.command('export')
+@click.argument('entity', type=click.Choice(['users', 'places', 'reviews']))
+@click.option('--output', '-o', default='-', show_default=True,
+              help='File to write, "-" for stdout.')
+@click.option('--gzip', 'compress', is_flag=True,
+              help='Gzip the output.')
+@click.option('--updated-since', type=click.DateTime(),
+              help='Only export rows updated since this timestamp.')
+def export_command(entity, output, compress, updated_since):
+    """Stream users, places or reviews as NDJSON."""
+    from app.services import facade
+    from app.services.exporter import iter_gzip, iter_ndjson
+
+    chunks = iter_ndjson(facade.export_records(entity, updated_since))
+    if compress:
+        chunks = iter_gzip(chunks)
+    with click.open_file(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+@hbnb_cli.command('rebuild-ratings')
+def rebuild_ratings_command():
+    """Recompute the rating aggregates of every place from its reviews."""
+    from app.services import facade
+
+    count = facade.rebuild_rating_aggregates()
+    click.echo('Rating aggregates rebuilt ({} places repaired)'
+               .format(count))
+
+
+@hbnb_cli.command('migrate-ids')
+@click.option('--batch-size', default=10000, show_default=True,
+              help='Rows converted per transaction.')
+@click.option('--vacuum', is_flag=True,
+              help='Rebuild the file afterwards to reclaim the freed pages.')
+def migrate_ids_command(batch_size, vacuum):
+    """Convert text UUID keys of a SQLite database to 16-byte blobs."""
+    from app import db
+    from app.services.id_migration import migrate_ids
+
+    def progress(table, count):
+        click.echo('  {}: {} rows'.format(table, count), err=True)
+
+    db.session.remove()
+    with db.engine.connect() as connection:
+        try:
+            converted = migrate_ids(connection, batch_size, progress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if vacuum:
+            connection.execution_options(
+                isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
+    for table, count in converted.items():
+        click.echo('{}: {} rows converted'.format(table, count))
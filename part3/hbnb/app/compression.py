@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Negotiated gzip/brotli compression of API responses.
+
+Responses of a compressible type and at least COMPRESS_MIN_SIZE bytes
+are encoded with the best coding the client accepts: brotli when the
+`brotli` package is installed, else gzip. Smaller bodies are sent as is,
+since the framing overhead outweighs the gain.
+
+GET responses carrying an ETag (see app.api.v1.conditional) are stored
+compressed in an LRU keyed by ETag and coding, so polling clients that
+get a 200 again do not pay for compressing the same body twice.
+"""
+
+import gzip
+from flask import current_app, request
+from app.object_cache import LRUBackend
+
+try:
+    import brotli as _brotli
+except ImportError:  # Optional, gzip is always available
+    _brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson',
+                          'text/html', 'text/plain', 'text/css',
+                          'application/javascript'}
+
+
+def _compress(data, coding, config):
+    if coding == 'br':
+        return _brotli.compress(data, quality=config['COMPRESS_BROTLI_LEVEL'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'],
+                         mtime=0)
+
+
+def negotiate(accept_encodings):
+    """Return the preferred supported coding ('br' or 'gzip') or None."""
+    offered = ['br', 'gzip'] if _brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def compress_response(response):
+    """after_request hook compressing eligible responses in place."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    config = current_app.config
+    coding = negotiate(request.accept_encodings)
+    if coding is None or (response.content_length or 0) < \
+            config['COMPRESS_MIN_SIZE']:
+        return response
+
+    cache = current_app.extensions['compression_cache']
+    etag = response.headers.get('ETag')
+    key = None
+    if request.method == 'GET' and etag:
+        key = '{}:{}'.format(coding, etag)
+        body = cache.get(key)
+    else:
+        body = None
+    if body is None:
+        body = _compress(response.get_data(), coding, config)
+        if key is not None:
+            cache.set(key, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = coding
+    return response
+
+
+def init_compression(app):
+    """Register the compression hook and its cache on the app."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_LEVEL', 5)
+    app.config.setdefault('COMPRESS_CACHE_SIZE', 256)
+    app.extensions['compression_cache'] = LRUBackend(
+        app.config['COMPRESS_CACHE_SIZE'])
+    app.after_request(compress_response)
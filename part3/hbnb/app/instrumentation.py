@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Per-request SQL statistics and slow query logging.
+
+Every statement executed through SQLAlchemy is timed with engine events.
+During a request the count, total time and slowest statements are kept
+in `flask.g` and sent back in a Server-Timing header. Statements slower
+than SLOW_QUERY_THRESHOLD_MS are written to the `hbnb.slow_query` logger
+as one JSON object per line.
+"""
+
+import heapq
+import json
+import logging
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger('hbnb.slow_query')
+
+
+class QueryStats:
+    """Statements executed while handling one request."""
+
+    def __init__(self, keep=3):
+        self.count = 0
+        self.total_ms = 0.0
+        self.keep = keep
+        self._slowest = []
+
+    def record(self, statement, duration_ms):
+        """Account for one executed statement."""
+        self.count += 1
+        self.total_ms += duration_ms
+        entry = (duration_ms, self.count, statement)
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        """List of (duration_ms, statement), slowest first."""
+        return [(duration, statement) for duration, _, statement
+                in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self):
+        """Format the statistics as a Server-Timing header value."""
+        value = 'db;dur={:.2f};desc="{} queries"'.format(
+            self.total_ms, self.count)
+        if self._slowest:
+            value += ', db-slowest;dur={:.2f}'.format(self.slowest[0][0])
+        return value
+
+
+def get_query_stats():
+    """Return the statistics of the current request, or None."""
+    if not has_request_context():
+        return None
+    return g.get('_query_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('_query_start', []).append(
+        (cursor, time.perf_counter()))
+
+
+def _handle_error(exception_context):
+    """Drop the start of a statement that raised, which has no after event.
+
+    Errors raised before the cursor executed (e.g. while binding the
+    parameters) pushed nothing: the entry is popped only if it belongs
+    to the cursor of the failing execution.
+    """
+    context = exception_context.execution_context
+    conn = exception_context.connection
+    if context is None or conn is None:
+        return
+    starts = conn.info.get('_query_start')
+    if starts and starts[-1][0] is context.cursor:
+        starts.pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()[1]) * 1000
+
+    stats = get_query_stats()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+
+    if not has_app_context():
+        return
+    threshold = current_app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold is not None and duration_ms >= threshold:
+        entry = {
+            'duration_ms': round(duration_ms, 3),
+            'statement': statement,
+            'executemany': executemany,
+        }
+        if has_request_context():
+            entry['method'] = request.method
+            entry['path'] = request.path
+        slow_query_logger.warning(json.dumps(entry))
+
+
+def init_query_stats(app):
+    """Hook SQL statistics into the engine events and the app's requests."""
+    if not event.contains(Engine, 'before_cursor_execute',
+                          _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_query_stats():
+        g._query_stats = QueryStats(app.config.get('SLOWEST_QUERIES_KEPT', 3))
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = get_query_stats()
+        if stats is not None:
+            response.headers.add('Server-Timing', stats.server_timing())
+        return response
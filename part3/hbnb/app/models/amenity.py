@@ -4,20 +4,35 @@ from .basemodel import BaseModel
 from app import db, bcrypt
 import uuid
 from sqlalchemy.orm import validates, relationship
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Integer, String
 from app.models.place import place_amenity
 
+# Bits available in Place.amenity_mask (a signed 64-bit integer)
+MAX_AMENITY_BITS = 63
+
 class Amenity(BaseModel):
 
     __tablename__ = 'amenities'
 
     name = Column(String(50), nullable=False)
+    # Position of the amenity in Place.amenity_mask, None once all bits
+    # are taken (such amenities are filtered through place_amenity)
+    bit = Column(Integer, unique=True, index=True)
 
     @validates('name')
     def validate_name(self, key, value):
         if not value or len(value) > 50:
             raise ValueError("invalid name")
-        return value    
+        return value
+
+    @validates('bit')
+    def validate_bit(self, key, value):
+        if value is not None and (not isinstance(value, int)
+                                  or not 0 <= value < MAX_AMENITY_BITS):
+            raise ValueError("bit must be between 0 and {}"
+                             .format(MAX_AMENITY_BITS - 1))
+        return value
+
     def to_dict(self,):
         return {
             "id": self.id,
@@ -5,7 +5,8 @@ from app import db
 import uuid
 from datetime import datetime
 from flask import Flask
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, DateTime
+from app.models.types import BinaryUUID
 
 class BaseModel(db.Model):
     """Base class for all models.
@@ -17,9 +18,9 @@ class BaseModel(db.Model):
     """
     __abstract__ = True
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(BinaryUUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified."""
@@ -3,14 +3,36 @@
 
 from .basemodel import BaseModel
 from app import db, bcrypt
+import math
 import uuid
 from sqlalchemy.orm import validates, relationship, backref
-from sqlalchemy import ForeignKey, Column, Integer, Float, String, Table
+from sqlalchemy import ForeignKey, Column, BigInteger, Integer, Float, String, Table, event
+from app.models.types import BinaryUUID
+
+# Size in degrees of the cells of the spatial grid index
+GRID_CELL_DEG = 0.1
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEG))
+
+
+def grid_cell(latitude, longitude):
+    """Return the number of the grid cell holding a coordinate.
+
+    Cells are numbered row by row from the south-west corner, so the
+    cells of one latitude row form a contiguous range of numbers.
+    """
+    row = int(math.floor((latitude + 90.0) / GRID_CELL_DEG))
+    column = int(math.floor((longitude + 180.0) / GRID_CELL_DEG))
+    return row * GRID_COLUMNS + min(column, GRID_COLUMNS - 1)
+
+
+def _default_grid_cell(context):
+    params = context.get_current_parameters()
+    return grid_cell(params['latitude'], params['longitude'])
 
 place_amenity = db.Table(
     'place_amenity',
-    db.Column('place_id', db.String(36), db.ForeignKey('places.id'), primary_key=True),
-    db.Column('amenity_id', db.String(36), db.ForeignKey('amenities.id'), primary_key=True)
+    db.Column('place_id', BinaryUUID, db.ForeignKey('places.id'), primary_key=True),
+    db.Column('amenity_id', BinaryUUID, db.ForeignKey('amenities.id'), primary_key=True)
 )
 
 class Place(BaseModel):
@@ -25,18 +47,43 @@ class Place(BaseModel):
         owner (User): User who owns the place
         reviews (list): List of Review objects for this place
         amenities (list): List of Amenity objects for this place
+        grid_cell (int): Spatial grid cell of (latitude, longitude),
+            indexed for proximity searches
+        amenity_mask (int): Bitset of the place's amenities, one bit per
+            Amenity.bit, for AND-filters without joins
+        review_count (int): Number of reviews of the place
+        rating_sum (int): Sum of the ratings of those reviews
+        rating_avg (float): Average rating, 0 without reviews
+        rating_1 .. rating_5 (int): Number of reviews per rating
     """
     __tablename__ = 'places'
+    __table_args__ = (
+        db.Index('ix_places_created_at_id', 'created_at', 'id'),
+        db.Index('ix_places_price_id', 'price', 'id'),
+        db.Index('ix_places_rating_avg_id', 'rating_avg', 'id'),
+    )
 
     title = Column(String(100), nullable=False)
     description = Column(String())
     price = Column(Float, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
-    owner_id = Column(String(36), ForeignKey('users.id'), nullable=False)
+    owner_id = Column(BinaryUUID, ForeignKey('users.id'), nullable=False)
     reviews = relationship('Review', backref='place', lazy=True)
     amenities = relationship('Amenity', secondary=place_amenity, lazy='subquery', backref=backref('places', lazy=True))
     image = Column(String(), nullable=True)
+    grid_cell = Column(Integer, nullable=False, index=True,
+                       default=_default_grid_cell)
+    amenity_mask = Column(BigInteger, nullable=False, default=0)
+    # Rating aggregates, maintained by the facade with each review change
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_avg = Column(Float, nullable=False, default=0.0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
 
     def add_review(self, review):
         """Add a review to the place."""
@@ -45,6 +92,19 @@ class Place(BaseModel):
     def add_amenity(self, amenity):
         """Add an amenity to the place."""
         self.amenities.append(amenity)
+        if amenity.bit is not None:
+            self.amenity_mask = (self.amenity_mask or 0) | (1 << amenity.bit)
+
+    @property
+    def rating_histogram(self):
+        """Number of reviews per rating, keyed "1" to "5"."""
+        return {str(rating): getattr(self, 'rating_{}'.format(rating)) or 0
+                for rating in range(1, 6)}
+
+    def clear_amenities(self):
+        """Remove every amenity from the place."""
+        self.amenities = []
+        self.amenity_mask = 0
 
     @validates('title')
     def validate_title(self, key, value):
@@ -124,3 +184,9 @@ class Place(BaseModel):
         if not (-180.0 <= longitude_float <= 180.0):
             raise ValueError("Longitude must be between -180.0 and 180.0")
         return longitude_float
+
+
+@event.listens_for(Place, 'before_update')
+def _update_grid_cell(mapper, connection, target):
+    """Keep the grid cell in sync when a place moves."""
+    target.grid_cell = grid_cell(target.latitude, target.longitude)
@@ -6,6 +6,7 @@ from app import db, bcrypt
 import uuid
 from sqlalchemy.orm import validates, relationship, backref
 from sqlalchemy import ForeignKey, Column, Integer, String
+from app.models.types import BinaryUUID
 
 class Review(BaseModel):
     """Represents a review for a place.
@@ -17,11 +18,19 @@ class Review(BaseModel):
         user (User): User who wrote the review
     """
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Covers the max(updated_at)/count checks of a place's reviews
+        db.Index('ix_reviews_place_id_updated_at',
+                 'place_id', 'updated_at', 'user_id'),
+        # A user reviews a place at most once
+        db.Index('uq_reviews_user_id_place_id', 'user_id', 'place_id',
+                 unique=True),
+    )
 
     text = Column(String(), nullable=False)
     rating = Column(Integer, nullable=False)
-    place_id = Column(String(36), ForeignKey('places.id'), nullable=False)
-    user_id = Column(String(36), ForeignKey('users.id'), nullable=False)
+    place_id = Column(BinaryUUID, ForeignKey('places.id'), nullable=False)
+    user_id = Column(BinaryUUID, ForeignKey('users.id'), nullable=False)
     
 
     @validates('text')
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Column types shared by the models."""
+
+import uuid
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+def parse_uuid(value):
+    """Return the uuid.UUID written in a string id.
+
+    Raises:
+        ValueError: If the value is not a UUID
+    """
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(value)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("Invalid id: {!r}".format(value))
+
+
+def is_uuid(value):
+    """Tell whether a value is a UUID or a string holding one."""
+    try:
+        parse_uuid(value)
+    except ValueError:
+        return False
+    return True
+
+
+class BinaryUUID(TypeDecorator):
+    """UUID stored in 16 bytes and presented as its canonical string.
+
+    PostgreSQL uses its native UUID type, MySQL BINARY(16), other
+    databases a BLOB. Keys, foreign keys and their indexes hold 16 bytes
+    instead of 36 characters.
+
+    Binding a value that is not a UUID raises ValueError (wrapped in a
+    StatementError by SQLAlchemy): lookups of ids coming from requests
+    are checked with is_uuid first.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        if dialect.name in ('mysql', 'mariadb'):
+            return dialect.type_descriptor(mysql.BINARY(16))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        parsed = parse_uuid(value)
+        if dialect.name == 'postgresql':
+            return str(parsed)
+        return parsed.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if isinstance(value, str):
+            return str(uuid.UUID(value))
+        return str(uuid.UUID(bytes=bytes(value)))
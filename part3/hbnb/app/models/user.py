@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from app import db, bcrypt
+from app import db, bcrypt, password_hasher
 import uuid
 from sqlalchemy.orm import validates, relationship, backref
 from .basemodel import BaseModel
@@ -63,8 +63,12 @@ class User(BaseModel):
     
     def hash_password(self, password):
         """Hashes the password before storing it."""
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash(password)
     
     def verify_password(self, password):
         """Verifies if the provided password matches the hashed password."""
-        return bcrypt.check_password_hash(self.password, password)
\ No newline at end of file
+        return password_hasher.verify(password, self.password)
+
+    def password_needs_rehash(self):
+        """Tells if the hash uses an older scheme or cost setting."""
+        return password_hasher.needs_rehash(self.password)
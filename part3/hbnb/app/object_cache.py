@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Read-through cache for rendered objects such as place details.
+
+Entries are stored under `<kind>:<generation>:<id>:<version>`. The
+version is a random token kept next to the entries; invalidating an
+object replaces its token, so a value computed from stale rows by a
+concurrent reader lands under a key nobody reads any more, even on a
+shared backend. Replacing the generation drops every object of a kind.
+
+Backends (OBJECT_CACHE_BACKEND):
+    'lru'   - in-process, bounded by OBJECT_CACHE_SIZE entries (default)
+    'redis' - out of process at OBJECT_CACHE_URL, needs the redis package
+    'null'  - caching disabled
+
+Any object with redis-style `get`, `set` and `delete` methods working
+on bytes can also be passed to `init_app(app, client=...)`.
+"""
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from flask import current_app
+
+try:
+    import redis as _redis
+except ImportError:  # Only needed for the 'redis' backend
+    _redis = None
+
+
+class LRUBackend:
+    """Thread-safe in-process mapping holding at most `size` entries."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ClientBackend:
+    """Store JSON encoded values in an out-of-process key/value client."""
+
+    def __init__(self, client, prefix='hbnb:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value).encode('utf-8'))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class NullBackend:
+    """Backend that never stores anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class ObjectCache:
+    """Flask extension caching rendered objects by kind, id and version."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, client=None):
+        app.config.setdefault('OBJECT_CACHE_BACKEND', 'lru')
+        app.config.setdefault('OBJECT_CACHE_SIZE', 2048)
+        app.config.setdefault('OBJECT_CACHE_URL', 'redis://localhost:6379/0')
+        if client is not None:
+            backend = ClientBackend(client)
+        else:
+            backend = self._make_backend(app.config)
+        app.extensions['object_cache'] = (backend, _Stats())
+
+    @staticmethod
+    def _make_backend(config):
+        name = config['OBJECT_CACHE_BACKEND']
+        if name == 'lru':
+            return LRUBackend(config['OBJECT_CACHE_SIZE'])
+        if name == 'null':
+            return NullBackend()
+        if name == 'redis':
+            if _redis is None:
+                raise RuntimeError("OBJECT_CACHE_BACKEND 'redis' requires "
+                                   "the redis package")
+            return ClientBackend(_redis.Redis.from_url(
+                config['OBJECT_CACHE_URL']))
+        raise ValueError("Unknown OBJECT_CACHE_BACKEND: {}".format(name))
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['object_cache']
+
+    @staticmethod
+    def _token(backend, key):
+        """Return the token stored under `key`, creating it if missing."""
+        token = backend.get(key)
+        if token is None:
+            token = uuid.uuid4().hex
+            backend.set(key, token)
+        return token
+
+    def _key(self, backend, kind, object_id):
+        generation = self._token(backend, '{}:generation'.format(kind))
+        version = self._token(backend, '{}:{}:version'.format(kind, object_id))
+        return '{}:{}:{}:{}'.format(kind, generation, object_id, version)
+
+    def get_or_load(self, kind, object_id, loader):
+        """Return the cached value of an object, computing it on a miss.
+
+        `loader()` must return a JSON serialisable value; exceptions it
+        raises propagate and nothing is cached.
+        """
+        backend, stats = self._state()
+        key = self._key(backend, kind, object_id)
+        value = backend.get(key)
+        if value is not None:
+            stats.count('hits')
+            return value
+        stats.count('misses')
+        value = loader()
+        backend.set(key, value)
+        return value
+
+    def invalidate(self, kind, *object_ids):
+        """Drop the cached values of some objects."""
+        backend, stats = self._state()
+        for object_id in object_ids:
+            backend.delete(self._key(backend, kind, object_id))
+            backend.set('{}:{}:version'.format(kind, object_id),
+                        uuid.uuid4().hex)
+            stats.count('invalidations')
+
+    def invalidate_all(self, kind):
+        """Drop the cached values of every object of a kind."""
+        backend, stats = self._state()
+        backend.set('{}:generation'.format(kind), uuid.uuid4().hex)
+        stats.count('invalidations')
+
+    def metrics(self):
+        """Return hit/miss counters and the hit ratio."""
+        backend, stats = self._state()
+        lookups = stats.hits + stats.misses
+        metrics = {
+            'backend': type(backend).__name__,
+            'hits': stats.hits,
+            'misses': stats.misses,
+            'invalidations': stats.invalidations,
+            'hit_ratio': round(stats.hits / lookups, 3) if lookups else 0.0,
+        }
+        if isinstance(backend, LRUBackend):
+            metrics['size'] = len(backend)
+            metrics['evictions'] = backend.evictions
+        return metrics
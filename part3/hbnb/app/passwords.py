@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Bounded worker pool for password hashing and verification.
+
+bcrypt and argon2 release the GIL while they work, so a small thread
+pool hashes in parallel with the rest of the application. The request
+thread still waits for its own hash. The number of hashes waiting or
+running is capped: once PASSWORD_HASH_MAX_PENDING is reached, a new
+request waits at most PASSWORD_HASH_WAIT_TIMEOUT seconds for a slot,
+then fails with PasswordHasherBusy instead of piling up behind a login
+storm. An admitted request has at most PASSWORD_HASH_MAX_PENDING - 1
+hashes ahead of it.
+
+New hashes use PASSWORD_HASH_SCHEME ('bcrypt' or 'argon2id'); existing
+hashes are verified with the scheme named by their prefix, so both can
+coexist while users are migrated on login (see needs_rehash).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt as _bcrypt
+from flask import current_app
+
+try:
+    import argon2 as _argon2
+except ImportError:  # argon2-cffi is only needed for the argon2id scheme
+    _argon2 = None
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+ARGON2ID_PREFIX = '$argon2id$'
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashes are already queued."""
+
+
+def hash_scheme(hashed):
+    """Return the scheme of a stored hash, from its prefix, or None."""
+    if hashed.startswith(ARGON2ID_PREFIX):
+        return 'argon2id'
+    if hashed.startswith(BCRYPT_PREFIXES):
+        return 'bcrypt'
+    return None
+
+
+def _argon2_hasher(settings):
+    return _argon2.PasswordHasher(
+        time_cost=settings['argon2_time_cost'],
+        memory_cost=settings['argon2_memory_cost'],
+        parallelism=settings['argon2_parallelism'],
+        type=_argon2.Type.ID)
+
+
+def _hash(password, settings):
+    if settings['scheme'] == 'argon2id':
+        return _argon2_hasher(settings).hash(password)
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    rounds = settings['bcrypt_rounds']
+    return _bcrypt.hashpw(password, _bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, hashed):
+    scheme = hash_scheme(hashed)
+    if scheme == 'argon2id':
+        if _argon2 is None:
+            return False
+        try:
+            return _argon2.PasswordHasher().verify(hashed, password)
+        except _argon2.exceptions.VerificationError:
+            return False
+        except _argon2.exceptions.InvalidHashError:
+            return False
+    if scheme != 'bcrypt':
+        return False
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    try:
+        return _bcrypt.checkpw(password, hashed.encode('utf-8'))
+    except ValueError:
+        return False
+
+
+class _HasherPool:
+    """Executor plus the counters reported by PasswordHasher.metrics."""
+
+    def __init__(self, workers, max_pending, wait_timeout):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='password-hash')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def try_submit(self, func, *args):
+        """Queue a job without waiting, or return None if the pool is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.pending += 1
+
+        def job():
+            try:
+                return self._timed(func, *args)
+            finally:
+                with self._lock:
+                    self.pending -= 1
+                self._slots.release()
+        return self.executor.submit(job)
+
+    def run(self, func, *args):
+        """Run a job on the pool and wait for its result.
+
+        Waits up to wait_timeout for a slot, then raises
+        PasswordHasherBusy; once queued, blocks until the job is done.
+        """
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations queued")
+        with self._lock:
+            self.pending += 1
+        try:
+            return self.executor.submit(self._timed, func, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+    def _timed(self, func, *args):
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.busy_seconds += elapsed
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queue_depth': self.pending - self.running,
+                'running': self.running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_ms': round(1000 * self.busy_seconds / self.completed, 3)
+                if self.completed else 0.0,
+            }
+
+
+class PasswordHasher:
+    """Flask extension hashing and checking passwords on a worker pool."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_SCHEME', 'bcrypt')
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        app.config.setdefault('ARGON2_TIME_COST', 2)
+        app.config.setdefault('ARGON2_MEMORY_COST', 19456)
+        app.config.setdefault('ARGON2_PARALLELISM', 1)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 4)
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 64)
+        app.config.setdefault('PASSWORD_HASH_WAIT_TIMEOUT', 0.5)
+        scheme = app.config['PASSWORD_HASH_SCHEME']
+        if scheme not in ('bcrypt', 'argon2id'):
+            raise ValueError("Unknown PASSWORD_HASH_SCHEME: {}".format(scheme))
+        if scheme == 'argon2id' and _argon2 is None:
+            raise RuntimeError("PASSWORD_HASH_SCHEME 'argon2id' requires "
+                               "the argon2-cffi package")
+        app.extensions['password_hasher'] = _HasherPool(
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_MAX_PENDING'],
+            app.config['PASSWORD_HASH_WAIT_TIMEOUT'])
+
+    @staticmethod
+    def _pool():
+        return current_app.extensions['password_hasher']
+
+    @staticmethod
+    def _settings():
+        config = current_app.config
+        return {
+            'scheme': config['PASSWORD_HASH_SCHEME'],
+            'bcrypt_rounds': config['BCRYPT_LOG_ROUNDS'],
+            'argon2_time_cost': config['ARGON2_TIME_COST'],
+            'argon2_memory_cost': config['ARGON2_MEMORY_COST'],
+            'argon2_parallelism': config['ARGON2_PARALLELISM'],
+        }
+
+    def hash(self, password):
+        """Hash a password with the app's scheme and cost settings.
+
+        Raises:
+            PasswordHasherBusy: If no slot frees up within
+                PASSWORD_HASH_WAIT_TIMEOUT
+        """
+        return self._pool().run(_hash, password, self._settings())
+
+    def verify(self, password, hashed):
+        """Check a password against a bcrypt or argon2id hash.
+
+        Raises:
+            PasswordHasherBusy: If no slot frees up within
+                PASSWORD_HASH_WAIT_TIMEOUT
+        """
+        if not hashed:
+            return False
+        return self._pool().run(_verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """Tell whether a hash was made with another scheme or cost."""
+        settings = self._settings()
+        if hash_scheme(hashed) != settings['scheme']:
+            return True
+        if settings['scheme'] == 'argon2id':
+            return _argon2_hasher(settings).check_needs_rehash(hashed)
+        return int(hashed.split('$')[2]) != settings['bcrypt_rounds']
+
+    def rehash_in_background(self, password, on_done):
+        """Hash a password again without making the caller wait.
+
+        `on_done(new_hash)` is called from the worker inside an app
+        context. Nothing happens if the pool is saturated; the rehash
+        will be attempted again at the next login.
+
+        Returns:
+            Future: The pending job, or None if it was not queued
+        """
+        app = current_app._get_current_object()
+        settings = self._settings()
+
+        def job():
+            new_hash = _hash(password, settings)
+            with app.app_context():
+                return on_done(new_hash)
+        return self._pool().try_submit(job)
+
+    def metrics(self):
+        """Return queue depth, throughput and rejection counters."""
+        return self._pool().metrics()
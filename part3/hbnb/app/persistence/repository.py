@@ -1,6 +1,42 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.orm import lazyload
+from app.models.types import is_uuid
 from app import db  # Assuming you have set up SQLAlchemy in your Flask app
 
+
+def encode_cursor(obj, sort='created_at'):
+    """Build an opaque pagination cursor from an object's sort key."""
+    value = getattr(obj, sort.lstrip('-'))
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, obj.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, sort='created_at'):
+    """Return the (sort value, id) key stored in a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for
+            another sort order
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        cursor_sort, value, obj_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError
+        if sort.lstrip('-') in ('created_at', 'updated_at'):
+            value = datetime.fromisoformat(value)
+        return value, obj_id
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
 class Repository(ABC):
     @abstractmethod
     def add(self, obj):
@@ -10,6 +46,16 @@ class Repository(ABC):
     def get(self, obj_id):
         pass
 
+    @abstractmethod
+    def get_many(self, obj_ids):
+        """Fetch several objects at once.
+
+        Returns:
+            tuple: (objects in the order of obj_ids, ids not found),
+            duplicate ids are only returned once
+        """
+        pass
+
     @abstractmethod
     def get_all(self):
         pass
@@ -27,59 +73,431 @@ class Repository(ABC):
         pass
 
 
-class InMemoryRepository(Repository):
+class Range(namedtuple('Range', 'low high')):
+    """Inclusive bounds for find_by; None leaves a side open."""
+
+    def __contains__(self, value):
+        return (value is not None
+                and (self.low is None or value >= self.low)
+                and (self.high is None or value <= self.high))
+
+
+class _Above:
+    """Sorts after any id, so (value, _ABOVE) bounds the pairs of a value."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_ABOVE = _Above()
+
+
+class _RangeIndex:
+    """(value, id) pairs of one attribute, kept sorted for range queries.
+
+    The pairs live in sorted buckets of at most 2 * LOAD items, so an
+    insertion or removal only shifts one bucket instead of the whole
+    list, which stays cheap at millions of objects.
+    """
+    LOAD = 1000
+
     def __init__(self):
+        self._buckets = []
+        self._maxes = []
+
+    def add(self, value, obj_id):
+        pair = (value, obj_id)
+        if not self._buckets:
+            self._buckets.append([pair])
+            self._maxes.append(pair)
+            return
+        position = bisect_left(self._maxes, pair)
+        if position == len(self._maxes):
+            position -= 1
+            bucket = self._buckets[position]
+            bucket.append(pair)
+            self._maxes[position] = pair
+        else:
+            bucket = self._buckets[position]
+            insort(bucket, pair)
+        if len(bucket) > 2 * self.LOAD:
+            half = bucket[self.LOAD:]
+            del bucket[self.LOAD:]
+            self._buckets.insert(position + 1, half)
+            self._maxes[position] = bucket[-1]
+            self._maxes.insert(position + 1, half[-1])
+
+    def remove(self, value, obj_id):
+        pair = (value, obj_id)
+        position = bisect_left(self._maxes, pair)
+        bucket = self._buckets[position]
+        del bucket[bisect_left(bucket, pair)]
+        if not bucket:
+            del self._buckets[position]
+            del self._maxes[position]
+        else:
+            self._maxes[position] = bucket[-1]
+
+    def select(self, low, high):
+        """(count, function returning the ids) of the values in [low, high]."""
+        buckets = self._buckets
+        if low is None:
+            first, start = 0, 0
+        else:
+            first = bisect_left(self._maxes, (low,))
+            start = (bisect_left(buckets[first], (low,))
+                     if first < len(buckets) else 0)
+        if high is None:
+            last = len(buckets) - 1
+            stop = len(buckets[last]) if buckets else 0
+        else:
+            last = min(bisect_right(self._maxes, (high, _ABOVE)),
+                       len(buckets) - 1)
+            stop = (bisect_right(buckets[last], (high, _ABOVE))
+                    if buckets else 0)
+        if first > last or (first == last and start >= stop):
+            return 0, lambda: []
+        count = (sum(map(len, buckets[first:last])) - start + stop)
+
+        def ids():
+            for position in range(first, last + 1):
+                bucket = buckets[position]
+                begin = start if position == first else 0
+                end = stop if position == last else len(bucket)
+                for _, obj_id in bucket[begin:end]:
+                    yield obj_id
+        return count, ids
+
+
+class InMemoryRepository(Repository):
+    """Repository keeping the objects in a dict keyed by id.
+
+    Attributes can be indexed so that lookups do not scan every object:
+        unique  - value -> object, adding a second object with the same
+                  value raises ValueError (e.g. users' email)
+        indexes - value -> objects having it
+        ranges  - values kept sorted for Range queries (e.g. price)
+    Indexes follow add, update and delete; code changing an indexed
+    attribute of a stored object directly must call reindex(obj_id).
+    None values are not indexed.
+    """
+    def __init__(self, unique=(), indexes=(), ranges=()):
         self._storage = {}
+        self._unique = {name: {} for name in unique}
+        self._indexes = {name: {} for name in indexes}
+        self._ranges = {name: _RangeIndex() for name in ranges}
+        self._indexed = tuple(dict.fromkeys((*unique, *indexes, *ranges)))
+        # id -> values of the indexed attributes when last indexed
+        self._keys = {}
+
+    def _values(self, obj):
+        return tuple([getattr(obj, name, None) for name in self._indexed])
+
+    def _check_unique(self, obj_id, pairs):
+        """Raise ValueError if a (name, value) pair is another object's."""
+        for name, value in pairs:
+            index = self._unique.get(name)
+            if (index is not None and value is not None
+                    and index.get(value, obj_id) != obj_id):
+                raise ValueError("{} {} is already used".format(name, value))
+
+    def _index(self, obj_id, keys):
+        for name, value in zip(self._indexed, keys):
+            if value is None:
+                continue
+            if name in self._unique:
+                self._unique[name][value] = obj_id
+            if name in self._indexes:
+                self._indexes[name].setdefault(value, {})[obj_id] = None
+            if name in self._ranges:
+                self._ranges[name].add(value, obj_id)
+        self._keys[obj_id] = keys
+
+    def _unindex(self, obj_id):
+        for name, value in zip(self._indexed, self._keys.pop(obj_id)):
+            if value is None:
+                continue
+            if name in self._unique:
+                del self._unique[name][value]
+            if name in self._indexes:
+                ids = self._indexes[name][value]
+                del ids[obj_id]
+                if not ids:
+                    del self._indexes[name][value]
+            if name in self._ranges:
+                self._ranges[name].remove(value, obj_id)
+
+    def reindex(self, obj_id):
+        """Bring the indexes up to date after an object changed in place."""
+        obj = self._storage.get(obj_id)
+        if obj is None or not self._indexed:
+            return
+        keys = self._values(obj)
+        if keys != self._keys[obj_id]:
+            self._check_unique(obj_id, zip(self._indexed, keys))
+            self._unindex(obj_id)
+            self._index(obj_id, keys)
 
     def add(self, obj):
+        if self._indexed:
+            keys = self._values(obj)
+            self._check_unique(obj.id, zip(self._indexed, keys))
+            if obj.id in self._keys:
+                self._unindex(obj.id)
+            self._index(obj.id, keys)
         self._storage[obj.id] = obj
 
+    def add_all(self, objs):
+        for obj in objs:
+            self.add(obj)
+
     def get(self, obj_id):
         return self._storage.get(obj_id)
 
+    def get_many(self, obj_ids):
+        found, missing = [], []
+        for obj_id in dict.fromkeys(obj_ids):
+            obj = self._storage.get(obj_id)
+            if obj is None:
+                missing.append(obj_id)
+            else:
+                found.append(obj)
+        return found, missing
+
     def get_all(self):
         return list(self._storage.values())
 
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
-            obj.update(data)
+            self._check_unique(obj_id, data.items())
+            try:
+                obj.update(data)
+            finally:
+                self.reindex(obj_id)
         return obj
 
     def delete(self, obj_id):
         if obj_id in self._storage:
+            if self._indexed:
+                self._unindex(obj_id)
             del self._storage[obj_id]
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next((obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value), None)
+        return next(self._find({attr_name: attr_value}), None)
+
+    def find_by(self, **criteria):
+        """Return the objects matching every criterion.
+
+        A criterion is attr=value, or attr=Range(low, high) for values
+        within inclusive bounds. The candidates come from the most
+        selective index available, the other criteria are checked on
+        them; without a usable index every object is scanned.
+        """
+        return list(self._find(criteria))
+
+    def _lookup(self, name, value):
+        """(candidate count, function returning their ids), or None."""
+        if isinstance(value, Range):
+            if name not in self._ranges:
+                return None
+            return self._ranges[name].select(value.low, value.high)
+        if name in self._unique:
+            obj_id = self._unique[name].get(value)
+            ids = () if obj_id is None else (obj_id,)
+            return len(ids), lambda: ids
+        if name in self._indexes:
+            ids = self._indexes[name].get(value, {})
+            return len(ids), lambda: ids
+        return None
+
+    def _find(self, criteria):
+        lookups = [lookup for lookup in
+                   (self._lookup(name, value)
+                    for name, value in criteria.items())
+                   if lookup is not None]
+        if lookups:
+            _, ids = min(lookups, key=lambda lookup: lookup[0])
+            candidates = [self._storage[obj_id] for obj_id in ids()]
+        else:
+            candidates = self._storage.values()
+        for obj in candidates:
+            if all(getattr(obj, name) in value if isinstance(value, Range)
+                   else getattr(obj, name) == value
+                   for name, value in criteria.items()):
+                yield obj
     
     
 class SQLAlchemyRepository(Repository):
+    """Repository backed by the SQLAlchemy session.
+
+    Writes are only staged in the session; committing is left to the
+    caller's unit of work (see HBnBFacade.transaction).
+    """
     def __init__(self, model):
         self.model = model
 
     def add(self, obj):
         db.session.add(obj)
-        db.session.commit()
+
+    def add_all(self, objs):
+        db.session.add_all(objs)
 
     def get(self, obj_id):
+        if not is_uuid(obj_id):
+            # Ids are stored as UUIDs (see BinaryUUID): nothing matches
+            return None
         return self.model.query.get(obj_id)
 
     def get_all(self):
         return self.model.query.all()
 
+    def get_many(self, obj_ids):
+        """Fetch several objects with one IN query (see Repository)."""
+        obj_ids = list(dict.fromkeys(obj_ids))
+        by_id = self.get_by_ids(obj_ids)
+        return ([by_id[obj_id] for obj_id in obj_ids if obj_id in by_id],
+                [obj_id for obj_id in obj_ids if obj_id not in by_id])
+
+    def get_by_ids(self, obj_ids):
+        """Map id -> object for the given ids, loaded with one IN query.
+
+        Relationships are not loaded; unknown ids are left out.
+        """
+        obj_ids = [obj_id for obj_id in dict.fromkeys(obj_ids)
+                   if is_uuid(obj_id)]
+        if not obj_ids:
+            return {}
+        return {obj.id: obj for obj in self.model.query
+                .options(lazyload('*'))
+                .filter(self.model.id.in_(obj_ids))}
+
+    def group_by_attribute(self, attr_name, values):
+        """Map each value -> objects whose `attr_name` equals it.
+
+        One IN query for all the values, e.g. the reviews of a page of
+        places by place_id. Objects are in creation order.
+        """
+        values = list(dict.fromkeys(values))
+        groups = {value: [] for value in values}
+        if not values:
+            return groups
+        column = getattr(self.model, attr_name)
+        for obj in self.model.query.options(lazyload('*')) \
+                .filter(column.in_(values)) \
+                .order_by(self.model.created_at, self.model.id):
+            groups[getattr(obj, attr_name)].append(obj)
+        return groups
+
+    def select_fields(self, paths, filters=()):
+        """Query returning rows with only the given attribute paths.
+
+        A path is a column name, or 'relation.column' for a column of a
+        many-to-one relationship, which is joined. Rows are keyed by
+        path; no ORM object is built.
+        """
+        columns, joined = [], []
+        for path in dict.fromkeys(paths):
+            if '.' in path:
+                relation, name = path.split('.')
+                attribute = getattr(self.model, relation)
+                if relation not in joined:
+                    joined.append(relation)
+                target = attribute.property.mapper.class_
+                columns.append(getattr(target, name).label(path))
+            else:
+                columns.append(getattr(self.model, path))
+        query = db.session.query(*columns).select_from(self.model)
+        for relation in joined:
+            query = query.join(getattr(self.model, relation))
+        return query.filter(*filters)
+
+    def get_fields(self, obj_id, paths):
+        """Row with only `paths` for one object, or None"""
+        if not is_uuid(obj_id):
+            return None
+        return self.select_fields(paths, [self.model.id == obj_id]).first()
+
+    def get_all_fields(self, paths, filters=()):
+        """Rows with only `paths` for every matching object"""
+        return self.select_fields(paths, filters).all()
+
+    def page(self, limit, after=None, sort='created_at', filters=(),
+             fields=None):
+        """Return one page of objects ordered by (sort column, id).
+
+        Uses keyset pagination: the cursor holds the sort key of the last
+        row already returned, so each page is an index range scan instead
+        of an OFFSET scan.
+
+        Args:
+            limit (int): Maximum number of objects to return
+            after (str): Cursor returned with the previous page, if any
+            sort (str): Column to sort on, prefixed with '-' for
+                descending order
+            filters (iterable): Extra SQL criteria applied to every page
+            fields (list): Attribute paths to select instead of whole
+                objects (see select_fields); the page holds rows then
+
+        Returns:
+            tuple: (objects, next_cursor), next_cursor is None on the last page
+        """
+        descending = sort.startswith('-')
+        column = getattr(self.model, sort.lstrip('-'))
+        if fields is None:
+            query = self.model.query.options(lazyload('*')).filter(*filters)
+        else:
+            query = self.select_fields(
+                list(fields) + ['id', sort.lstrip('-')], filters)
+        if after:
+            value, obj_id = decode_cursor(after, sort)
+            if not is_uuid(obj_id):
+                raise ValueError("Invalid cursor")
+            key = tuple_(column, self.model.id)
+            # Typed like the columns: an untyped id would be bound as
+            # text, which never equals the stored key
+            bound = tuple_(literal(value, column.type),
+                           literal(obj_id, self.model.id.type))
+            if descending:
+                query = query.filter(key < bound)
+            else:
+                query = query.filter(key > bound)
+        if descending:
+            query = query.order_by(column.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(column, self.model.id)
+        objs = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(objs) > limit:
+            objs = objs[:limit]
+            next_cursor = encode_cursor(objs[-1], sort)
+        return objs, next_cursor
+
+    def last_modified(self, filters=()):
+        """Return (max(updated_at), row count) of the matching objects.
+
+        Both aggregates are read from the updated_at index without
+        loading any row. The count catches deletions, which do not move
+        max(updated_at).
+        """
+        return tuple(db.session.execute(
+            select(func.max(self.model.updated_at), func.count())
+            .select_from(self.model).where(*filters)).one())
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
             for key, value in data.items():
                 setattr(obj, key, value)
-            db.session.commit()
+        return obj
 
     def delete(self, obj_id):
         obj = self.get(obj_id)
         if obj:
             db.session.delete(obj)
-            db.session.commit()
 
     def get_by_attribute(self, attr_name, attr_value):
-        return self.model.query.filter(getattr(self.model, attr_name) == attr_value).first()
\ No newline at end of file
+        return self.model.query.filter(getattr(self.model, attr_name) == attr_value).first()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Pluggable JSON serialisation for the API responses.
+
+JSON_SERIALIZER selects the encoder used by the flask-restx resources:
+    'auto'   - orjson when it is installed, else the standard library
+    'orjson' - orjson, an error if it is missing
+    'json'   - the standard library
+
+orjson is several times faster on the large list responses. Values it
+cannot encode (e.g. Decimal) fall back to the standard library, so both
+encoders accept the same inputs.
+"""
+
+import json
+from flask import current_app, make_response
+
+try:
+    import orjson as _orjson
+except ImportError:  # Optional, the standard library is the fallback
+    _orjson = None
+
+
+def stdlib_dumps(data, indent=None):
+    """Encode with the json module, compactly unless `indent` is given."""
+    separators = None if indent else (',', ':')
+    return (json.dumps(data, indent=indent, separators=separators)
+            + '\n').encode('utf-8')
+
+
+def orjson_dumps(data, indent=None):
+    """Encode with orjson, or the json module for types it rejects."""
+    option = _orjson.OPT_APPEND_NEWLINE | _orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= _orjson.OPT_INDENT_2
+    try:
+        return _orjson.dumps(data, option=option)
+    except TypeError:
+        return stdlib_dumps(data, indent)
+
+
+SERIALIZERS = {'json': stdlib_dumps, 'orjson': orjson_dumps}
+
+
+def get_serializer(name):
+    """Return the dumps function for a JSON_SERIALIZER value."""
+    if name == 'auto':
+        name = 'json' if _orjson is None else 'orjson'
+    if name not in SERIALIZERS:
+        raise ValueError("Unknown JSON_SERIALIZER: {}".format(name))
+    if name == 'orjson' and _orjson is None:
+        raise RuntimeError("JSON_SERIALIZER 'orjson' requires the orjson "
+                           "package")
+    return SERIALIZERS[name]
+
+
+def output_json(data, code, headers=None):
+    """flask-restx representation using the configured serializer."""
+    dumps = current_app.extensions['json_serializer']
+    body = dumps(data, indent=2 if current_app.debug else None)
+    response = make_response(body, code)
+    response.mimetype = 'application/json'
+    response.headers.extend(headers or {})
+    return response
+
+
+def init_serialization(app, api):
+    """Pick the serializer and register it on the restx Api."""
+    app.config.setdefault('JSON_SERIALIZER', 'auto')
+    app.extensions['json_serializer'] = get_serializer(
+        app.config['JSON_SERIALIZER'])
+    api.representation('application/json')(output_json)
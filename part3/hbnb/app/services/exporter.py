@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Streaming NDJSON export of users, places and reviews."""
+
+import json
+import zlib
+from sqlalchemy import select
+from app import db
+from app.models.user import User
+from app.models.place import Place, place_amenity
+from app.models.review import Review
+
+EXPORTABLE = {'users': User, 'places': Place, 'reviews': Review}
+
+# Never leave the database through an export
+EXCLUDED_COLUMNS = {'users': {'password'}}
+
+
+def iter_records(entity, updated_since=None, batch_size=1000):
+    """Yield the rows of an entity as dicts, ordered by (updated_at, id).
+
+    Rows are fetched `batch_size` at a time with `yield_per`, so memory
+    stays flat whatever the table size. Places carry the list of their
+    amenity ids, loaded with one IN query per batch.
+
+    Args:
+        entity (str): One of 'users', 'places' or 'reviews'
+        updated_since (datetime): Only export rows updated at or after it
+    """
+    table = EXPORTABLE[entity].__table__
+    excluded = EXCLUDED_COLUMNS.get(entity, set())
+    columns = [column for column in table.columns
+               if column.name not in excluded]
+    query = select(*columns)
+    if updated_since is not None:
+        query = query.where(table.c.updated_at >= updated_since)
+    query = query.order_by(table.c.updated_at, table.c.id) \
+        .execution_options(yield_per=batch_size)
+
+    result = db.session.execute(query)
+    for rows in result.mappings().partitions():
+        records = [_jsonable(row) for row in rows]
+        if entity == 'places':
+            _attach_amenity_ids(records)
+        for record in records:
+            yield record
+
+
+def _attach_amenity_ids(records):
+    amenities = {record['id']: [] for record in records}
+    links = db.session.execute(
+        select(place_amenity.c.place_id, place_amenity.c.amenity_id)
+        .where(place_amenity.c.place_id.in_(amenities)))
+    for place_id, amenity_id in links:
+        amenities[place_id].append(amenity_id)
+    for record in records:
+        record['amenities'] = amenities[record['id']]
+
+
+def _jsonable(row):
+    record = dict(row)
+    for key in ('created_at', 'updated_at'):
+        if record.get(key) is not None:
+            record[key] = record[key].isoformat()
+    return record
+
+
+def iter_ndjson(records):
+    """Encode records as NDJSON lines (bytes)."""
+    for record in records:
+        yield (json.dumps(record) + '\n').encode('utf-8')
+
+
+def iter_gzip(chunks, level=6, flush_size=64 * 1024):
+    """Gzip a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
@@ -1,26 +1,113 @@
 #!/usr/bin/env python3
 
-from app.persistence.repository import InMemoryRepository, SQLAlchemyRepository
+from contextlib import contextmanager
+from functools import wraps
+from app import db, object_cache, password_hasher, user_cache
 from app.models.place import Place
 from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.review import Review
 from app.services.repositories.user_repository import UserRepository
+from app.services.repositories.place_repository import PlaceRepository
+from app.services.repositories.amenity_repository import AmenityRepository
+from app.services.repositories.review_repository import ReviewRepository
+from app.services.exporter import iter_records
 import uuid
 
+
+def transactional(method):
+    """Run a facade method inside a single unit of work."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.transaction():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class HBnBFacade:
+    # Relations that expand_places and expand_reviews can load
+    PLACE_EXPANSIONS = ('owner', 'amenities', 'reviews', 'reviews.user')
+    REVIEW_EXPANSIONS = ('user', 'place')
+
     def __init__(self):
         self.user_repo = UserRepository()
-        self.place_repo = SQLAlchemyRepository(Place)
-        self.review_repo = SQLAlchemyRepository(Review)
-        self.amenity_repo = SQLAlchemyRepository(Amenity)
+        self.place_repo = PlaceRepository()
+        self.review_repo = ReviewRepository()
+        self.amenity_repo = AmenityRepository()
+        self._repos = {
+            User: self.user_repo,
+            Place: self.place_repo,
+            Review: self.review_repo,
+            Amenity: self.amenity_repo,
+        }
+
+    @contextmanager
+    def transaction(self):
+        """Group every write made inside the block into one commit.
+
+        Repositories only stage changes in the session. The outermost
+        block commits them once on success and rolls everything back if
+        an exception escapes; nested blocks simply join it.
+        """
+        info = db.session.info
+        depth = info.get('transaction_depth', 0)
+        info['transaction_depth'] = depth + 1
+        try:
+            yield
+            if depth == 0:
+                db.session.commit()
+        except Exception:
+            if depth == 0:
+                db.session.rollback()
+                info.pop('after_commit', None)
+            raise
+        finally:
+            info['transaction_depth'] = depth
+        if depth == 0:
+            for callback in info.pop('after_commit', ()):
+                callback()
+
+    def on_commit(self, callback):
+        """Run `callback()` once the current transaction has committed.
+
+        Used to invalidate caches only when the new rows are visible, so
+        a concurrent reader cannot cache the old ones again. Outside of
+        a transaction the callback runs immediately.
+        """
+        info = db.session.info
+        if info.get('transaction_depth', 0):
+            info.setdefault('after_commit', []).append(callback)
+        else:
+            callback()
+
+    def _invalidate_places(self, *place_ids):
+        self.on_commit(lambda: object_cache.invalidate('place', *place_ids))
 
+    def bulk_add(self, objs, batch_size=1000):
+        """Persist many new objects, committing once per batch"""
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                self._add_batch(batch)
+                batch = []
+        if batch:
+            self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        with self.transaction():
+            for obj in batch:
+                self._repos[type(obj)].add(obj)
+
+    @transactional
     def create_user(self, user_data):
         user = User(**user_data)
         self.user_repo.add(user)
         return user
     
-    def get_user(self, user_id):
+    def get_user(self, user_id, fields=None):
+        if fields is not None:
+            return self.user_repo.get_fields(user_id, fields)
         return self.user_repo.get(user_id)
     
     def get_user_by_id(self, user_id):
@@ -29,38 +116,83 @@ class HBnBFacade:
     def get_user_by_email(self, email):
         return self.user_repo.get_user_by_email(email)
 
-    def get_all_users(self):
+    def rehash_password_if_needed(self, user, password):
+        """Upgrade an outdated password hash after a successful login.
+
+        The new hash is computed on the hasher pool and stored by the
+        worker, so the login response does not wait for it.
+
+        Returns:
+            Future: The pending rehash, or None if none was queued
+        """
+        if not user.password_needs_rehash():
+            return None
+        user_id, old_hash = user.id, user.password
+        return password_hasher.rehash_in_background(
+            password,
+            lambda new_hash: self.replace_password_hash(
+                user_id, old_hash, new_hash))
+
+    @transactional
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        return self.user_repo.replace_password_hash(user_id, old_hash,
+                                                    new_hash)
+
+    def get_users_by_ids(self, user_ids):
+        """Retrieve (users in request order, missing ids)"""
+        return self.user_repo.get_many(user_ids)
+
+    def get_all_users(self, fields=None):
+        if fields is not None:
+            return self.user_repo.get_all_fields(fields)
         return self.user_repo.get_all()
     
+    @transactional
     def put_user(self, user_id, data):
         user = self.user_repo.get(user_id)
         if not user:
             return None
         user.update(data)
         self.user_repo.update(user_id, data)
+        self.on_commit(lambda: user_cache.invalidate(user_id))
+        if {'first_name', 'last_name', 'email'} & set(data):
+            self._invalidate_places(
+                *self.place_repo.ids_showing_user(user_id))
         return user
     
+    @transactional
     def create_amenity(self, amenity_data):
         name = amenity_data.get("name")
         new_amenity = Amenity(name=name)
-        self.amenity_repo.add(new_amenity)
+        self.amenity_repo.add_with_next_bit(new_amenity)
         return new_amenity
 
-    def get_amenity(self, amenity_id):
+    def get_amenity(self, amenity_id, fields=None):
+        if fields is not None:
+            return self.amenity_repo.get_fields(amenity_id, fields)
         new_amenity = self.amenity_repo.get(amenity_id)
         return new_amenity
 
-    def get_all_amenities(self):
+    def get_amenities_by_ids(self, amenity_ids):
+        """Retrieve (amenities in request order, missing ids)"""
+        return self.amenity_repo.get_many(amenity_ids)
+
+    def get_all_amenities(self, fields=None):
+        if fields is not None:
+            return self.amenity_repo.get_all_fields(fields)
         return self.amenity_repo.get_all()
 
+    @transactional
     def update_amenity(self, amenity_id, amenity_data):
         amenity = self.amenity_repo.get(amenity_id)
         if amenity is None:
             return None
         amenity.update(amenity_data)
         self.amenity_repo.update(amenity_id, amenity_data)
+        self._invalidate_places(*self.place_repo.ids_with_amenity(amenity_id))
         return amenity
 
+    @transactional
     def create_place(self, place_data):
         required_fields = ['title', 'price', 'latitude', 'longitude', 'owner_id']
         for field in required_fields:
@@ -100,15 +232,181 @@ class HBnBFacade:
         owner.add_place(new_place)
         return new_place
 
+    @transactional
+    def create_places(self, owner_id, items):
+        """Create many places owned by one user in a single transaction.
+
+        The amenities of the whole batch are read with one IN query.
+        Invalid items are skipped.
+
+        Returns:
+            list: (new place id, None) or (None, error message) for each
+            item
+        """
+        owner = self.user_repo.get(owner_id)
+        if owner is None:
+            raise ValueError("Invalid owner_id: owner does not exist.")
+        requested = [self._amenity_ids(item.get('amenities'))
+                     for item in items]
+        amenities = self.amenity_repo.get_by_ids(
+            amenity_id for amenity_ids in requested if amenity_ids
+            for amenity_id in amenity_ids)
+
+        results = []
+        for item, amenity_ids in zip(items, requested):
+            missing = [field for field in
+                       ('title', 'price', 'latitude', 'longitude')
+                       if field not in item]
+            if missing:
+                results.append((None, "Missing required field: {}"
+                                .format(missing[0])))
+                continue
+            if amenity_ids is None:
+                results.append((None, "amenities must be a list of "
+                                      "amenity ids"))
+                continue
+            unknown = [amenity_id for amenity_id in amenity_ids
+                       if amenity_id not in amenities]
+            if unknown:
+                results.append((None, "Amenity with id {} does not exist."
+                                .format(unknown[0])))
+                continue
+            try:
+                place = Place(id=str(uuid.uuid4()), title=item['title'],
+                              description=item.get('description', ""),
+                              price=item['price'],
+                              latitude=item['latitude'],
+                              longitude=item['longitude'],
+                              owner_id=owner.id)
+            except ValueError as e:
+                results.append((None, str(e)))
+                continue
+            for amenity_id in amenity_ids:
+                place.add_amenity(amenities[amenity_id])
+            self.place_repo.add(place)
+            results.append((place.id, None))
+        return results
+
+    @staticmethod
+    def _amenity_ids(items):
+        """Ids from a list of amenity ids or {'id': ...} dicts, or None
+        if the value is not such a list"""
+        if items is None:
+            return []
+        if not isinstance(items, list):
+            return None
+        ids = []
+        for item in items:
+            amenity_id = item.get('id') if isinstance(item, dict) else item
+            if not isinstance(amenity_id, str):
+                return None
+            if amenity_id:
+                ids.append(amenity_id)
+        return list(dict.fromkeys(ids))
+
     def get_place(self, place_id):
         place = self.place_repo.get(place_id)
         if place is None:
             raise KeyError("Place not found.")
         return place
 
+    def get_place_detail(self, place_id, columns=None,
+                         relations=PlaceRepository.DETAIL_RELATIONS):
+        """Retrieve a place with owner, amenities and reviewed-by users
+        loaded up front, or only the given columns and relations"""
+        place = self.place_repo.get_place_detail(place_id, columns,
+                                                 relations)
+        if place is None:
+            raise KeyError("Place not found.")
+        return place
+
+    def get_place_detail_view(self, place_id, render):
+        """Return `render(place)` for a place detail, through the cache
+
+        The rendered value must be JSON serialisable. Writes touching
+        the place, its reviews, its owner, its reviewers or its
+        amenities invalidate it.
+        """
+        return object_cache.get_or_load(
+            'place', place_id,
+            lambda: render(self.get_place_detail(place_id)))
+
+    def get_places_by_ids(self, place_ids):
+        """Retrieve (places in request order, missing ids)"""
+        return self.place_repo.get_many(place_ids)
+
     def get_all_places(self):
         return self.place_repo.get_all()
 
+    def expand_places(self, places, names):
+        """Batch-load relations of many places (objects or rows).
+
+        Each relation costs one IN query however many places there are,
+        instead of one lazy load per place.
+
+        Args:
+            places (list): Places with `id` (and `owner_id` to expand owner)
+            names (iterable): Subset of PLACE_EXPANSIONS
+
+        Returns:
+            dict: 'owner' maps owner ids to users, 'amenities' and
+            'reviews' map place ids to lists, 'reviews.user' maps the
+            review authors' ids to users
+        """
+        loaded = {}
+        place_ids = [place.id for place in places]
+        if 'owner' in names:
+            loaded['owner'] = self.user_repo.get_by_ids(
+                place.owner_id for place in places)
+        if 'amenities' in names:
+            loaded['amenities'] = self.place_repo.amenities_by_place(
+                place_ids)
+        if 'reviews' in names or 'reviews.user' in names:
+            loaded['reviews'] = self.review_repo.group_by_attribute(
+                'place_id', place_ids)
+        if 'reviews.user' in names:
+            loaded['reviews.user'] = self.user_repo.get_by_ids(
+                review.user_id for reviews in loaded['reviews'].values()
+                for review in reviews)
+        return loaded
+
+    def get_places_validator(self, expand=()):
+        """Timestamps and counts of the places and expanded relations"""
+        return self.place_repo.list_last_modified(expand)
+
+    def get_place_detail_validator(self, place_id):
+        """Timestamps and counts a place detail depends on, or None"""
+        return self.place_repo.detail_last_modified(place_id)
+
+    def get_place_reviews_validator(self, place_id, expand=()):
+        """Timestamps and count the reviews of a place depend on, or None"""
+        return self.place_repo.reviews_last_modified(
+            place_id, with_place='place' in expand)
+
+    def search_places_nearby(self, latitude, longitude, radius_km, limit):
+        """Retrieve (place, distance_km) pairs around a point, nearest first"""
+        return self.place_repo.search_nearby(latitude, longitude,
+                                             radius_km, limit)
+
+    def get_places_page(self, limit, after=None, sort='created_at',
+                        min_price=None, max_price=None, amenity_ids=(),
+                        fields=None):
+        """Retrieve one page of places and the cursor of the next page.
+
+        Only places having every amenity of amenity_ids are returned.
+        With `fields`, the page holds rows of those columns only.
+        """
+        amenities = []
+        for amenity_id in amenity_ids:
+            amenity = self.amenity_repo.get(amenity_id)
+            if amenity is None:
+                raise ValueError("Amenity with id {} does not exist.".format(amenity_id))
+            amenities.append(amenity)
+        return self.place_repo.page_filtered(limit, after, sort,
+                                             min_price, max_price, amenities,
+                                             fields)
+
+    @transactional
     def update_place(self, place_id, place_data):
         """Update a place with the given data"""
         place = self.get_place(place_id)
@@ -121,7 +419,7 @@ class HBnBFacade:
                 setattr(place, attr, place_data[attr])
     
         if 'amenities' in place_data:
-            place.amenities = []
+            place.clear_amenities()
         
             for amenity_item in place_data['amenities']:
                 if isinstance(amenity_item, dict):
@@ -136,10 +434,13 @@ class HBnBFacade:
                     if amenity is None:
                         raise ValueError("Amenity with id {} does not exist.".format(amenity_id))
                     place.add_amenity(amenity)
-        self.place_repo.update(place_id, place_data)
+        self.place_repo.update(place_id, {key: value for key, value in place_data.items()
+                                          if key != 'amenities'})
+        self._invalidate_places(place_id)
     
         return place
     
+    @transactional
     def create_review(self, review_data):
         """Create a new review with validation"""
         required_fields = ['text', 'rating', 'user_id', 'place_id']
@@ -158,6 +459,8 @@ class HBnBFacade:
         place = self.place_repo.get(review_data['place_id'])
         if place is None:
             raise ValueError("Place with id {} does not exist.".format(review_data['place_id']))
+        if self.review_repo.reviewed_place_ids(user.id, [place.id]):
+            raise ValueError("You have already reviewed this place")
     
         from app.models.review import Review
         new_review = Review(
@@ -170,27 +473,119 @@ class HBnBFacade:
         self.review_repo.add(new_review)
     
         place.add_review(new_review)
+        self.place_repo.apply_rating(place, new_review.rating, 1)
+        self._invalidate_places(place.id)
     
         return new_review
 
-    def get_review(self, review_id):
-        """Retrieve a review by ID"""
-        review = self.review_repo.get(review_id)
+    @transactional
+    def create_reviews(self, user_id, items):
+        """Create many reviews by one user in a single transaction.
+
+        The batch is validated up front: the places are read with one IN
+        query and the places already reviewed by the user with another,
+        instead of one lookup per item. Invalid items are skipped.
+
+        Returns:
+            list: (new review id, None) or (None, error message) for each
+            item; ids are assigned up front so that reading them does
+            not reload each review after the commit
+        """
+        user = self.user_repo.get(user_id)
+        if user is None:
+            raise ValueError("User with id {} does not exist.".format(user_id))
+        place_ids = [item.get('place_id') for item in items
+                     if isinstance(item.get('place_id'), str)]
+        places = self.place_repo.get_by_ids(place_ids)
+        reviewed = self.review_repo.reviewed_place_ids(user_id, list(places))
+
+        results, ratings = [], {}
+        for item in items:
+            if not isinstance(item.get('place_id'), str):
+                results.append((None, "place_id must be a string"))
+                continue
+            place = places.get(item['place_id'])
+            if place is None:
+                results.append((None, "Place with id {} does not exist."
+                                .format(item.get('place_id'))))
+                continue
+            if place.owner_id == user_id:
+                results.append((None, "You cannot review your own place"))
+                continue
+            if place.id in reviewed:
+                results.append((None, "You have already reviewed this place"))
+                continue
+            try:
+                # Foreign keys rather than relationships: assigning
+                # review.place would load place.reviews for the backref
+                review = Review(id=str(uuid.uuid4()),
+                                text=item.get('text'),
+                                rating=item.get('rating'),
+                                place_id=place.id, user_id=user.id)
+            except ValueError as e:
+                results.append((None, str(e)))
+                continue
+            self.review_repo.add(review)
+            reviewed.add(place.id)
+            ratings.setdefault(place, {}).setdefault(review.rating, 0)
+            ratings[place][review.rating] += 1
+            results.append((review.id, None))
+
+        for place, deltas in ratings.items():
+            self.place_repo.apply_ratings(place, deltas)
+        if ratings:
+            self._invalidate_places(*(place.id for place in ratings))
+        return results
+
+    def get_review(self, review_id, fields=None):
+        """Retrieve a review by ID, or a row of `fields` only"""
+        if fields is not None:
+            review = self.review_repo.get_fields(review_id, fields)
+        else:
+            review = self.review_repo.get(review_id)
         if review is None:
             raise KeyError("Review not found.")
         return review
 
-    def get_all_reviews(self):
-        """Retrieve all reviews"""
+    def get_all_reviews(self, fields=None):
+        """Retrieve all reviews, or rows of `fields` only"""
+        if fields is not None:
+            return self.review_repo.get_all_fields(fields)
         return self.review_repo.get_all()
 
-    def get_reviews_by_place(self, place_id):
+    def get_reviews_by_place(self, place_id, fields=None):
         """Retrieve all reviews for a specific place"""
+        if fields is not None:
+            if self.place_repo.get_fields(place_id, ['id']) is None:
+                raise KeyError("Place not found.")
+            return self.review_repo.get_all_fields(
+                fields, [Review.place_id == place_id])
         place = self.place_repo.get(place_id)
         if place is None:
             raise KeyError("Place not found.")
         return place.reviews
 
+    def expand_reviews(self, reviews, names):
+        """Batch-load the authors and places of many reviews.
+
+        Args:
+            reviews (list): Reviews (objects or rows) with `user_id`
+                and `place_id`
+            names (iterable): Subset of REVIEW_EXPANSIONS
+
+        Returns:
+            dict: 'user' maps user ids to users, 'place' place ids to places
+        """
+        loaded = {}
+        if 'user' in names:
+            loaded['user'] = self.user_repo.get_by_ids(
+                review.user_id for review in reviews)
+        if 'place' in names:
+            loaded['place'] = self.place_repo.get_by_ids(
+                review.place_id for review in reviews)
+        return loaded
+
+    @transactional
     def update_review(self, review_id, review_data):
         """Update a review"""
         review = self.get_review(review_id)
@@ -202,11 +597,16 @@ class HBnBFacade:
             rating = review_data['rating']
             if not isinstance(rating, int) or not (1 <= rating <= 5):
                 raise ValueError("Rating must be an integer between 1 and 5")
+            if rating != review.rating:
+                self.place_repo.apply_rating(review.place, review.rating, -1)
+                self.place_repo.apply_rating(review.place, rating, 1)
             review.rating = rating
         self.review_repo.update(review_id, review_data)
+        self._invalidate_places(review.place_id)
     
         return review
 
+    @transactional
     def delete_review(self, review_id):
         """Delete a review"""
         review = self.get_review(review_id)
@@ -214,6 +614,18 @@ class HBnBFacade:
         if not review:
             raise ValueError("Review not found")
     
+        self.place_repo.apply_rating(review.place, review.rating, -1)
+        self._invalidate_places(review.place_id)
         self.review_repo.delete(review_id)
     
-        return True
\ No newline at end of file
+        return True
+
+    @transactional
+    def rebuild_rating_aggregates(self):
+        """Repair the rating aggregates that differ from the reviews"""
+        self.on_commit(lambda: object_cache.invalidate_all('place'))
+        return self.place_repo.rebuild_rating_aggregates()
+
+    def export_records(self, entity, updated_since=None):
+        """Stream every user, place or review as a plain dict"""
+        return iter_records(entity, updated_since)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Geographic helpers for proximity searches on the place grid index."""
+
+import math
+from app.models.place import GRID_COLUMNS, grid_cell
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = (math.sin(dphi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return the box enclosing a circle on the globe.
+
+    Returns:
+        tuple: (lat_min, lat_max, lng_ranges) where lng_ranges is a list
+        of (lng_min, lng_max), split in two when the box crosses the
+        antimeridian
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    lat_min = max(-90.0, latitude - dlat)
+    lat_max = min(90.0, latitude + dlat)
+    widest = max(abs(lat_min), abs(lat_max))
+    if widest >= 90.0:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if dlng >= 180.0:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    lng_min, lng_max = longitude - dlng, longitude + dlng
+    if lng_min < -180.0:
+        return lat_min, lat_max, [(lng_min + 360.0, 180.0),
+                                  (-180.0, lng_max)]
+    if lng_max > 180.0:
+        return lat_min, lat_max, [(lng_min, 180.0),
+                                  (-180.0, lng_max - 360.0)]
+    return lat_min, lat_max, [(lng_min, lng_max)]
+
+
+def grid_ranges(lat_min, lat_max, lng_ranges):
+    """List the (first, last) grid cell numbers covering a box.
+
+    There is one range per grid row and longitude range, each of which
+    is a single B-tree range scan on the grid_cell index.
+    """
+    ranges = []
+    first_row = grid_cell(lat_min, 0) // GRID_COLUMNS
+    last_row = grid_cell(lat_max, 0) // GRID_COLUMNS
+    for row in range(first_row, last_row + 1):
+        base = row * GRID_COLUMNS
+        for lng_min, lng_max in lng_ranges:
+            ranges.append((base + grid_cell(-90.0, lng_min),
+                           base + grid_cell(-90.0, lng_max)))
+    return ranges
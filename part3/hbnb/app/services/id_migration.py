@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""In-place conversion of text UUID keys to the 16-byte BinaryUUID form.
+
+Databases created before BinaryUUID hold every id and foreign key as a
+36-character string. A text value never equals a blob, so such rows are
+invisible to the models until converted. The conversion rewrites the
+values only: SQLite keeps a blob as it is in a column declared
+VARCHAR(36), so no table has to be rebuilt.
+
+Rows are converted `batch_size` at a time, in rowid order, with one
+commit per batch; an interrupted run resumes where it stopped since
+converted rows are skipped. Foreign key enforcement is turned off for
+the run, parents and children being converted in separate batches.
+"""
+
+import uuid
+from sqlalchemy import inspect
+
+# Table -> columns holding ids, parents before children
+ID_COLUMNS = {
+    'users': ('id',),
+    'amenities': ('id',),
+    'places': ('id', 'owner_id'),
+    'reviews': ('id', 'place_id', 'user_id'),
+    'place_amenity': ('place_id', 'amenity_id'),
+}
+
+
+def _uuid_blob(value):
+    """SQL function: the 16 bytes of a text UUID, other values unchanged"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return value
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError):
+        return 0
+    return 1
+
+
+def _text(columns):
+    return ' OR '.join("typeof({}) = 'text'".format(column)
+                       for column in columns)
+
+
+def migrate_ids(connection, batch_size=10000, progress=None):
+    """Convert the text ids of a SQLite database to 16-byte blobs.
+
+    Args:
+        connection: SQLAlchemy Connection to the database, without a
+            transaction in progress
+        batch_size (int): Rows updated per transaction
+        progress (callable): Called with (table, rows converted so far)
+            after each batch
+
+    Returns:
+        dict: Table name -> number of rows converted
+
+    Raises:
+        ValueError: If the database is not SQLite, or if some text ids
+            are not UUIDs; nothing is converted then
+    """
+    if connection.dialect.name != 'sqlite':
+        raise ValueError("Only SQLite databases are converted in place")
+    driver = connection.connection.driver_connection
+    driver.create_function('uuid_blob', 1, _uuid_blob, deterministic=True)
+    driver.create_function('is_uuid', 1, _is_uuid, deterministic=True)
+    existing = set(inspect(connection).get_table_names())
+    tables = {table: columns for table, columns in ID_COLUMNS.items()
+              if table in existing}
+
+    invalid = []
+    for table, columns in tables.items():
+        for column in columns:
+            count = connection.exec_driver_sql(
+                "SELECT count(*) FROM {0} WHERE typeof({1}) = 'text' "
+                "AND NOT is_uuid({1})".format(table, column)).scalar()
+            if count:
+                invalid.append('{}.{} ({})'.format(table, column, count))
+    connection.rollback()
+    if invalid:
+        raise ValueError("Ids that are not UUIDs: {}"
+                         .format(', '.join(invalid)))
+
+    converted = {}
+    enforced = connection.exec_driver_sql('PRAGMA foreign_keys').scalar()
+    connection.exec_driver_sql('PRAGMA foreign_keys = OFF')
+    try:
+        for table, columns in tables.items():
+            converted[table] = _migrate_table(connection, table, columns,
+                                              batch_size, progress)
+    finally:
+        connection.rollback()
+        connection.exec_driver_sql(
+            'PRAGMA foreign_keys = {}'.format('ON' if enforced else 'OFF'))
+        connection.commit()
+    return converted
+
+
+def _migrate_table(connection, table, columns, batch_size, progress):
+    assignments = ', '.join('{0} = uuid_blob({0})'.format(column)
+                            for column in columns)
+    last, total = 0, 0
+    while True:
+        rowids = connection.exec_driver_sql(
+            'SELECT rowid FROM {} WHERE rowid > ? AND ({}) '
+            'ORDER BY rowid LIMIT ?'.format(table, _text(columns)),
+            (last, batch_size)).scalars().all()
+        if not rowids:
+            return total
+        connection.exec_driver_sql(
+            'UPDATE {} SET {} WHERE rowid BETWEEN ? AND ?'
+            .format(table, assignments), (rowids[0], rowids[-1]))
+        connection.commit()
+        last = rowids[-1]
+        total += len(rowids)
+        if progress is not None:
+            progress(table, total)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Streaming bulk import of users, amenities, places and reviews."""
+
+import csv
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import (Boolean, DateTime, Float, Integer, inspect, insert,
+                        select, tuple_)
+from app import db, password_hasher
+from app.passwords import hash_scheme
+from app.models.user import User
+from app.models.amenity import Amenity, MAX_AMENITY_BITS
+from app.models.place import Place, place_amenity
+from app.models.review import Review
+from app.models.types import is_uuid
+
+# Entities in the order they have to be loaded to resolve foreign keys
+ENTITIES = ('users', 'amenities', 'places', 'reviews')
+
+
+def read_rows(path):
+    """Yield (line_number, row) pairs from an NDJSON or CSV file.
+
+    CSV rows are dicts of strings; NDJSON rows are the raw lines. Both
+    are parsed and converted to the column types by BulkImporter, so a
+    malformed line is reported like any other invalid row. Lines are
+    read one at a time, so memory use does not depend on the file size.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for number, row in enumerate(csv.DictReader(f), start=2):
+                yield number, {key: value for key, value in row.items()
+                               if value != ''}
+        else:
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, line
+
+
+class ImportReport:
+    """Counters and errors collected while importing one file."""
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.imported = 0
+        self.errors = []
+
+    def error(self, number, message):
+        self.errors.append((number, message))
+
+
+class BulkImporter:
+    """Validate rows with the models' rules and insert them in chunks.
+
+    Rows are checked with the same `@validates` hooks as the models and
+    inserted with one executemany per chunk, each chunk in its own
+    transaction. Every row gets a new UUID; source ids are mapped to it
+    in memory so that places and reviews can reference users, places
+    and amenities loaded earlier in the same run, or rows already in
+    the database by their stored id.
+
+    What depends on the rows already stored (referenced ids, unique
+    emails, one review per user and place) is checked per chunk with
+    IN queries, so memory does not grow with the size of the tables.
+    """
+
+    def __init__(self, facade, chunk_size=5000):
+        self.facade = facade
+        self.chunk_size = chunk_size
+        self.id_maps = {entity: {} for entity in ENTITIES[:-1]}
+        self._amenity_bits = None
+        self._scratch = {}
+        # Minted id -> source id, for the rows of the current chunk
+        self._sources = {}
+
+    def run(self, entity, rows):
+        """Import an iterable of (line_number, row) pairs for an entity.
+
+        Returns:
+            ImportReport: Number of rows imported and rejected rows
+        """
+        report = ImportReport(entity)
+        prepare = getattr(self, '_prepare_{}'.format(entity))
+        chunk = []
+        for number, row in rows:
+            try:
+                if isinstance(row, str):
+                    row = json.loads(row)
+                record, record_links = prepare(row)
+            except (ValueError, TypeError, KeyError) as e:
+                report.error(number, str(e))
+                continue
+            source_id = self._sources.get(record['id'])
+            if source_id is not None:
+                self.id_maps[entity][source_id] = record['id']
+            chunk.append((number, record, record_links))
+            if len(chunk) >= self.chunk_size:
+                self._flush(entity, chunk, report)
+                chunk = []
+        if chunk:
+            self._flush(entity, chunk, report)
+        report.errors.sort()
+        if entity == 'reviews' and report.imported:
+            # Inserted rows bypass the facade, refresh the aggregates
+            self.facade.rebuild_rating_aggregates()
+        return report
+
+    def _flush(self, entity, chunk, report):
+        check = getattr(self, '_check_{}'.format(entity), None)
+        rejected = check([entry[1:] for entry in chunk]) if check else {}
+        records, links = [], []
+        for number, record, record_links in chunk:
+            message = rejected.get(record['id'])
+            if message is not None:
+                report.error(number, message)
+                # Later rows must not resolve to a row never inserted
+                source_id = self._sources.get(record['id'])
+                if source_id is not None:
+                    del self.id_maps[entity][source_id]
+                continue
+            records.append(record)
+            links.extend(record_links)
+        self._sources.clear()
+        if not records:
+            return
+        model = self._model(entity)
+        with self.facade.transaction():
+            # executemany needs the same keys in every parameter set;
+            # rows leaving out a column with a default are inserted apart
+            groups = {}
+            for record in records:
+                groups.setdefault(tuple(record), []).append(record)
+            for group in groups.values():
+                db.session.execute(insert(model.__table__), group)
+            if links:
+                db.session.execute(insert(place_amenity), links)
+        report.imported += len(records)
+
+    @staticmethod
+    def _model(entity):
+        return {'users': User, 'amenities': Amenity,
+                'places': Place, 'reviews': Review}[entity]
+
+    def _record(self, entity, row):
+        """Build a column dict from a row and run the model validators."""
+        model = self._model(entity)
+        table = model.__table__
+        record = {}
+        for column in table.columns:
+            if column.name in row and row[column.name] is not None:
+                record[column.name] = _coerce(column, row[column.name])
+        scratch = self._scratch.get(entity)
+        if scratch is None:
+            # Transient instance, never added to the session: assigning
+            # to it runs the @validates hooks as the API does
+            scratch = self._scratch[entity] = model()
+        for key in inspect(model).validators:
+            if key in record:
+                setattr(scratch, key, record[key])
+                record[key] = getattr(scratch, key)
+        for column in table.columns:
+            if (column.name in record or column.primary_key
+                    or column.default is not None
+                    or column.server_default is not None):
+                continue
+            if not column.nullable:
+                raise ValueError("Missing required field: {}"
+                                 .format(column.name))
+            # Empty cells are dropped by read_rows: store NULL explicitly
+            record[column.name] = None
+
+        source_id = record.pop('id', None)
+        record['id'] = str(uuid.uuid4())
+        if source_id is not None and entity != 'reviews':
+            # Reviews are never referenced, keep the maps bounded
+            if source_id in self.id_maps[entity]:
+                raise ValueError("Duplicate id: {}".format(source_id))
+            # Mapped by run() once the whole row is accepted
+            self._sources[record['id']] = source_id
+        return record
+
+    def _resolve(self, entity, ref):
+        """Return the stored id for a source id, or raise ValueError.
+
+        Ids that are not from this run are returned as they are; their
+        existence is checked with the whole chunk (see _unknown).
+        """
+        stored = self.id_maps[entity].get(ref)
+        if stored is not None:
+            return stored
+        if is_uuid(ref):
+            return ref
+        raise ValueError("Unknown {} id: {}".format(
+            self._model(entity).__name__.lower(), ref))
+
+    def _unknown(self, entity, ids):
+        """The ids among `ids` that no row of an entity has."""
+        ids = set(ids)
+        if not ids:
+            return ids
+        model = self._model(entity)
+        return ids - set(db.session.execute(
+            select(model.id).where(model.id.in_(ids))).scalars())
+
+    def _prepare_users(self, row):
+        row = dict(row)
+        password = row.get('password')
+        if password and hash_scheme(password) is None:
+            # Plain text: hash it like the API does
+            row['password'] = password_hasher.hash(password)
+        return self._record('users', row), []
+
+    def _check_users(self, chunk):
+        """Reject emails already stored or repeated within the chunk."""
+        records = [record for record, _ in chunk]
+        emails = {record['email'] for record in records}
+        taken = set(db.session.execute(
+            select(User.email).where(User.email.in_(emails))).scalars())
+        rejected = {}
+        for record in records:
+            if record['email'] in taken:
+                rejected[record['id']] = ("Email already registered: {}"
+                                          .format(record['email']))
+            taken.add(record['email'])
+        return rejected
+
+    def _load_amenity_bits(self):
+        if self._amenity_bits is None:
+            self._amenity_bits = dict(db.session.execute(
+                select(Amenity.id, Amenity.bit)).tuples().all())
+        return self._amenity_bits
+
+    def _prepare_amenities(self, row):
+        bits = self._load_amenity_bits()
+        record = self._record('amenities', row)
+        taken = {bit for bit in bits.values() if bit is not None}
+        if record.get('bit') is None:
+            bit = max(taken) + 1 if taken else 0
+            record['bit'] = bit if bit < MAX_AMENITY_BITS else None
+        elif record['bit'] in taken:
+            # The range is checked by Amenity.validate_bit
+            raise ValueError("bit {} is already used".format(record['bit']))
+        bits[record['id']] = record['bit']
+        return record, []
+
+    def _prepare_places(self, row):
+        row = dict(row)
+        row['owner_id'] = self._resolve('users', row.get('owner_id'))
+        amenity_ids = row.pop('amenities', None) or []
+        if isinstance(amenity_ids, str):
+            amenity_ids = [value for value in amenity_ids.split(';')
+                           if value]
+        amenity_ids = [self._resolve('amenities', amenity_id)
+                       for amenity_id in amenity_ids]
+        record = self._record('places', row)
+        links = [{'place_id': record['id'], 'amenity_id': amenity_id}
+                 for amenity_id in dict.fromkeys(amenity_ids)]
+        bits = self._load_amenity_bits()
+        record['amenity_mask'] = 0
+        for amenity_id in amenity_ids:
+            if bits.get(amenity_id) is not None:
+                record['amenity_mask'] |= 1 << bits[amenity_id]
+        return record, links
+
+    def _check_places(self, chunk):
+        """Reject places whose owner or amenities do not exist."""
+        owners = self._unknown('users', (record['owner_id']
+                                         for record, _ in chunk))
+        amenities = self._unknown('amenities', (
+            link['amenity_id'] for _, links in chunk for link in links))
+        rejected = {}
+        for record, links in chunk:
+            missing = [link['amenity_id'] for link in links
+                       if link['amenity_id'] in amenities]
+            if record['owner_id'] in owners:
+                rejected[record['id']] = ("Unknown user id: {}"
+                                          .format(record['owner_id']))
+            elif missing:
+                rejected[record['id']] = ("Unknown amenity id: {}"
+                                          .format(missing[0]))
+        return rejected
+
+    def _prepare_reviews(self, row):
+        row = dict(row)
+        row['user_id'] = self._resolve('users', row.get('user_id'))
+        row['place_id'] = self._resolve('places', row.get('place_id'))
+        return self._record('reviews', row), []
+
+    def _check_reviews(self, chunk):
+        """Reject unknown users and places and repeated reviews.
+
+        Earlier chunks are committed, so one IN query on the UNIQUE
+        (user_id, place_id) index also finds the pairs they inserted.
+        """
+        records = [record for record, _ in chunk]
+        users = self._unknown('users', (record['user_id']
+                                        for record in records))
+        places = self._unknown('places', (record['place_id']
+                                          for record in records))
+        pairs = {(record['user_id'], record['place_id'])
+                 for record in records}
+        reviewed = set(db.session.execute(
+            select(Review.user_id, Review.place_id)
+            .where(tuple_(Review.user_id, Review.place_id).in_(pairs))))
+        rejected = {}
+        for record in records:
+            pair = (record['user_id'], record['place_id'])
+            if record['user_id'] in users:
+                message = "Unknown user id: {}".format(record['user_id'])
+            elif record['place_id'] in places:
+                message = "Unknown place id: {}".format(record['place_id'])
+            elif pair in reviewed:
+                message = "User {} already reviewed place {}".format(*pair)
+            else:
+                reviewed.add(pair)
+                continue
+            rejected[record['id']] = message
+        return rejected
+
+
+def _coerce(column, value):
+    """Convert a CSV string to the Python type of a column."""
+    if not isinstance(value, str):
+        return value
+    if isinstance(column.type, Boolean):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
@@ -0,0 +1,34 @@
+from app.models.amenity import Amenity, MAX_AMENITY_BITS
+from app import db
+from app.persistence.repository import SQLAlchemyRepository
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+
+class AmenityRepository(SQLAlchemyRepository):
+    def __init__(self):
+        super().__init__(Amenity)
+
+    def next_bit(self):
+        """Return the next free Place.amenity_mask bit, or None if full."""
+        highest = db.session.query(func.max(Amenity.bit)).scalar()
+        bit = 0 if highest is None else highest + 1
+        return bit if bit < MAX_AMENITY_BITS else None
+
+    def add_with_next_bit(self, amenity, attempts=5):
+        """Add an amenity holding the next free mask bit.
+
+        Concurrent creations can read the same highest bit; the insert
+        that loses on the unique index of `bit` is rolled back to a
+        savepoint and retried with a fresh bit, so the surrounding
+        transaction goes on.
+        """
+        for attempt in range(attempts):
+            amenity.bit = self.next_bit()
+            try:
+                with db.session.begin_nested():
+                    db.session.add(amenity)
+                return
+            except IntegrityError:
+                if amenity.bit is None or attempt == attempts - 1:
+                    raise
@@ -0,0 +1,289 @@
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.models.amenity import Amenity
+from app.models.place import place_amenity
+from app.models.types import is_uuid
+from app.persistence.repository import SQLAlchemyRepository
+from app.services.geo import bounding_box, grid_ranges, haversine_km
+from app import db
+from sqlalchemy import bindparam, case, func, or_, select, union, update
+from sqlalchemy.orm import joinedload, lazyload, load_only, selectinload
+
+
+class PlaceRepository(SQLAlchemyRepository):
+    def __init__(self):
+        super().__init__(Place)
+
+    DETAIL_RELATIONS = ('owner', 'amenities', 'reviews')
+
+    def get_place_detail(self, place_id, columns=None,
+                         relations=DETAIL_RELATIONS):
+        """Load a place with its owner, amenities, reviews and review authors.
+
+        The owner is joined in the main SELECT; amenities and reviews
+        (joined to their authors) are each fetched with one IN query,
+        so the number of round trips does not depend on the review count.
+
+        Args:
+            columns (list): Only load these columns of the place
+            relations (iterable): Subset of DETAIL_RELATIONS to load
+        """
+        options = [lazyload('*')]
+        if columns is not None:
+            options.append(load_only(
+                *[getattr(Place, column) for column in columns]))
+        if 'owner' in relations:
+            options.append(joinedload(Place.owner))
+        if 'amenities' in relations:
+            options.append(selectinload(Place.amenities))
+        if 'reviews' in relations:
+            options.append(selectinload(Place.reviews)
+                           .joinedload(Review.user))
+        return self.model.query.options(*options) \
+            .filter(Place.id == place_id).first()
+
+    def amenities_by_place(self, place_ids):
+        """Map each place id -> its amenities, read with one IN query"""
+        place_ids = list(dict.fromkeys(place_ids))
+        groups = {place_id: [] for place_id in place_ids}
+        if not place_ids:
+            return groups
+        rows = db.session.execute(
+            select(place_amenity.c.place_id, Amenity)
+            .join(Amenity, Amenity.id == place_amenity.c.amenity_id)
+            .where(place_amenity.c.place_id.in_(place_ids))
+            .order_by(Amenity.name))
+        for place_id, amenity in rows:
+            groups[place_id].append(amenity)
+        return groups
+
+    def page_filtered(self, limit, after=None, sort='created_at',
+                      min_price=None, max_price=None, amenities=(),
+                      fields=None):
+        """Return one page of places within a price range.
+
+        Places must have every amenity in `amenities`; amenities owning a
+        bit are tested with one AND on amenity_mask, the others (only
+        once the mask is full) with an EXISTS on place_amenity.
+        """
+        filters = []
+        if min_price is not None:
+            filters.append(Place.price >= min_price)
+        if max_price is not None:
+            filters.append(Place.price <= max_price)
+        mask = 0
+        for amenity in amenities:
+            if amenity.bit is None:
+                filters.append(Place.amenities.any(id=amenity.id))
+            else:
+                mask |= 1 << amenity.bit
+        if mask:
+            filters.append(Place.amenity_mask.op('&')(mask) == mask)
+        return self.page(limit, after, sort, filters, fields)
+
+    def search_nearby(self, latitude, longitude, radius_km, limit):
+        """Return the places within radius_km of a point, nearest first.
+
+        Candidates are read through the grid_cell index (one range per
+        grid row of the bounding box) and the exact box, then ranked by
+        haversine distance.
+
+        Returns:
+            list: (place, distance_km) tuples
+        """
+        lat_min, lat_max, lng_ranges = bounding_box(
+            latitude, longitude, radius_km)
+        cells = or_(*(Place.grid_cell.between(first, last)
+                      for first, last in grid_ranges(lat_min, lat_max,
+                                                     lng_ranges)))
+        in_box = or_(*(Place.longitude.between(lng_min, lng_max)
+                       for lng_min, lng_max in lng_ranges))
+        candidates = self.model.query.options(lazyload('*')).filter(
+            cells, Place.latitude.between(lat_min, lat_max), in_box).all()
+
+        results = []
+        for place in candidates:
+            distance = haversine_km(latitude, longitude,
+                                    place.latitude, place.longitude)
+            if distance <= radius_km:
+                results.append((place, distance))
+        results.sort(key=lambda result: result[1])
+        return results[:limit]
+
+    def apply_rating(self, place, rating, delta):
+        """Add (delta=1) or remove (delta=-1) a rating from a place's aggregates.
+
+        The counters are updated in SQL from their current values, so
+        concurrent reviews of the same place cannot overwrite each other.
+        """
+        self.apply_ratings(place, {rating: delta})
+
+    def apply_ratings(self, place, deltas):
+        """Apply several rating changes to a place with one UPDATE.
+
+        Args:
+            deltas (dict): rating -> number of such ratings added
+                (negative when removed)
+        """
+        count = Place.review_count + sum(deltas.values())
+        total = Place.rating_sum + sum(rating * delta
+                                       for rating, delta in deltas.items())
+        buckets = {'rating_{}'.format(rating): delta
+                   for rating, delta in deltas.items()}
+        values = {
+            'review_count': count,
+            'rating_sum': total,
+            'rating_avg': case((count > 0, total * 1.0 / count), else_=0.0),
+        }
+        for bucket, delta in buckets.items():
+            values[bucket] = getattr(Place, bucket) + delta
+        db.session.execute(
+            update(Place).where(Place.id == place.id).values(values)
+            .execution_options(synchronize_session=False))
+        db.session.expire(place, ['review_count', 'rating_sum',
+                                  'rating_avg', *buckets])
+
+    def rebuild_rating_aggregates(self):
+        """Recompute the places' rating aggregates from the reviews.
+
+        Only the places whose stored aggregates differ are written, so
+        only their updated_at moves: the ratings they show changed, and
+        the ETags built from updated_at must change with them.
+
+        Returns:
+            int: Number of places whose aggregates were repaired
+        """
+        buckets = ['rating_{}'.format(rating) for rating in range(1, 6)]
+        stats = select(
+            Review.place_id,
+            func.count().label('review_count'),
+            func.sum(Review.rating).label('rating_sum'),
+            *(func.sum(case((Review.rating == rating, 1), else_=0))
+              .label(bucket) for rating, bucket in zip(range(1, 6), buckets))
+        ).group_by(Review.place_id).subquery()
+        expected = {name: func.coalesce(stats.c[name], 0)
+                    for name in ['review_count', 'rating_sum', *buckets]}
+        expected_avg = case(
+            (stats.c.review_count > 0,
+             stats.c.rating_sum * 1.0 / stats.c.review_count), else_=0.0)
+        rows = db.session.execute(
+            select(Place.id, *expected.values())
+            .outerjoin(stats, stats.c.place_id == Place.id)
+            .where(or_(
+                func.abs(Place.rating_avg - expected_avg) > 1e-9,
+                *(getattr(Place, name) != value
+                  for name, value in expected.items())))).all()
+        params = []
+        for row in rows:
+            values = dict(zip(['b_id', *expected], row))
+            count = values['review_count']
+            values['rating_avg'] = values['rating_sum'] / count if count else 0.0
+            params.append(values)
+        if params:
+            table = Place.__table__
+            # One executemany; onupdate sets updated_at of these rows only
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id'))
+                .values(**{name: bindparam(name)
+                           for name in params[0] if name != 'b_id'}),
+                params)
+        db.session.expire_all()
+        return len(params)
+
+    def ids_showing_user(self, user_id):
+        """Ids of the places whose detail shows a user, as owner or reviewer"""
+        query = union(select(Place.id).where(Place.owner_id == user_id),
+                      select(Review.place_id).where(Review.user_id == user_id))
+        return db.session.execute(query).scalars().all()
+
+    def ids_with_amenity(self, amenity_id):
+        """Ids of the places offering an amenity"""
+        return db.session.execute(
+            select(place_amenity.c.place_id)
+            .where(place_amenity.c.amenity_id == amenity_id)).scalars().all()
+
+    def list_last_modified(self, expand=()):
+        """Return the timestamps and counts a list of places depends on.
+
+        With `expand`, the tables of the embedded relations are covered
+        too. A page may embed any of their rows, so each is read whole,
+        still from the updated_at index: one statement, no row loaded.
+
+        Args:
+            expand (iterable): Subset of HBnBFacade.PLACE_EXPANSIONS
+        """
+        models = [Place]
+        if 'owner' in expand or 'reviews.user' in expand:
+            models.append(User)
+        if 'amenities' in expand:
+            models.append(Amenity)
+        if 'reviews' in expand or 'reviews.user' in expand:
+            models.append(Review)
+        columns = []
+        for model in models:
+            columns.append(select(func.max(model.updated_at))
+                           .scalar_subquery())
+            columns.append(select(func.count()).select_from(model)
+                           .scalar_subquery())
+        if 'amenities' in expand:
+            columns.append(select(func.count()).select_from(place_amenity)
+                           .scalar_subquery())
+        return tuple(db.session.execute(select(*columns)).one())
+
+    def detail_last_modified(self, place_id):
+        """Return the timestamps and counts a place detail depends on.
+
+        One statement made of scalar subqueries over indexed columns:
+        the place, its owner, its reviews and their authors, and its
+        amenities. No row is loaded. Returns None if the place does not
+        exist.
+        """
+        if not is_uuid(place_id):
+            return None
+        row = db.session.execute(
+            select(Place.updated_at,
+                   select(User.updated_at)
+                   .where(User.id == Place.owner_id).scalar_subquery(),
+                   *self._reviews_last_modified(),
+                   select(func.max(Amenity.updated_at))
+                   .join(place_amenity,
+                         place_amenity.c.amenity_id == Amenity.id)
+                   .where(place_amenity.c.place_id == Place.id)
+                   .scalar_subquery(),
+                   select(func.count()).select_from(place_amenity)
+                   .where(place_amenity.c.place_id == Place.id)
+                   .scalar_subquery())
+            .where(Place.id == place_id)).first()
+        return None if row is None else tuple(row)
+
+    def reviews_last_modified(self, place_id, with_place=False):
+        """Return the timestamps and count the reviews of a place depend on.
+
+        Args:
+            with_place (bool): The reviews embed the place, whose
+                updated_at is added
+
+        Returns None if the place does not exist.
+        """
+        if not is_uuid(place_id):
+            return None
+        columns = list(self._reviews_last_modified())
+        if with_place:
+            columns.append(Place.updated_at)
+        row = db.session.execute(
+            select(*columns).where(Place.id == place_id)).first()
+        return None if row is None else tuple(row)
+
+    @staticmethod
+    def _reviews_last_modified():
+        """Subqueries over the reviews of the enclosing place, and authors"""
+        return (
+            select(func.max(Review.updated_at))
+            .where(Review.place_id == Place.id).scalar_subquery(),
+            select(func.count()).select_from(Review)
+            .where(Review.place_id == Place.id).scalar_subquery(),
+            select(func.max(User.updated_at))
+            .join(Review, Review.user_id == User.id)
+            .where(Review.place_id == Place.id).scalar_subquery(),
+        )
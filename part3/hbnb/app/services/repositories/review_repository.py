@@ -0,0 +1,22 @@
+from app.models.review import Review
+from app import db
+from app.persistence.repository import SQLAlchemyRepository
+from sqlalchemy import select
+
+
+class ReviewRepository(SQLAlchemyRepository):
+    def __init__(self):
+        super().__init__(Review)
+
+    def reviewed_place_ids(self, user_id, place_ids):
+        """Return the set of place_ids that user_id has already reviewed.
+
+        One query on the UNIQUE (user_id, place_id) index, whatever the
+        number of places.
+        """
+        place_ids = list(dict.fromkeys(place_ids))
+        if not place_ids:
+            return set()
+        return set(db.session.scalars(
+            select(Review.place_id).where(Review.user_id == user_id,
+                                          Review.place_id.in_(place_ids))))
@@ -1,3 +1,4 @@
+from sqlalchemy import update
 from app.models.user import User
 from app import db
 from app.persistence.repository import SQLAlchemyRepository
@@ -8,3 +9,16 @@ class UserRepository(SQLAlchemyRepository):
 
     def get_user_by_email(self, email):
         return self.model.query.filter_by(email=email).first()
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        """Swap a password hash, unless it changed since it was read.
+
+        Returns:
+            bool: True if the hash was replaced
+        """
+        result = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
+            .execution_options(synchronize_session=False))
+        return result.rowcount == 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for JSON serialisation and response compression."""
+
+import gzip
+import json
+import unittest
+from app import create_app, db
+from app import serialization
+from app.serialization import get_serializer, orjson_dumps, stdlib_dumps
+from app.services import facade
+
+
+class TestSerializers(unittest.TestCase):
+    """Test cases for the pluggable JSON encoders."""
+
+    @unittest.skipIf(serialization._orjson is None, "orjson is not installed")
+    def test_same_output(self):
+        """Both encoders produce the same compact document."""
+        data = {"id": "1", "price": 10.5, "tags": [1, 2], "none": None}
+        self.assertEqual(json.loads(stdlib_dumps(data)), data)
+        self.assertEqual(stdlib_dumps(data), orjson_dumps(data))
+        self.assertTrue(orjson_dumps(data).endswith(b"\n"))
+
+    @unittest.skipIf(serialization._orjson is None, "orjson is not installed")
+    def test_fallback_for_unsupported_types(self):
+        """Values orjson rejects go through the standard library."""
+        self.assertEqual(orjson_dumps({"big": 2 ** 70}),
+                         stdlib_dumps({"big": 2 ** 70}))
+        self.assertEqual(orjson_dumps({1: "a"}), b'{"1":"a"}\n')
+
+    def test_unknown_serializer(self):
+        """An unknown JSON_SERIALIZER is a configuration error."""
+        with self.assertRaises(ValueError):
+            get_serializer("yaml")
+
+
+class TestCompression(unittest.TestCase):
+    """Test cases for negotiated response compression."""
+
+    def setUp(self):
+        """Create enough places for the list to pass the size threshold."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        for i in range(20):
+            facade.create_place({
+                "title": "Place {}".format(i), "price": 100 + i,
+                "latitude": 0, "longitude": 0, "owner_id": owner.id})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def get(self, url='/api/v1/places/', encoding='gzip'):
+        return self.client.get(url, headers={"Accept-Encoding": encoding})
+
+    def test_gzip(self):
+        """Large JSON bodies are gzipped when the client accepts it."""
+        response = self.get()
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        places = json.loads(gzip.decompress(response.data))
+        self.assertEqual(len(places), 20)
+        self.assertLess(len(response.data), len(self.get(encoding="").data))
+
+    def test_identity(self):
+        """Clients that do not accept gzip get the plain body."""
+        for encoding in ("", "identity", "gzip;q=0"):
+            response = self.get(encoding=encoding)
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertEqual(len(response.json), 20)
+
+    def test_min_size(self):
+        """Small bodies are not compressed."""
+        self.app.config["COMPRESS_MIN_SIZE"] = 10 ** 6
+        self.assertNotIn("Content-Encoding", self.get().headers)
+
+    def test_precompressed_cache(self):
+        """A body with the same ETag is compressed once."""
+        cache = self.app.extensions['compression_cache']
+        first = self.get()
+        self.assertEqual(len(cache), 1)
+        second = self.get()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(cache), 1)
+        self.get('/api/v1/places/?limit=10')
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for the NDJSON catalog export."""
+
+import gzip
+import json
+import unittest
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.services import facade
+
+
+class TestExport(unittest.TestCase):
+    """Test cases for the export endpoint and CLI."""
+
+    def setUp(self):
+        """Set up an in-memory database with an admin and a place."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        admin = facade.create_user({
+            "first_name": "Admin",
+            "last_name": "HBnB",
+            "email": "admin@hbnb.io",
+            "password": "secret",
+            "is_admin": True
+        })
+        wifi = facade.create_amenity({"name": "WiFi"})
+        self.place_id = facade.create_place({
+            "title": "Loft",
+            "price": 80,
+            "latitude": 48.8,
+            "longitude": 2.3,
+            "owner_id": admin.id,
+            "amenities": [wifi.id]
+        }).id
+        self.wifi_id = wifi.id
+        self.headers = {"Authorization": "Bearer {}".format(
+            create_access_token(identity=admin.id))}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_export_places_gzip(self):
+        """Places are streamed gzipped with their amenity ids."""
+        headers = dict(self.headers, **{"Accept-Encoding": "gzip"})
+        response = self.client.get('/api/v1/export/places', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        lines = gzip.decompress(response.data).decode().splitlines()
+        record = json.loads(lines[0])
+        self.assertEqual(record["id"], self.place_id)
+        self.assertEqual(record["amenities"], [self.wifi_id])
+
+    def test_export_users_hides_passwords(self):
+        """Password hashes never appear in an export."""
+        response = self.client.get('/api/v1/export/users',
+                                   headers=self.headers)
+        record = json.loads(response.data.decode().splitlines()[0])
+        self.assertEqual(record["email"], "admin@hbnb.io")
+        self.assertNotIn("password", record)
+
+    def test_export_updated_since(self):
+        """Only rows updated after updated_since are exported."""
+        response = self.client.get(
+            '/api/v1/export/places?updated_since=2999-01-01T00:00:00',
+            headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"")
+
+    def test_export_unknown_entity(self):
+        """Unknown entities are rejected."""
+        response = self.client.get('/api/v1/export/passwords',
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_cli(self):
+        """The CLI writes the same NDJSON stream."""
+        result = self.app.test_cli_runner().invoke(
+            args=["hbnb", "export", "reviews"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output, "")
+        result = self.app.test_cli_runner().invoke(
+            args=["hbnb", "export", "places", "--updated-since",
+                  datetime(2000, 1, 1).isoformat()])
+        self.assertEqual(json.loads(result.output)["title"], "Loft")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Tests for the HBnBFacade unit of work."""
+
+import unittest
+from unittest import mock
+from sqlalchemy import event
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.services import facade
+
+
+class TestFacadeTransactions(unittest.TestCase):
+    """Test cases for the facade transaction scope."""
+
+    def setUp(self):
+        """Set up an in-memory database and count commits."""
+        self.app = create_app("config.TestingConfig")
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        self.commits = 0
+        event.listen(db.session(), "after_commit", self.count_commit)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def count_commit(self, session):
+        # Releasing a savepoint fires after_commit too; count real commits
+        if not session.in_nested_transaction():
+            self.commits += 1
+
+    def test_create_place_commits_once(self):
+        """Creating a place with amenities commits a single time."""
+        wifi = Amenity(name="WiFi")
+        pool = Amenity(name="Pool")
+        facade.bulk_add([wifi, pool])
+        self.commits = 0
+
+        place = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": self.owner.id,
+            "amenities": [wifi.id, pool.id]
+        })
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(len(place.amenities), 2)
+
+    def test_nested_transactions_commit_once(self):
+        """Facade calls made inside a transaction share its commit."""
+        with facade.transaction():
+            facade.create_amenity({"name": "WiFi"})
+            facade.create_amenity({"name": "Pool"})
+            self.assertEqual(self.commits, 0)
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(len(facade.get_all_amenities()), 2)
+
+    def test_failure_rolls_back(self):
+        """A failing call leaves no partial changes behind."""
+        place = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": self.owner.id
+        })
+        with self.assertRaises(ValueError):
+            facade.update_place(place.id, {"title": "Renamed",
+                                           "price": -1})
+        self.assertEqual(facade.get_place(place.id).title, "Cozy Apartment")
+
+    def test_bulk_add_commits_per_batch(self):
+        """bulk_add commits once per batch of objects."""
+        facade.bulk_add([Amenity(name="A{}".format(i)) for i in range(5)],
+                        batch_size=2)
+        self.assertEqual(self.commits, 3)
+        self.assertEqual(len(facade.get_all_amenities()), 5)
+
+    def test_amenity_bit_race_is_retried(self):
+        """A bit taken by a concurrent creation is replaced by a free one."""
+        wifi = facade.create_amenity({"name": "WiFi"})
+        self.assertEqual(wifi.bit, 0)
+        # Simulate a creation that read the highest bit before WiFi's
+        # insert: the first bit tried is already taken
+        with mock.patch.object(facade.amenity_repo, 'next_bit',
+                               side_effect=[0, 1]):
+            pool = facade.create_amenity({"name": "Pool"})
+        self.assertEqual(pool.bit, 1)
+        self.assertEqual(len(facade.get_all_amenities()), 2)
+
+    def test_amenity_bit_range(self):
+        """Mask bits outside the signed 64-bit range are rejected."""
+        for bit in (-1, 63):
+            with self.assertRaises(ValueError):
+                Amenity(name="Sauna", bit=bit)
+
+
+if __name__ == '__main__':
+    unittest.main()
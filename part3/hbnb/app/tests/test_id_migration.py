@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Tests for BinaryUUID keys and the `flask hbnb migrate-ids` command."""
+
+import unittest
+import uuid
+from sqlalchemy import text
+from sqlalchemy.exc import StatementError
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.models.types import BinaryUUID
+from app.services import facade
+
+OWNER = str(uuid.uuid4())
+PLACE = str(uuid.uuid4())
+WIFI = str(uuid.uuid4())
+
+
+class TestBinaryUUID(unittest.TestCase):
+    """Test cases for ids stored as 16 bytes."""
+
+    def setUp(self):
+        """Set up an in-memory database with one owner."""
+        self.app = create_app("config.TestingConfig")
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_stored_as_bytes(self):
+        """Keys are 16-byte blobs, presented as strings."""
+        stored = db.session.execute(text(
+            "SELECT id, typeof(id) FROM users")).one()
+        self.assertEqual(stored, (uuid.UUID(self.owner.id).bytes, 'blob'))
+        self.assertIsInstance(self.owner.id, str)
+        db.session.expire_all()
+        self.assertEqual(facade.get_user_by_email(
+            "alice.smith@example.com").id, self.owner.id)
+
+    def test_invalid_id(self):
+        """A non-UUID id is rejected on write, not found on read."""
+        with self.assertRaises(ValueError):
+            BinaryUUID().process_bind_param("not-a-uuid", db.engine.dialect)
+        db.session.add(Amenity(id="not-a-uuid", name="WiFi"))
+        with self.assertRaises(StatementError) as raised:
+            db.session.flush()
+        self.assertIsInstance(raised.exception.orig, ValueError)
+        db.session.rollback()
+        self.assertIsNone(facade.get_user("not-a-uuid"))
+
+    def test_pages_follow_cursor(self):
+        """Keyset pages compare the cursor id as bytes and end."""
+        for i in range(5):
+            facade.create_place({
+                "title": "Place {}".format(i), "price": 10, "latitude": 0,
+                "longitude": 0, "owner_id": self.owner.id})
+        seen, cursor = [], None
+        while True:
+            places, cursor = facade.get_places_page(2, cursor)
+            seen.extend(place.id for place in places)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+
+class TestMigrateIds(unittest.TestCase):
+    """Test cases for converting a database with text ids."""
+
+    def setUp(self):
+        """Set up tables holding rows written with text ids."""
+        self.app = create_app("config.TestingConfig")
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, first_name, last_name, email, "
+                "password, is_admin) VALUES (?, 'Alice', 'Smith', "
+                "'alice@example.com', 'x', 0)", (OWNER,))
+            connection.exec_driver_sql(
+                "INSERT INTO amenities (id, name, bit) VALUES (?, 'WiFi', 0)",
+                (WIFI,))
+            connection.exec_driver_sql(
+                "INSERT INTO places (id, title, price, latitude, longitude, "
+                "owner_id, grid_cell, amenity_mask, review_count, "
+                "rating_sum, rating_avg, rating_1, rating_2, rating_3, "
+                "rating_4, rating_5) VALUES "
+                "(?, 'Loft', 80, 0, 0, ?, 0, 1, 3, 12, 4, 0, 0, 0, 3, 0)",
+                (PLACE, OWNER))
+            connection.exec_driver_sql(
+                "INSERT INTO place_amenity (place_id, amenity_id) "
+                "VALUES (?, ?)", (PLACE, WIFI))
+            for i in range(3):
+                connection.exec_driver_sql(
+                    "INSERT INTO reviews (id, text, rating, user_id, "
+                    "place_id) VALUES (?, 'Nice', 4, ?, ?)",
+                    (str(uuid.uuid4()), str(uuid.uuid4()), PLACE))
+        self.runner = self.app.test_cli_runner()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_migrate(self):
+        """Text ids become blobs in batches, relations resolve again."""
+        self.assertIsNone(facade.place_repo.get(PLACE))
+        db.session.remove()
+
+        result = self.runner.invoke(args=[
+            "hbnb", "migrate-ids", "--batch-size", "2"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("reviews: 3 rows converted", result.output)
+        self.assertIn("reviews: 2 rows", result.stderr)
+        place = facade.get_place(PLACE)
+        self.assertEqual(place.owner.id, OWNER)
+        self.assertEqual([amenity.id for amenity in place.amenities], [WIFI])
+        self.assertEqual(len(place.reviews), 3)
+        self.assertEqual(db.session.execute(text(
+            "SELECT count(*) FROM reviews WHERE typeof(place_id) = 'blob' "
+            "AND typeof(user_id) = 'blob'")).scalar(), 3)
+
+        # Converted rows are skipped on a second run
+        db.session.remove()
+        result = self.runner.invoke(args=["hbnb", "migrate-ids"])
+        self.assertIn("users: 0 rows converted", result.output)
+
+    def test_refuses_invalid_ids(self):
+        """Ids that are not UUIDs stop the run before any change."""
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO amenities (id, name) VALUES ('a1', 'Pool')")
+
+        result = self.runner.invoke(args=["hbnb", "migrate-ids"])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("amenities.id (1)", result.output)
+        self.assertEqual(db.session.execute(text(
+            "SELECT count(*) FROM users WHERE typeof(id) = 'text'"))
+            .scalar(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for the `flask hbnb import` command."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+
+HASHED = "$2b$12$DcqfWYcH6iC1sxyElC92PuxuxzEUK537bqEXT51zVk1rrFGqpDXcm"
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test cases for the bulk import pipeline."""
+
+    def setUp(self):
+        """Set up an in-memory database and a scratch directory."""
+        self.app = create_app("config.TestingConfig")
+        self.runner = self.app.test_cli_runner()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def ndjson(self, name, rows):
+        return self.write(name, "".join(json.dumps(row) + "\n"
+                                        for row in rows))
+
+    def test_import_all_entities(self):
+        """Rows of every entity are imported and linked together."""
+        users = self.ndjson("users.ndjson", [
+            {"id": "u1", "first_name": "Alice", "last_name": "Smith",
+             "email": "alice@example.com", "password": HASHED},
+            {"id": "u2", "first_name": "Bob", "last_name": "Brown",
+             "email": "bob@example.com", "password": HASHED},
+        ])
+        amenities = self.write("amenities.csv", "id,name\na1,WiFi\na2,Pool\n")
+        places = self.ndjson("places.ndjson", [
+            {"id": "p1", "title": "Loft", "price": 80, "latitude": 48.8,
+             "longitude": 2.3, "owner_id": "u1", "amenities": ["a1", "a2"]},
+        ])
+        reviews = self.write("reviews.csv",
+                             "text,rating,user_id,place_id\n"
+                             "Great,5,u2,p1\n"
+                             "Bad rating,9,u2,p1\n"
+                             "Unknown place,4,u2,p404\n"
+                             "Again,4,u2,p1\n")
+
+        result = self.runner.invoke(args=[
+            "hbnb", "import", "--users", users, "--amenities", amenities,
+            "--places", places, "--reviews", reviews, "--chunk-size", "1"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("reviews: 1 imported, 3 rejected", result.output)
+        self.assertIn("already reviewed", result.output)
+        place = db.session.query(Place).filter_by(title="Loft").one()
+        self.assertNotEqual(place.id, "p1")
+        self.assertEqual(str(uuid.UUID(place.id)), place.id)
+        self.assertEqual(place.owner.email, "alice@example.com")
+        self.assertEqual(sorted(a.name for a in place.amenities),
+                         ["Pool", "WiFi"])
+        self.assertEqual(place.amenity_mask, 0b11)
+        self.assertEqual((place.review_count, place.rating_avg), (1, 5.0))
+        self.assertEqual(db.session.query(Review).count(), 1)
+
+    def test_invalid_rows_are_rejected(self):
+        """Rows breaking the model rules are reported, not inserted."""
+        users = self.ndjson("users.ndjson", [
+            {"first_name": "Alice", "last_name": "Smith",
+             "email": "not-an-email", "password": HASHED},
+            {"first_name": "", "last_name": "Smith",
+             "email": "alice@example.com", "password": HASHED},
+        ])
+        with open(users, 'a') as f:
+            f.write("{not json\n")
+
+        result = self.runner.invoke(args=["hbnb", "import",
+                                          "--users", users])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("users: 0 imported, 3 rejected", result.output)
+        self.assertEqual(db.session.query(User).count(), 0)
+
+    def test_optional_columns_left_empty(self):
+        """Empty optional cells are NULL, filled ones kept, in any order."""
+        users = self.ndjson("users.ndjson", [
+            {"id": "u1", "first_name": "Alice", "last_name": "Smith",
+             "email": "alice@example.com", "password": HASHED},
+        ])
+        places = self.write(
+            "places.csv",
+            "title,description,price,latitude,longitude,owner_id\n"
+            "Empty first,,80,0,0,u1\n"
+            "Filled,Sea view,90,0,0,u1\n"
+            "Empty again,,70,0,0,u1\n")
+        reviews = self.write("reviews.csv",
+                             "text,rating,user_id,place_id\n"
+                             "Ghost,4,u1,{}\n".format(uuid.uuid4()))
+
+        result = self.runner.invoke(args=[
+            "hbnb", "import", "--users", users, "--places", places,
+            "--reviews", reviews])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("places: 3 imported, 0 rejected", result.output)
+        self.assertEqual(
+            dict(db.session.query(Place.title, Place.description)),
+            {"Empty first": None, "Filled": "Sea view",
+             "Empty again": None})
+        self.assertIn("reviews: 0 imported, 1 rejected", result.output)
+        self.assertIn("Unknown place id", result.output)
+
+    def test_supplied_amenity_bits_are_checked(self):
+        """A supplied bit must be free and fit in the amenity mask."""
+        amenities = self.write("amenities.csv",
+                               "name,bit\nWiFi,3\nPool,3\nSauna,63\n")
+
+        result = self.runner.invoke(args=["hbnb", "import",
+                                          "--amenities", amenities])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("amenities: 1 imported, 2 rejected", result.output)
+        self.assertIn("bit 3 is already used", result.output)
+        self.assertEqual(db.session.query(Amenity.bit).scalar(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for per-request SQL statistics."""
+
+import json
+import unittest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError, StatementError
+from app import create_app, db
+from app.instrumentation import QueryStats
+from app.models.amenity import Amenity
+from app.services import facade
+
+
+class TestQueryStats(unittest.TestCase):
+    """Test cases for the QueryStats accumulator."""
+
+    def test_keeps_slowest(self):
+        """Only the slowest statements are kept, slowest first."""
+        stats = QueryStats(keep=2)
+        stats.record("a", 1.0)
+        stats.record("b", 5.0)
+        stats.record("c", 3.0)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.total_ms, 9.0)
+        self.assertEqual(stats.slowest, [(5.0, "b"), (3.0, "c")])
+
+    def test_server_timing(self):
+        """The header holds the total time, count and slowest statement."""
+        stats = QueryStats()
+        stats.record("a", 1.5)
+        self.assertEqual(stats.server_timing(),
+                         'db;dur=1.50;desc="1 queries", db-slowest;dur=1.50')
+
+
+class TestQueryStatsEndpoints(unittest.TestCase):
+    """Test cases for the Server-Timing header and slow query log."""
+
+    def setUp(self):
+        """Set up an in-memory database with one amenity."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.amenity_id = facade.create_amenity({"name": "WiFi"}).id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_server_timing_header(self):
+        """A request touching the database reports its statement count."""
+        db.session.expunge_all()
+        response = self.client.get(
+            '/api/v1/amenities/{}'.format(self.amenity_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', response.headers["Server-Timing"])
+
+    def test_slow_query_log(self):
+        """Statements above the threshold are logged as JSON."""
+        self.app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+        with self.assertLogs('hbnb.slow_query', level='WARNING') as logs:
+            self.client.get('/api/v1/amenities/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["path"], "/api/v1/amenities/")
+        self.assertIn("SELECT", entry["statement"])
+        self.assertIn("duration_ms", entry)
+
+    def test_failed_statement(self):
+        """A statement that raises leaves no start behind."""
+        connection = db.session.connection()
+        with self.assertRaises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        # Raised while binding, before the cursor executed
+        with self.assertRaises(StatementError):
+            connection.execute(select(Amenity).where(
+                Amenity.id == "not-a-uuid"))
+        self.assertEqual(connection.info.get('_query_start'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,11 @@
 """Tests for Place model and APIs."""
 
 import unittest
-from app import create_app
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db, object_cache
+from app.services import facade
 from app.models.user import User
 from app.models.place import Place
 from app.models.review import Review
@@ -339,5 +343,947 @@ class TestPlaceEndpoints(unittest.TestCase):
         self.assertEqual("error" in update_response.json, True)
 
 
+class TestPlacePagination(unittest.TestCase):
+    """Test cases for cursor pagination of the places listing."""
+
+    def setUp(self):
+        """Create an in-memory database with a few places."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        created_at = datetime(2025, 1, 1)
+        places = []
+        for i in range(5):
+            place = Place(title="Place {}".format(i), price=10 * i,
+                          latitude=0, longitude=0, owner_id=owner.id)
+            # Same timestamp for every row: ties must be broken by id
+            place.created_at = created_at
+            db.session.add(place)
+            places.append(place)
+        db.session.commit()
+        self.place_ids = sorted(place.id for place in places)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_pages_cover_all_places_once(self):
+        """Following the cursor returns every place exactly once, in order."""
+        seen = []
+        response = self.client.get('/api/v1/places/?limit=2')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(place["id"] for place in response.json)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            response = self.client.get(
+                '/api/v1/places/?limit=2&after={}'.format(cursor))
+        self.assertEqual(seen, self.place_ids)
+
+    def test_last_page_has_no_cursor(self):
+        """A page holding the remaining rows has no next cursor."""
+        response = self.client.get('/api/v1/places/?limit=5')
+        self.assertEqual(len(response.json), 5)
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is rejected."""
+        response = self.client.get('/api/v1/places/?after=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual("error" in response.json, True)
+
+    def test_invalid_limit(self):
+        """A limit outside the allowed range is rejected."""
+        response = self.client.get('/api/v1/places/?limit=0')
+        self.assertEqual(response.status_code, 400)
+
+    def get_all_pages(self, query):
+        """Follow the cursors of a listing and return the prices seen."""
+        prices = []
+        response = self.client.get('/api/v1/places/?limit=2&' + query)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            prices.extend(place["price"] for place in response.json)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return prices
+            response = self.client.get('/api/v1/places/?limit=2&{}&after={}'
+                                       .format(query, cursor))
+
+    def test_price_filter_and_sort(self):
+        """Price filters and sorts combine with the cursors."""
+        self.assertEqual(self.get_all_pages('sort=-price'),
+                         [40, 30, 20, 10, 0])
+        self.assertEqual(
+            self.get_all_pages('sort=price&min_price=10&max_price=30'),
+            [10, 20, 30])
+
+    def test_cursor_bound_to_sort(self):
+        """A cursor cannot be reused with another sort order."""
+        response = self.client.get('/api/v1/places/?limit=2&sort=price')
+        cursor = response.headers["X-Next-Cursor"]
+        response = self.client.get(
+            '/api/v1/places/?sort=-price&after={}'.format(cursor))
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_price_filter(self):
+        """Invalid price filters and sorts are rejected."""
+        for query in ['min_price=abc', 'max_price=-1', 'sort=title']:
+            response = self.client.get('/api/v1/places/?' + query)
+            self.assertEqual(response.status_code, 400)
+
+
+class TestPlaceDetailQueries(unittest.TestCase):
+    """Test that loading a place detail does not issue N+1 queries."""
+
+    def setUp(self):
+        """Create an in-memory database with a place and an amenity."""
+        self.app = create_app("config.TestingConfig")
+        # Measure the database path, not the detail cache
+        self.app.config["OBJECT_CACHE_BACKEND"] = "null"
+        object_cache.init_app(self.app)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        wifi = facade.create_amenity({"name": "WiFi"})
+        self.place = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": owner.id,
+            "amenities": [wifi.id]
+        })
+        self.place_id = self.place.id
+        self.reviewers = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_reviews(self, count):
+        """Add `count` reviews, each written by a different user."""
+        for _ in range(count):
+            self.reviewers += 1
+            user = User(first_name="User", last_name=str(self.reviewers),
+                        email="user{}@example.com".format(self.reviewers),
+                        password="secret")
+            db.session.add(user)
+            db.session.add(Review(text="Great", rating=5,
+                                  place=self.place, user=user))
+        db.session.commit()
+
+    def count_detail_queries(self):
+        """Return the number of statements issued by GET /places/<id>."""
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get(
+                '/api/v1/places/{}'.format(self.place_id))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 200)
+        self.place = db.session.get(Place, self.place_id)
+        return len(statements), response
+
+    def test_query_count_constant_in_review_count(self):
+        """The statement count is the same for 2 and 40 reviews."""
+        self.add_reviews(2)
+        few, response = self.count_detail_queries()
+        self.assertEqual(len(response.json["reviews"]), 2)
+
+        self.add_reviews(38)
+        many, response = self.count_detail_queries()
+        self.assertEqual(len(response.json["reviews"]), 40)
+        self.assertEqual(few, many)
+        # The ETag validator, then the place, amenities and reviews
+        self.assertLessEqual(many, 4)
+
+    def test_detail_content(self):
+        """The detail response includes owner, amenities and authors."""
+        self.add_reviews(1)
+        _, response = self.count_detail_queries()
+        self.assertEqual(response.json["owner"]["first_name"], "Alice")
+        self.assertEqual(response.json["amenities"][0]["name"], "WiFi")
+        self.assertEqual(response.json["reviews"][0]["last_name"], "1")
+
+
+class StandInClient:
+    """Dict-backed stand-in for an out-of-process key/value store."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        assert isinstance(value, bytes)
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestPlaceDetailCache(unittest.TestCase):
+    """Test cases for the place detail read-through cache."""
+
+    def setUp(self):
+        """Create a place with one review and log in its reviewer."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.owner_id = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret",
+            "is_admin": True
+        }).id
+        self.reviewer_id = facade.create_user({
+            "first_name": "Bob",
+            "last_name": "Jones",
+            "email": "bob.jones@example.com",
+            "password": "secret"
+        }).id
+        self.amenity_id = facade.create_amenity({"name": "WiFi"}).id
+        self.place_id = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": self.owner_id,
+            "amenities": [self.amenity_id]
+        }).id
+        self.review_id = facade.create_review({
+            "text": "Great", "rating": 4,
+            "user_id": self.reviewer_id, "place_id": self.place_id
+        }).id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def get_detail(self):
+        response = self.client.get('/api/v1/places/{}'.format(self.place_id))
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def assert_refreshed(self, check):
+        """The next GET misses the cache and shows the change."""
+        misses = object_cache.metrics()["misses"]
+        check(self.get_detail())
+        self.assertEqual(object_cache.metrics()["misses"], misses + 1)
+
+    def test_hits_after_first_load(self):
+        """A second GET is served from the cache."""
+        first = self.get_detail()
+        db.session.expunge_all()
+        statements = []
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        self.assertEqual(self.get_detail(), first)
+        # Only the index-only ETag validator reaches the database
+        self.assertEqual(len(statements), 1)
+        metrics = object_cache.metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (1, 1))
+        self.assertEqual(metrics["hit_ratio"], 0.5)
+
+    def test_update_place_invalidates(self):
+        """Updating the place refreshes its entry."""
+        self.get_detail()
+        facade.update_place(self.place_id, {"title": "Renamed"})
+        self.assert_refreshed(
+            lambda detail: self.assertEqual(detail["title"], "Renamed"))
+
+    def test_reviews_invalidate(self):
+        """Creating, updating or deleting a review refreshes the entry."""
+        self.get_detail()
+        facade.update_review(self.review_id, {"rating": 2})
+        self.assert_refreshed(
+            lambda detail: self.assertEqual(detail["rating"], 2.0))
+        facade.delete_review(self.review_id)
+        self.assert_refreshed(
+            lambda detail: self.assertNotIn("reviews", detail))
+        facade.create_review({
+            "text": "Fine", "rating": 3,
+            "user_id": self.reviewer_id, "place_id": self.place_id
+        })
+        self.assert_refreshed(
+            lambda detail: self.assertEqual(detail["review_count"], 1))
+
+    def test_user_and_amenity_changes_invalidate(self):
+        """Renaming the owner, a reviewer or an amenity refreshes the entry."""
+        self.get_detail()
+        facade.put_user(self.reviewer_id, {"first_name": "Robert"})
+        self.assert_refreshed(lambda detail: self.assertEqual(
+            detail["reviews"][0]["first_name"], "Robert"))
+        facade.put_user(self.owner_id, {"last_name": "Doe"})
+        self.assert_refreshed(lambda detail: self.assertEqual(
+            detail["owner"]["last_name"], "Doe"))
+        facade.update_amenity(self.amenity_id, {"name": "Fiber"})
+        self.assert_refreshed(lambda detail: self.assertEqual(
+            detail["amenities"][0]["name"], "Fiber"))
+
+    def test_unrelated_write_keeps_entry(self):
+        """Writes to data the entry does not show keep it cached."""
+        self.get_detail()
+        facade.put_user(self.reviewer_id, {"is_admin": False})
+        facade.create_amenity({"name": "Pool"})
+        self.get_detail()
+        self.assertEqual(object_cache.metrics()["hits"], 1)
+
+    def test_rollback_keeps_entry(self):
+        """A failed write does not invalidate anything."""
+        self.get_detail()
+        invalidations = object_cache.metrics()["invalidations"]
+        with self.assertRaises(ValueError):
+            facade.update_place(self.place_id, {"title": "Renamed",
+                                                "price": -1})
+        self.assertEqual(self.get_detail()["title"], "Cozy Apartment")
+        metrics = object_cache.metrics()
+        self.assertEqual(metrics["invalidations"], invalidations)
+        self.assertEqual(metrics["hits"], 1)
+
+    def test_out_of_process_backend(self):
+        """A key/value client stores JSON and is invalidated the same way."""
+        store = StandInClient()
+        object_cache.init_app(self.app, client=store)
+        first = self.get_detail()
+        self.assertEqual(self.get_detail(), first)
+        self.assertEqual(object_cache.metrics()["hits"], 1)
+        facade.update_place(self.place_id, {"price": 120})
+        self.assert_refreshed(
+            lambda detail: self.assertEqual(detail["price"], 120))
+
+    def test_metrics_endpoint(self):
+        """Admins can read the hit ratio, other users cannot."""
+        self.get_detail()
+        self.get_detail()
+        response = self.client.get('/api/v1/places/cache-metrics', headers={
+            "Authorization": "Bearer {}".format(
+                create_access_token(identity=self.owner_id))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["hit_ratio"], 0.5)
+        response = self.client.get('/api/v1/places/cache-metrics', headers={
+            "Authorization": "Bearer {}".format(
+                create_access_token(identity=self.reviewer_id))})
+        self.assertEqual(response.status_code, 403)
+
+
+class TestPlaceConditionalGet(unittest.TestCase):
+    """Test cases for ETag and Last-Modified on place reads."""
+
+    def setUp(self):
+        """Create a place with one review."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.owner_id = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        }).id
+        self.place_id = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": self.owner_id
+        }).id
+        self.detail_url = '/api/v1/places/{}'.format(self.place_id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, headers={"If-None-Match": etag})
+
+    def test_detail_not_modified(self):
+        """A current ETag gets a 304 with no body."""
+        response = self.client.get(self.detail_url)
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn("Last-Modified", response.headers)
+        response = self.revalidate(self.detail_url, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_detail_changes_with_dependencies(self):
+        """Reviews, owner and place changes all produce a new ETag."""
+        etag = self.client.get(self.detail_url).headers["ETag"]
+        reviewer_id = facade.create_user({
+            "first_name": "Bob",
+            "last_name": "Jones",
+            "email": "bob.jones@example.com",
+            "password": "secret"
+        }).id
+        review = facade.create_review({
+            "text": "Great", "rating": 4,
+            "user_id": reviewer_id, "place_id": self.place_id})
+        for change in (
+                lambda: None,
+                lambda: facade.put_user(reviewer_id, {"first_name": "Rob"}),
+                lambda: facade.put_user(self.owner_id, {"last_name": "Doe"}),
+                lambda: facade.delete_review(review.id),
+                lambda: facade.update_place(self.place_id, {"price": 90})):
+            change()
+            response = self.revalidate(self.detail_url, etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["ETag"]
+
+    def test_list_not_modified(self):
+        """The list ETag depends on the places and the query string."""
+        response = self.client.get('/api/v1/places/?limit=10')
+        etag = response.headers["ETag"]
+        self.assertEqual(
+            self.revalidate('/api/v1/places/?limit=10', etag).status_code,
+            304)
+        self.assertEqual(
+            self.revalidate('/api/v1/places/?limit=5', etag).status_code,
+            200)
+        facade.create_place({
+            "title": "Loft", "price": 80, "latitude": 0, "longitude": 0,
+            "owner_id": self.owner_id})
+        self.assertEqual(
+            self.revalidate('/api/v1/places/?limit=10', etag).status_code,
+            200)
+
+    def test_expanded_reads_change_with_relations(self):
+        """Changes to expanded relations produce a new ETag."""
+        reviewer_id = facade.create_user({
+            "first_name": "Bob",
+            "last_name": "Jones",
+            "email": "bob.jones@example.com",
+            "password": "secret"
+        }).id
+        review_id = facade.create_review({
+            "text": "Great", "rating": 4,
+            "user_id": reviewer_id, "place_id": self.place_id}).id
+        reviews_url = '/api/v1/reviews/places/{}/reviews'.format(self.place_id)
+        for url, change in (
+                ('/api/v1/places/?expand=owner',
+                 lambda: facade.put_user(self.owner_id, {"last_name": "Doe"})),
+                ('/api/v1/places/?expand=reviews.user',
+                 lambda: facade.put_user(reviewer_id, {"first_name": "Rob"})),
+                ('/api/v1/places/?expand=reviews',
+                 lambda: facade.update_review(review_id, {"text": "Good"})),
+                (self.detail_url + '?expand=owner',
+                 lambda: facade.put_user(self.owner_id, {"last_name": "Roe"})),
+                (reviews_url + '?expand=place',
+                 lambda: facade.update_place(self.place_id, {"price": 90}))):
+            etag = self.client.get(url).headers["ETag"]
+            self.assertEqual(self.revalidate(url, etag).status_code, 304)
+            change()
+            self.assertEqual(self.revalidate(url, etag).status_code, 200,
+                             url)
+
+    def test_if_modified_since(self):
+        """Last-Modified is honoured when no ETag is sent."""
+        response = self.client.get(self.detail_url)
+        response = self.client.get(self.detail_url, headers={
+            "If-Modified-Since": response.headers["Last-Modified"]})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.detail_url, headers={
+            "If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_skips_loading(self):
+        """A 304 is answered by the validator query alone."""
+        etag = self.client.get(self.detail_url).headers["ETag"]
+        statements = []
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        self.assertEqual(self.revalidate(self.detail_url, etag).status_code,
+                         304)
+        self.assertEqual(len(statements), 1)
+
+    def test_missing_place(self):
+        """An unknown place is still a 404."""
+        response = self.client.get('/api/v1/places/missing')
+        self.assertEqual(response.status_code, 404)
+
+
+class TestPlaceSearch(unittest.TestCase):
+    """Test cases for the proximity search."""
+
+    def setUp(self):
+        """Create places around Paris and on both sides of the antimeridian."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        for title, latitude, longitude in [
+                ("Louvre", 48.8606, 2.3376),
+                ("Versailles", 48.8049, 2.1204),
+                ("Lyon", 45.7640, 4.8357),
+                ("Fiji East", -17.0, 179.95),
+                ("Fiji West", -17.0, -179.95)]:
+            facade.create_place({"title": title, "price": 100,
+                                 "latitude": latitude,
+                                 "longitude": longitude,
+                                 "owner_id": owner.id})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_search_nearest_first(self):
+        """Places inside the radius are returned nearest first."""
+        response = self.client.get(
+            '/api/v1/places/search?lat=48.8566&lng=2.3522&radius_km=50')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["title"] for place in response.json],
+                         ["Louvre", "Versailles"])
+        self.assertLess(response.json[0]["distance_km"], 2)
+
+    def test_search_across_antimeridian(self):
+        """The search box wraps around longitude 180."""
+        response = self.client.get(
+            '/api/v1/places/search?lat=-17&lng=179.99&radius_km=20')
+        self.assertEqual(sorted(place["title"] for place in response.json),
+                         ["Fiji East", "Fiji West"])
+
+    def test_search_follows_updates(self):
+        """Moving a place moves it in the grid index."""
+        lyon = [place for place in facade.get_all_places()
+                if place.title == "Lyon"][0]
+        facade.update_place(lyon.id, {"latitude": 48.86, "longitude": 2.35})
+        response = self.client.get(
+            '/api/v1/places/search?lat=48.8566&lng=2.3522&radius_km=5')
+        self.assertIn("Lyon", [place["title"] for place in response.json])
+
+    def test_search_invalid_parameters(self):
+        """Missing or out of range parameters are rejected."""
+        for query in ['lng=2', 'lat=48&lng=2&radius_km=5000',
+                      'lat=abc&lng=2']:
+            response = self.client.get('/api/v1/places/search?' + query)
+            self.assertEqual(response.status_code, 400)
+
+
+class TestPlaceAmenityFilter(unittest.TestCase):
+    """Test cases for the amenity bitset filter."""
+
+    def setUp(self):
+        """Create places with different sets of amenities."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        self.wifi = facade.create_amenity({"name": "WiFi"}).id
+        self.pool = facade.create_amenity({"name": "Pool"}).id
+        self.ac = facade.create_amenity({"name": "A/C"}).id
+        self.place_ids = {}
+        for title, amenities in [("Studio", [self.wifi]),
+                                 ("Villa", [self.wifi, self.pool, self.ac]),
+                                 ("Cabin", [self.pool])]:
+            self.place_ids[title] = facade.create_place({
+                "title": title, "price": 100, "latitude": 0,
+                "longitude": 0, "owner_id": owner.id,
+                "amenities": amenities}).id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def titles(self, *amenity_ids):
+        response = self.client.get('/api/v1/places/?amenities={}'
+                                   .format(','.join(amenity_ids)))
+        self.assertEqual(response.status_code, 200)
+        return sorted(place["title"] for place in response.json)
+
+    def test_and_filter(self):
+        """Only places having every requested amenity are returned."""
+        self.assertEqual(self.titles(self.wifi), ["Studio", "Villa"])
+        self.assertEqual(self.titles(self.wifi, self.pool), ["Villa"])
+        self.assertEqual(self.titles(self.pool), ["Cabin", "Villa"])
+
+    def test_mask_follows_updates(self):
+        """Replacing the amenities of a place updates its bitset."""
+        facade.update_place(self.place_ids["Cabin"],
+                            {"amenities": [self.wifi, self.pool]})
+        self.assertEqual(self.titles(self.wifi, self.pool),
+                         ["Cabin", "Villa"])
+        facade.update_place(self.place_ids["Villa"], {"amenities": []})
+        self.assertEqual(self.titles(self.wifi, self.pool), ["Cabin"])
+
+    def test_amenity_without_bit(self):
+        """Amenities created once the bitset is full are still filtered."""
+        sauna = Amenity(name="Sauna", bit=None)
+        db.session.add(sauna)
+        db.session.commit()
+        facade.update_place(self.place_ids["Studio"],
+                            {"amenities": [self.wifi, sauna.id]})
+        self.assertEqual(self.titles(self.wifi, sauna.id), ["Studio"])
+
+    def test_unknown_amenity(self):
+        """Filtering on an unknown amenity is rejected."""
+        response = self.client.get('/api/v1/places/?amenities=nope')
+        self.assertEqual(response.status_code, 400)
+
+
+
+class TestPlaceFieldsets(unittest.TestCase):
+    """Test the ?fields= sparse fieldsets on place reads."""
+
+    def setUp(self):
+        """Create a place with an amenity and a review."""
+        self.app = create_app("config.TestingConfig")
+        self.app.config["OBJECT_CACHE_BACKEND"] = "null"
+        object_cache.init_app(self.app)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        owner = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        })
+        reviewer = facade.create_user({
+            "first_name": "Bob",
+            "last_name": "Brown",
+            "email": "bob.brown@example.com",
+            "password": "secret"
+        })
+        wifi = facade.create_amenity({"name": "WiFi"})
+        self.place_id = facade.create_place({
+            "title": "Cozy Apartment",
+            "price": 100,
+            "latitude": 37.7749,
+            "longitude": -122.4194,
+            "owner_id": owner.id,
+            "amenities": [wifi.id]
+        }).id
+        facade.create_review({"text": "Great", "rating": 5,
+                              "user_id": reviewer.id,
+                              "place_id": self.place_id})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def get(self, url):
+        """Return the response and the statements issued to serve it."""
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return response, statements
+
+    def test_map_pins(self):
+        """Map pins are read by one query of the pin columns."""
+        response, statements = self.get(
+            '/api/v1/places/?fields=id,latitude,longitude,price')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{
+            "id": self.place_id, "latitude": 37.7749,
+            "longitude": -122.4194, "price": 100}])
+        # The ETag validator, then one narrow query
+        self.assertEqual(len(statements), 2)
+        self.assertNotIn("description", statements[-1])
+        self.assertNotIn("JOIN", statements[-1])
+
+    def test_detail_subset(self):
+        """Only the requested relationships are loaded."""
+        response, statements = self.get(
+            '/api/v1/places/{}?fields=title,owner'.format(self.place_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json), {"title", "owner"})
+        self.assertEqual(response.json["owner"]["first_name"], "Alice")
+        # statements[0] is the ETag validator, which reads every table
+        self.assertFalse(any("FROM reviews" in statement
+                             or "amenities" in statement
+                             for statement in statements[1:]))
+
+    def test_fields_vary_etag(self):
+        """Different fieldsets of one place have different ETags."""
+        url = '/api/v1/places/{}'.format(self.place_id)
+        full, _ = self.get(url)
+        subset, _ = self.get(url + '?fields=title')
+        self.assertNotEqual(full.headers["ETag"], subset.headers["ETag"])
+
+    def test_reviews_subset(self):
+        """Review fields read through the author join in one statement."""
+        response, statements = self.get(
+            '/api/v1/reviews/places/{}/reviews?fields=rating,first_name'
+            .format(self.place_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"rating": 5, "first_name": "Bob"}])
+        # The ETag validator, the place lookup and the reviews
+        self.assertLessEqual(len(statements), 3)
+
+    def test_unknown_field(self):
+        """Unknown fields are rejected with the list of allowed ones."""
+        for url in ('/api/v1/places/?fields=id,secret',
+                    '/api/v1/places/{}?fields='.format(self.place_id),
+                    '/api/v1/users/?fields=password',
+                    '/api/v1/amenities/?fields=nope',
+                    '/api/v1/reviews/?fields=place'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("fields", response.json["error"])
+
+    def test_other_namespaces(self):
+        """Users, amenities and reviews honour ?fields= too."""
+        users = self.client.get('/api/v1/users/?fields=email').json
+        self.assertEqual(sorted(users, key=lambda u: u["email"]), [
+            {"email": "alice.smith@example.com"},
+            {"email": "bob.brown@example.com"}])
+        amenities = self.client.get('/api/v1/amenities/?fields=name').json
+        self.assertEqual(amenities, [{"name": "WiFi"}])
+        reviews = self.client.get('/api/v1/reviews/?fields=text,last_name')
+        self.assertEqual(reviews.json, [{"text": "Great",
+                                         "last_name": "Brown"}])
+
+
+
+class TestPlaceExpand(unittest.TestCase):
+    """Test ?expand= on place and review reads."""
+
+    def setUp(self):
+        """Create an owner, an amenity and a reviewer."""
+        self.app = create_app("config.TestingConfig")
+        self.app.config["OBJECT_CACHE_BACKEND"] = "null"
+        object_cache.init_app(self.app)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.owner_id = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        }).id
+        self.reviewer_id = facade.create_user({
+            "first_name": "Bob",
+            "last_name": "Brown",
+            "email": "bob.brown@example.com",
+            "password": "secret"
+        }).id
+        self.wifi_id = facade.create_amenity({"name": "WiFi"}).id
+        self.place_ids = []
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_places(self, count):
+        """Add `count` places, each with an amenity and a review."""
+        for _ in range(count):
+            place = facade.create_place({
+                "title": "Place {}".format(len(self.place_ids)),
+                "price": 100, "latitude": 0, "longitude": 0,
+                "owner_id": self.owner_id, "amenities": [self.wifi_id]})
+            facade.create_review({"text": "Great", "rating": 4,
+                                  "user_id": self.reviewer_id,
+                                  "place_id": place.id})
+            self.place_ids.append(place.id)
+
+    def get(self, url):
+        """Return the response and the number of statements it issued."""
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        self.assertEqual(response.status_code, 200)
+        return response, len(statements)
+
+    def test_list_query_count_constant(self):
+        """An expanded page costs the same statements for 3 or 30 places."""
+        url = '/api/v1/places/?expand=owner,amenities,reviews.user'
+        self.add_places(3)
+        few, few_count = self.get(url)
+        self.assertEqual(len(few.json), 3)
+        self.add_places(27)
+        many, many_count = self.get(url)
+        self.assertEqual(len(many.json), 30)
+        self.assertEqual(few_count, many_count)
+        # The ETag validator, the page, then one IN query per relation
+        self.assertLessEqual(many_count, 6)
+
+        place = many.json[0]
+        self.assertEqual(place["owner"]["first_name"], "Alice")
+        self.assertEqual(place["amenities"], [{"id": self.wifi_id,
+                                               "name": "WiFi"}])
+        self.assertEqual(place["reviews"][0]["user"]["last_name"], "Brown")
+
+    def test_list_with_fields(self):
+        """Expansions combine with sparse fieldsets."""
+        self.add_places(2)
+        response, _ = self.get('/api/v1/places/?fields=title&expand=owner')
+        self.assertEqual(set(response.json[0]), {"title", "owner"})
+        self.assertEqual(response.json[0]["owner"]["id"], self.owner_id)
+
+    def test_detail_only_expanded_relations(self):
+        """With expand, the detail embeds only the listed relations."""
+        self.add_places(1)
+        response, _ = self.get('/api/v1/places/{}?expand=reviews'
+                               .format(self.place_ids[0]))
+        self.assertNotIn("owner", response.json)
+        self.assertNotIn("amenities", response.json)
+        self.assertEqual(response.json["title"], "Place 0")
+        self.assertEqual(response.json["reviews"][0]["user_id"],
+                         self.reviewer_id)
+        self.assertNotIn("user", response.json["reviews"][0])
+
+    def test_review_expand(self):
+        """Reviews embed their author and place in batches."""
+        self.add_places(3)
+        response, count = self.get('/api/v1/reviews/?expand=user,place')
+        self.assertEqual(len(response.json), 3)
+        # The reviews joined to their authors, users, places
+        self.assertLessEqual(count, 3)
+        review = response.json[0]
+        self.assertEqual(review["first_name"], "Bob")
+        self.assertEqual(review["user"]["id"], self.reviewer_id)
+        self.assertIn(review["place"]["id"], self.place_ids)
+
+    def test_unknown_expansion(self):
+        """Relations that cannot be expanded are rejected."""
+        for url in ('/api/v1/places/?expand=owner,password',
+                    '/api/v1/reviews/?expand=reviews'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("expand", response.json["error"])
+
+
+
+class TestBatchGet(unittest.TestCase):
+    """Test ?ids= batch reads of places, users and amenities."""
+
+    def setUp(self):
+        """Create two users, two amenities and three places."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.user_ids = [facade.create_user({
+            "first_name": "User", "last_name": name,
+            "email": "{}@example.com".format(name.lower()),
+            "password": "secret"}).id for name in ("Alice", "Bob")]
+        self.amenity_ids = [facade.create_amenity({"name": name}).id
+                            for name in ("WiFi", "Pool")]
+        self.place_ids = [facade.create_place({
+            "title": "Place {}".format(i), "price": 100,
+            "latitude": 0, "longitude": 0,
+            "owner_id": self.user_ids[0]}).id for i in range(3)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_places(self):
+        """Places come back in request order with the missing ids."""
+        ids = [self.place_ids[2], "nope", self.place_ids[0]]
+        response = self.client.get(
+            '/api/v1/places/?ids={}&fields=id,title'.format(','.join(ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {
+            "items": [{"id": self.place_ids[2], "title": "Place 2"},
+                      {"id": self.place_ids[0], "title": "Place 0"}],
+            "missing": ["nope"]})
+
+    def test_places_expand(self):
+        """Batch reads combine with expand."""
+        response = self.client.get('/api/v1/places/?ids={}&expand=owner'
+                                   .format(self.place_ids[1]))
+        self.assertEqual(response.json["items"][0]["owner"]["last_name"],
+                         "Alice")
+
+    def test_users_and_amenities(self):
+        """Users and amenities accept ids too."""
+        users = self.client.get('/api/v1/users/?ids={},nope'.format(
+            self.user_ids[1])).json
+        self.assertEqual([user["last_name"] for user in users["items"]],
+                         ["Bob"])
+        self.assertEqual(users["missing"], ["nope"])
+        amenities = self.client.get('/api/v1/amenities/?ids={}'.format(
+            ','.join(reversed(self.amenity_ids)))).json
+        self.assertEqual([amenity["name"] for amenity in amenities["items"]],
+                         ["Pool", "WiFi"])
+
+    def test_invalid_ids(self):
+        """Empty or oversized id lists are rejected."""
+        too_many = ','.join(str(i) for i in range(101))
+        for url in ('/api/v1/places/?ids=', '/api/v1/users/?ids=,',
+                    '/api/v1/amenities/?ids=' + too_many):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
 if __name__ == '__main__':
     unittest.main()
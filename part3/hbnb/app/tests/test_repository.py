@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Tests for the repository implementations."""
+
+import unittest
+from types import SimpleNamespace
+from sqlalchemy import event
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.persistence.repository import (InMemoryRepository, Range,
+                                        SQLAlchemyRepository)
+
+
+class GetManyCases:
+    """get_many behaviour shared by every repository."""
+
+    def test_request_order(self):
+        """Objects come back in the order of the requested ids."""
+        ids = [self.ids[2], self.ids[0], self.ids[1]]
+        found, missing = self.repo.get_many(ids)
+        self.assertEqual([obj.id for obj in found], ids)
+        self.assertEqual(missing, [])
+
+    def test_missing_ids(self):
+        """Unknown ids are reported in request order."""
+        found, missing = self.repo.get_many(
+            ["nope-1", self.ids[1], "nope-2"])
+        self.assertEqual([obj.id for obj in found], [self.ids[1]])
+        self.assertEqual(missing, ["nope-1", "nope-2"])
+
+    def test_duplicates_and_empty(self):
+        """Duplicate ids are returned once; no ids, no objects."""
+        found, _ = self.repo.get_many([self.ids[0], self.ids[0]])
+        self.assertEqual(len(found), 1)
+        self.assertEqual(self.repo.get_many([]), ([], []))
+
+
+class TestInMemoryGetMany(GetManyCases, unittest.TestCase):
+    """get_many on the in-memory repository."""
+
+    def setUp(self):
+        self.repo = InMemoryRepository()
+        self.ids = ["a", "b", "c"]
+        self.repo.add_all(SimpleNamespace(id=obj_id) for obj_id in self.ids)
+
+
+class TestSQLAlchemyGetMany(GetManyCases, unittest.TestCase):
+    """get_many on the SQLAlchemy repository."""
+
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.repo = SQLAlchemyRepository(Amenity)
+        amenities = [Amenity(name=name) for name in ("WiFi", "Pool", "Sauna")]
+        self.repo.add_all(amenities)
+        db.session.commit()
+        self.ids = [amenity.id for amenity in amenities]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_single_query(self):
+        """All the ids are resolved by one statement."""
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            self.repo.get_many(self.ids + ["nope"])
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        self.assertEqual(len(statements), 1)
+        self.assertIn(" IN ", statements[0])
+
+
+
+class Record(SimpleNamespace):
+    """Stored object with the update() the repository calls."""
+
+    def update(self, data):
+        for key, value in data.items():
+            setattr(self, key, value)
+
+
+class TestInMemoryIndexes(unittest.TestCase):
+    """Secondary indexes of the in-memory repository."""
+
+    def setUp(self):
+        self.repo = InMemoryRepository(unique=('email',), indexes=('city',),
+                                       ranges=('price',))
+        for i, (city, price) in enumerate([("Paris", 80), ("Lyon", 120),
+                                           ("Paris", 50), ("Paris", 300)]):
+            self.repo.add(Record(id=str(i), email="u{}@example.com".format(i),
+                                 city=city, price=price))
+
+    def test_lookups(self):
+        """Unique, non-unique and range lookups, alone and combined."""
+        self.assertEqual(self.repo.get_by_attribute('email', 'u1@example.com').id,
+                         "1")
+        self.assertEqual(len(self.repo.find_by(city="Paris")), 3)
+        self.assertEqual([obj.price for obj in
+                          self.repo.find_by(city="Paris", price=Range(60, None))],
+                         [80, 300])
+
+    def test_maintenance(self):
+        """Indexes follow updates and deletions; unique values are enforced."""
+        self.repo.update("2", {'price': 90, 'city': "Lyon"})
+        self.assertEqual([obj.id for obj in self.repo.find_by(city="Lyon")],
+                         ["1", "2"])
+        self.repo.delete("1")
+        self.assertEqual([obj.id for obj in
+                          self.repo.find_by(price=Range(None, 100))], ["0", "2"])
+        with self.assertRaises(ValueError):
+            self.repo.update("0", {'email': 'u3@example.com'})
+
+
+if __name__ == '__main__':
+    unittest.main()
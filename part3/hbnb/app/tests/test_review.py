@@ -2,7 +2,11 @@
 """Tests for Review model and APIs."""
 
 import unittest
-from app import create_app
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.services import facade
 from app.models.user import User
 from app.models.place import Place
 from app.models.review import Review
@@ -233,5 +237,304 @@ class TestReviewEndpoints(unittest.TestCase):
         self.assertEqual(get_response.status_code, 404)
 
 
+class TestReviewAggregates(unittest.TestCase):
+    """Test cases for the rating aggregates kept on places."""
+
+    def setUp(self):
+        """Create an in-memory database with two places and reviewers."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.users = [facade.create_user({
+            "first_name": "User",
+            "last_name": str(i),
+            "email": "user{}@example.com".format(i),
+            "password": "secret"
+        }).id for i in range(3)]
+        self.place_id = self.create_place("Loft")
+        self.other_id = self.create_place("Cabin")
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def create_place(self, title):
+        return facade.create_place({"title": title, "price": 100,
+                                    "latitude": 0, "longitude": 0,
+                                    "owner_id": self.users[0]}).id
+
+    def review(self, user, rating, place_id=None):
+        return facade.create_review({"text": "Review", "rating": rating,
+                                     "user_id": self.users[user],
+                                     "place_id": place_id or self.place_id})
+
+    def aggregates(self, place_id=None):
+        place = facade.get_place(place_id or self.place_id)
+        return (place.review_count, place.rating_sum, place.rating_avg,
+                place.rating_histogram)
+
+    def test_create_update_delete(self):
+        """Aggregates follow review creation, update and deletion."""
+        self.review(1, 5)
+        second = self.review(2, 2).id
+        self.assertEqual(self.aggregates(), (
+            2, 7, 3.5, {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}))
+
+        facade.update_review(second, {"rating": 4})
+        self.assertEqual(self.aggregates(), (
+            2, 9, 4.5, {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}))
+
+        facade.delete_review(second)
+        self.assertEqual(self.aggregates(), (
+            1, 5, 5.0, {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1}))
+
+    def test_rebuild(self):
+        """The rebuild repairs aggregates that drifted."""
+        self.review(1, 3)
+        place = facade.get_place(self.place_id)
+        place.review_count, place.rating_avg = 42, 1.0
+        db.session.commit()
+        stamps = {place_id: facade.get_place(place_id).updated_at
+                  for place_id in (self.place_id, self.other_id)}
+        urls = ['/api/v1/places/', '/api/v1/places/{}'.format(self.place_id)]
+        etags = [self.client.get(url).headers["ETag"] for url in urls]
+
+        result = self.app.test_cli_runner().invoke(
+            args=["hbnb", "rebuild-ratings"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("1 places repaired", result.output)
+        self.assertEqual(self.aggregates(), (
+            1, 3, 3.0, {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}))
+        # Only the repaired place looks modified, so cached copies of
+        # it are revalidated
+        self.assertGreater(facade.get_place(self.place_id).updated_at,
+                           stamps[self.place_id])
+        self.assertEqual(facade.get_place(self.other_id).updated_at,
+                         stamps[self.other_id])
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(facade.rebuild_rating_aggregates(), 0)
+
+    def test_sort_by_rating(self):
+        """The listing can be sorted by average rating."""
+        self.review(1, 2)
+        self.review(1, 4, self.other_id)
+        response = self.client.get('/api/v1/places/?sort=-rating')
+        self.assertEqual([place["title"] for place in response.json],
+                         ["Cabin", "Loft"])
+        self.assertEqual(response.json[0]["rating"], 4.0)
+        self.assertEqual(response.json[0]["review_count"], 1)
+
+        response = self.client.get('/api/v1/places/{}'.format(self.place_id))
+        self.assertEqual(response.json["rating_histogram"]["2"], 1)
+
+
+class TestPlaceReviewsConditionalGet(unittest.TestCase):
+    """Test cases for ETags on the reviews of a place."""
+
+    def setUp(self):
+        """Create a place with one review."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.user_id = facade.create_user({
+            "first_name": "Alice",
+            "last_name": "Smith",
+            "email": "alice.smith@example.com",
+            "password": "secret"
+        }).id
+        self.place_id = facade.create_place({
+            "title": "Loft", "price": 100, "latitude": 0, "longitude": 0,
+            "owner_id": self.user_id}).id
+        self.review_id = facade.create_review({
+            "text": "Great", "rating": 4,
+            "user_id": self.user_id, "place_id": self.place_id}).id
+        self.url = '/api/v1/reviews/places/{}/reviews'.format(self.place_id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_not_modified_until_a_review_changes(self):
+        """The ETag holds until a review or its author changes."""
+        etag = self.client.get(self.url).headers["ETag"]
+        headers = {"If-None-Match": etag}
+        self.assertEqual(self.client.get(self.url, headers=headers)
+                         .status_code, 304)
+        facade.update_review(self.review_id, {"text": "Good"})
+        response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json[0]["text"], "Good")
+
+    def test_missing_place(self):
+        """An unknown place is still a 404."""
+        response = self.client.get('/api/v1/reviews/places/missing/reviews')
+        self.assertEqual(response.status_code, 404)
+
+
+
+class TestBatchWrites(unittest.TestCase):
+    """Test cases for the review and place batch endpoints."""
+
+    def setUp(self):
+        """Create an owner with three places and a reviewer."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.owner_id, self.reviewer_id = [facade.create_user({
+            "first_name": "User", "last_name": name,
+            "email": "{}@example.com".format(name.lower()),
+            "password": "secret"}).id for name in ("Alice", "Bob")]
+        self.place_ids = [facade.create_place({
+            "title": "Place {}".format(i), "price": 100,
+            "latitude": 0, "longitude": 0,
+            "owner_id": self.owner_id}).id for i in range(3)]
+        facade.create_review({"text": "Old", "rating": 3,
+                              "user_id": self.reviewer_id,
+                              "place_id": self.place_ids[2]})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def post(self, url, items, user_id=None):
+        token = create_access_token(identity=user_id or self.reviewer_id)
+        return self.client.post(url, json=items, headers={
+            "Authorization": "Bearer {}".format(token)})
+
+    def test_reviews_per_item_results(self):
+        """Valid reviews are created, the others get their own error."""
+        response = self.post('/api/v1/reviews/batch', [
+            {"text": "Nice", "rating": 5, "place_id": self.place_ids[0]},
+            {"text": "Again", "rating": 4, "place_id": self.place_ids[0]},
+            {"text": "Old", "rating": 4, "place_id": self.place_ids[2]},
+            {"text": "Bad", "rating": 9, "place_id": self.place_ids[1]},
+            {"text": "Ghost", "rating": 1, "place_id": "nope"},
+            {"text": "Fine", "rating": 1, "place_id": self.place_ids[1]},
+        ])
+        self.assertEqual(response.status_code, 207)
+        results = response.json["results"]
+        self.assertEqual([result["status"] for result in results],
+                         [201, 400, 400, 400, 400, 201])
+        self.assertIn("already reviewed", results[1]["error"])
+        self.assertIn("already reviewed", results[2]["error"])
+        self.assertEqual(facade.get_review(results[0]["id"]).text, "Nice")
+
+        place = facade.get_place(self.place_ids[1])
+        self.assertEqual((place.review_count, place.rating_avg), (1, 1.0))
+
+    def test_reviews_own_place(self):
+        """Owners cannot review their places in a batch either."""
+        response = self.post('/api/v1/reviews/batch', [
+            {"text": "Mine", "rating": 5, "place_id": self.place_ids[0]}],
+            self.owner_id)
+        self.assertEqual(response.json["results"][0]["status"], 400)
+
+    def count_selects(self, items):
+        """Return the number of SELECTs issued by a review batch."""
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.startswith("SELECT"):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            self.post('/api/v1/reviews/batch', items)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return len(statements)
+
+    def test_reviews_constant_queries(self):
+        """Validation does not issue one query per item."""
+        # Warm the cache of the current user first
+        self.post('/api/v1/reviews/batch', [{"place_id": "nope"}])
+        one = self.count_selects([
+            {"text": "Nice", "rating": 5, "place_id": self.place_ids[0]}])
+        three = self.count_selects([
+            {"text": "Nice", "rating": 5, "place_id": place_id}
+            for place_id in reversed(self.place_ids)])
+        self.assertEqual(one, three)
+
+    def test_unique_constraint(self):
+        """The database rejects a second review of a place by a user."""
+        from sqlalchemy.exc import IntegrityError
+        db.session.add(Review(text="Twice", rating=2,
+                              user=db.session.get(User, self.reviewer_id),
+                              place=db.session.get(Place,
+                                                   self.place_ids[2])))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+    def test_places(self):
+        """Places are created in one request with per-item results."""
+        wifi = facade.create_amenity({"name": "WiFi"}).id
+        response = self.post('/api/v1/places/batch', [
+            {"title": "Loft", "price": 80, "latitude": 1, "longitude": 2,
+             "amenities": [wifi]},
+            {"title": "", "price": 80, "latitude": 1, "longitude": 2},
+            {"title": "Cabin", "price": 80, "latitude": 1, "longitude": 2,
+             "amenities": ["nope"]},
+            {"price": 80, "latitude": 1, "longitude": 2},
+        ])
+        self.assertEqual(response.status_code, 207)
+        results = response.json["results"]
+        self.assertEqual([result["status"] for result in results],
+                         [201, 400, 400, 400])
+        place = facade.get_place(results[0]["id"])
+        self.assertEqual(place.owner_id, self.reviewer_id)
+        self.assertEqual([amenity.name for amenity in place.amenities],
+                         ["WiFi"])
+
+    def test_malformed_items(self):
+        """Ids of the wrong type fail their item, not the batch."""
+        response = self.post('/api/v1/reviews/batch', [
+            {"text": "List", "rating": 5, "place_id": [self.place_ids[0]]},
+            {"text": "Dict", "rating": 5, "place_id": {"id": "x"}},
+            {"text": "Fine", "rating": 5, "place_id": self.place_ids[0]},
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result["status"] for result
+                          in response.json["results"]], [400, 400, 201])
+
+        place = {"title": "Loft", "price": 80, "latitude": 1, "longitude": 2}
+        response = self.post('/api/v1/places/batch', [
+            dict(place, amenities=5), dict(place, amenities="wifi"),
+            dict(place, amenities=[["x"]]), dict(place, amenities=[])])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result["status"] for result
+                          in response.json["results"]], [400, 400, 400, 201])
+
+    def test_single_review_conflict(self):
+        """A review created concurrently answers 409, not 500."""
+        from sqlalchemy.exc import IntegrityError
+        conflict = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+        with mock.patch.object(facade, 'create_review',
+                               side_effect=conflict):
+            response = self.post('/api/v1/reviews/', {
+                "text": "Nice", "rating": 5,
+                "place_id": self.place_ids[0]})
+        self.assertEqual(response.status_code, 409)
+
+    def test_invalid_body(self):
+        """The body must be a non-empty array of at most 100 objects."""
+        for body in ({"title": "Loft"}, [], ["Loft"], [{}] * 101):
+            response = self.post('/api/v1/places/batch', body)
+            self.assertEqual(response.status_code, 400)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 """Tests for User model and APIs."""
 
+import threading
+import time
 import unittest
-from app import create_app
+from flask_jwt_extended import create_access_token
+from app import create_app, db, password_hasher, user_cache
 from app.models.user import User
+from app.passwords import PasswordHasherBusy, hash_scheme
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+from app.services import facade
 
 class TestUserModel(unittest.TestCase):
     """Test cases for User model."""
@@ -167,5 +177,212 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertEqual(update_response.status_code, 404)
         self.assertIn("error", update_response.json)
 
+class TestPasswordHasher(unittest.TestCase):
+    """Test cases for the password hashing pool."""
+
+    def setUp(self):
+        """Set up an in-memory database with one user."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user = User(first_name="Alice", last_name="Smith",
+                    email="alice.smith@example.com")
+        user.hash_password("secret")
+        db.session.add(user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_hash_uses_configured_cost(self):
+        """Hashes use the BCRYPT_LOG_ROUNDS of the config class."""
+        hashed = password_hasher.hash("secret")
+        self.assertTrue(hashed.startswith("$2b$04$"))
+        self.assertTrue(password_hasher.verify("secret", hashed))
+        self.assertFalse(password_hasher.verify("wrong", hashed))
+        self.assertFalse(password_hasher.verify("secret", "not-a-hash"))
+
+    def test_login(self):
+        """Login verifies the password through the pool."""
+        response = self.client.post('/api/v1/auth/login', json={
+            "email": "alice.smith@example.com", "password": "secret"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/v1/auth/login', json={
+            "email": "alice.smith@example.com", "password": "wrong"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(password_hasher.metrics()["completed"], 3)
+
+    def test_backpressure(self):
+        """Requests beyond the pending limit are rejected after the wait."""
+        self.app.config.update(PASSWORD_HASH_MAX_PENDING=1,
+                               PASSWORD_HASH_WAIT_TIMEOUT=0.01)
+        password_hasher.init_app(self.app)
+        pool = self.app.extensions['password_hasher']
+        release = threading.Event()
+        worker = threading.Thread(target=pool.run, args=(release.wait,))
+        worker.start()
+        try:
+            while not pool.pending:
+                pass
+            with self.assertRaises(PasswordHasherBusy):
+                password_hasher.hash("secret")
+            response = self.client.post('/api/v1/auth/login', json={
+                "email": "alice.smith@example.com", "password": "secret"})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers["Retry-After"], "1")
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(password_hasher.metrics()["rejected"], 2)
+
+
+class TestPasswordRehash(unittest.TestCase):
+    """Test cases for upgrading outdated hashes on login."""
+
+    def setUp(self):
+        """Set up an in-memory database with one user hashed at cost 4."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user = User(first_name="Alice", last_name="Smith",
+                    email="alice.smith@example.com")
+        user.hash_password("secret")
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.old_hash = user.password
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def login(self, password="secret"):
+        response = self.client.post('/api/v1/auth/login', json={
+            "email": "alice.smith@example.com", "password": password})
+        # Wait for the background rehash, if any
+        pool = self.app.extensions['password_hasher']
+        while pool.pending:
+            time.sleep(0.001)
+        db.session.expire_all()
+        return response
+
+    def test_needs_rehash(self):
+        """Hashes made with another cost or scheme are outdated."""
+        self.assertFalse(password_hasher.needs_rehash(self.old_hash))
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        self.assertTrue(password_hasher.needs_rehash(self.old_hash))
+
+    def test_current_hash_is_kept(self):
+        """A login with an up to date hash does not rewrite it."""
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(facade.get_user(self.user_id).password,
+                         self.old_hash)
+
+    def test_login_upgrades_cost(self):
+        """A login with an outdated cost stores a new hash."""
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        self.assertEqual(self.login().status_code, 200)
+        user = facade.get_user(self.user_id)
+        self.assertTrue(user.password.startswith("$2b$05$"))
+        self.assertTrue(user.verify_password("secret"))
+
+    def test_failed_login_keeps_hash(self):
+        """A wrong password never triggers a rehash."""
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        self.assertEqual(self.login("wrong").status_code, 401)
+        self.assertEqual(facade.get_user(self.user_id).password,
+                         self.old_hash)
+
+    def test_concurrent_change_wins(self):
+        """A rehash never overwrites a password changed meanwhile."""
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        user = facade.get_user(self.user_id)
+        changed = password_hasher.hash("changed")
+        future = facade.rehash_password_if_needed(user, "secret")
+        facade.put_user(self.user_id, {"password": changed})
+        self.assertFalse(future.result())
+        db.session.expire_all()
+        self.assertEqual(facade.get_user(self.user_id).password, changed)
+
+    @unittest.skipIf(argon2 is None, "argon2-cffi is not installed")
+    def test_login_migrates_to_argon2id(self):
+        """bcrypt hashes are replaced by argon2id ones on login."""
+        self.app.config["PASSWORD_HASH_SCHEME"] = "argon2id"
+        self.assertEqual(self.login().status_code, 200)
+        user = facade.get_user(self.user_id)
+        self.assertEqual(hash_scheme(user.password), "argon2id")
+        self.assertFalse(user.password_needs_rehash())
+        self.assertTrue(user.verify_password("secret"))
+        self.assertFalse(user.verify_password("wrong"))
+
+class TestCurrentUserCache(unittest.TestCase):
+    """Test cases for the authenticated user cache."""
+
+    def setUp(self):
+        """Set up an in-memory database with an admin."""
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        admin = facade.create_user({
+            "first_name": "Admin",
+            "last_name": "Root",
+            "email": "admin@hbnb.io",
+            "password": password_hasher.hash("secret"),
+            "is_admin": True
+        })
+        self.admin_id = admin.id
+        self.headers = {"Authorization": "Bearer {}".format(
+            create_access_token(identity=admin.id))}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def get_metrics(self, headers=None):
+        return self.client.get('/api/v1/auth/hasher-metrics',
+                               headers=headers or self.headers)
+
+    def test_user_loaded_once(self):
+        """Later requests with the same identity hit the cache."""
+        self.assertEqual(self.get_metrics().status_code, 200)
+        self.assertEqual(self.get_metrics().status_code, 200)
+        stats = user_cache.stats()
+        self.assertEqual((stats["misses"], stats["hits"]), (1, 1))
+
+    def test_put_user_invalidates(self):
+        """A role change is seen by the next request."""
+        self.assertEqual(self.get_metrics().status_code, 200)
+        facade.put_user(self.admin_id, {"is_admin": False})
+        self.assertEqual(self.get_metrics().status_code, 403)
+
+    def test_unknown_user(self):
+        """A token for a missing user is rejected."""
+        headers = {"Authorization": "Bearer {}".format(
+            create_access_token(identity="missing"))}
+        self.assertEqual(self.get_metrics(headers).status_code, 401)
+
+    def test_trusted_admin_claim(self):
+        """With JWT_TRUST_ADMIN_CLAIM the claim replaces the lookup."""
+        self.app.config["JWT_TRUST_ADMIN_CLAIM"] = True
+        token = self.client.post('/api/v1/auth/login', json={
+            "email": "admin@hbnb.io", "password": "secret"
+        }).get_json()["access_token"]
+        response = self.get_metrics(
+            {"Authorization": "Bearer {}".format(token)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_cache.stats()["misses"], 0)
+        self.assertIn('desc="0 queries"', response.headers["Server-Timing"])
+
+
 if __name__ == '__main__':
     unittest.main()
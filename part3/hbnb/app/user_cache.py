@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Cache of the authenticated user behind flask_jwt_extended.
+
+Protected handlers only need the caller's id and `is_admin` flag. The
+user is loaded once per request by the `user_lookup_loader` (see
+`get_current_user()`), and between requests from a small LRU cache
+whose entries expire after CURRENT_USER_CACHE_TTL seconds. Updating a
+user through the facade evicts its entry.
+
+With JWT_TRUST_ADMIN_CLAIM enabled, tokens carrying an `is_admin` claim
+are trusted as is and no query is made at all; a demoted admin then
+keeps their rights until their token expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class CachedUser:
+    """Snapshot of the fields authorization needs, safe across sessions."""
+
+    __slots__ = ('id', 'email', 'first_name', 'last_name', 'is_admin')
+
+    def __init__(self, id, is_admin, email=None, first_name=None,
+                 last_name=None):
+        self.id = id
+        self.is_admin = bool(is_admin)
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.is_admin, user.email, user.first_name,
+                   user.last_name)
+
+
+class _TTLCache:
+    """Thread-safe LRU mapping whose entries expire after `ttl` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserCache:
+    """Flask extension loading the JWT identity through a TTL/LRU cache."""
+
+    def __init__(self, app=None, jwt=None):
+        if app is not None:
+            self.init_app(app, jwt)
+
+    def init_app(self, app, jwt):
+        app.config.setdefault('CURRENT_USER_CACHE_SIZE', 1024)
+        app.config.setdefault('CURRENT_USER_CACHE_TTL', 30)
+        app.config.setdefault('JWT_TRUST_ADMIN_CLAIM', False)
+        app.extensions['user_cache'] = _TTLCache(
+            app.config['CURRENT_USER_CACHE_SIZE'],
+            app.config['CURRENT_USER_CACHE_TTL'])
+        jwt.user_lookup_loader(self._load)
+
+    @staticmethod
+    def _cache():
+        return current_app.extensions['user_cache']
+
+    def _load(self, jwt_header, jwt_data):
+        user_id = jwt_data['sub']
+        if (current_app.config['JWT_TRUST_ADMIN_CLAIM']
+                and 'is_admin' in jwt_data):
+            return CachedUser(user_id, jwt_data['is_admin'])
+        return self.get(user_id)
+
+    def get(self, user_id):
+        """Return a CachedUser for an id, or None if it does not exist."""
+        cache = self._cache()
+        user = cache.get(user_id)
+        if user is None:
+            from app.services import facade
+            stored = facade.get_user(user_id)
+            if stored is None:
+                return None
+            user = CachedUser.from_user(stored)
+            cache.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        """Forget a user, e.g. after its role or profile changed."""
+        self._cache().invalidate(user_id)
+
+    def clear(self):
+        self._cache().clear()
+
+    def stats(self):
+        cache = self._cache()
+        return {'hits': cache.hits, 'misses': cache.misses,
+                'size': len(cache)}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare the place list throughput with and without orjson and gzip.
+
+Run from part3/hbnb:
+
+    python -m benchmarks.bench_compression [--places N] [--requests N]
+
+For each setup it reports the requests per second, the bytes sent per
+response, and the bytes per second of JSON payload delivered and put on
+the wire. 'baseline' is the stdlib encoder without compression, i.e.
+the behaviour before JSON_SERIALIZER and COMPRESS_* existed.
+"""
+
+import argparse
+import time
+from app import create_app, db, serialization
+from app.compression import _brotli
+from app.models.place import Place
+from app.models.user import User
+from config import TestingConfig
+
+SETUPS = [
+    # (name, JSON_SERIALIZER, Accept-Encoding, COMPRESS_CACHE_SIZE)
+    ('baseline', 'json', 'identity', 0),
+    ('orjson', 'orjson', 'identity', 0),
+    ('orjson+gzip', 'orjson', 'gzip', 0),
+    ('orjson+gzip cached', 'orjson', 'gzip', 256),
+    ('orjson+br', 'orjson', 'br', 0),
+]
+
+
+def run(serializer, encoding, cache_size, places, requests):
+    config = type('BenchConfig', (TestingConfig,), {
+        'JSON_SERIALIZER': serializer,
+        'COMPRESS_CACHE_SIZE': cache_size,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        owner = User(first_name="Bench", last_name="Mark",
+                     email="bench@example.com", password="x")
+        db.session.add(owner)
+        db.session.flush()
+        db.session.add_all([
+            Place(title="Place {}".format(i), description="A place " * 10,
+                  price=50 + i % 200, latitude=(i % 180) - 90.0,
+                  longitude=(i % 360) - 180.0, owner_id=owner.id)
+            for i in range(places)])
+        db.session.commit()
+
+        client = app.test_client()
+        url = '/api/v1/places/?limit={}'.format(min(places, 500))
+        payload = len(client.get(
+            url, headers={"Accept-Encoding": "identity"}).data)
+        headers = {"Accept-Encoding": encoding}
+        wire = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            wire += len(client.get(url, headers=headers).data)
+        elapsed = time.perf_counter() - start
+        db.session.remove()
+        db.drop_all()
+    return (requests / elapsed, wire / requests,
+            payload * requests / elapsed, wire / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--places', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    print("{:<20} {:>10} {:>12} {:>14} {:>14}".format(
+        'setup', 'req/s', 'bytes/resp', 'payload B/s', 'wire B/s'))
+    for name, serializer, encoding, cache_size in SETUPS:
+        if serializer == 'orjson' and serialization._orjson is None:
+            print("{:<20} skipped, orjson is not installed".format(name))
+            continue
+        if encoding == 'br' and _brotli is None:
+            print("{:<20} skipped, brotli is not installed".format(name))
+            continue
+        result = run(serializer, encoding, cache_size, args.places,
+                     args.requests)
+        print("{:<20} {:>10.1f} {:>12.0f} {:>14.0f} {:>14.0f}".format(
+            name, *result))
+
+
+if __name__ == '__main__':
+    main()
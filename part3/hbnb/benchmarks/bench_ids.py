@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Compare index sizes and join speed with text and 16-byte ids.
+
+Run from part3/hbnb:
+
+    python -m benchmarks.bench_ids [--users N] [--places N] [--reviews N]
+
+A SQLite file is filled with 36-character text ids, as written before
+BinaryUUID, then converted with `migrate_ids`; the file is vacuumed
+before each measure. For both layouts it reports the size of the tables
+and of the indexes holding ids (from dbstat), the time of a join of
+every review with its place and author, and the time to read the
+reviews of one place with their authors.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from app import create_app, db
+from app.services.id_migration import migrate_ids
+from config import TestingConfig
+
+ENTITIES = ('users', 'places', 'reviews')
+JOIN = ("SELECT count(*), sum(places.price), max(users.email) FROM reviews "
+        "JOIN places ON places.id = reviews.place_id "
+        "JOIN users ON users.id = reviews.user_id")
+PLACE_REVIEWS = ("SELECT reviews.id, reviews.text, users.first_name "
+                 "FROM reviews JOIN users ON users.id = reviews.user_id "
+                 "WHERE reviews.place_id = ?")
+
+
+def fill(connection, users, places, reviews):
+    """Insert rows with text ids, the layout before BinaryUUID."""
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    place_ids = [str(uuid.uuid4()) for _ in range(places)]
+    connection.exec_driver_sql(
+        "INSERT INTO users (id, first_name, last_name, email, password, "
+        "is_admin) VALUES (?, 'User', 'Bench', ?, 'x', 0)",
+        [(user_id, "{}@example.com".format(user_id))
+         for user_id in user_ids])
+    connection.exec_driver_sql(
+        "INSERT INTO places (id, title, price, latitude, longitude, "
+        "owner_id, grid_cell, amenity_mask, review_count, rating_sum, "
+        "rating_avg, rating_1, rating_2, rating_3, rating_4, rating_5) "
+        "VALUES (?, 'Place', 100, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)",
+        [(place_id, random.choice(user_ids)) for place_id in place_ids])
+    pairs = set()
+    while len(pairs) < reviews:
+        pairs.add((random.choice(user_ids), random.choice(place_ids)))
+    connection.exec_driver_sql(
+        "INSERT INTO reviews (id, text, rating, user_id, place_id) "
+        "VALUES (?, 'Nice', 4, ?, ?)",
+        [(str(uuid.uuid4()), user_id, place_id)
+         for user_id, place_id in pairs])
+    connection.commit()
+    return place_ids
+
+
+def sizes(connection):
+    """(table bytes, bytes of the indexes holding ids) of the entities"""
+    pages = dict(connection.exec_driver_sql(
+        "SELECT name, sum(pgsize) FROM dbstat GROUP BY name").all())
+    tables = sum(pages[table] for table in ENTITIES)
+    indexes = 0
+    for table in ENTITIES:
+        for index in connection.exec_driver_sql(
+                "PRAGMA index_list({})".format(table)).all():
+            columns = [row[2] for row in connection.exec_driver_sql(
+                "PRAGMA index_info({})".format(index[1]))]
+            if any(column.endswith('id') for column in columns):
+                indexes += pages[index[1]]
+    return tables, indexes
+
+
+def timed(connection, statement, params=(), repeat=5):
+    """Best time of `repeat` runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.exec_driver_sql(statement, params).all()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def vacuum(connection):
+    connection.execution_options(
+        isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
+
+
+def measure(connection, place_ids, lookups):
+    vacuum(connection)
+    tables, indexes = sizes(connection)
+    join_ms = timed(connection, JOIN)
+    start = time.perf_counter()
+    for place_id in place_ids[:lookups]:
+        connection.exec_driver_sql(PLACE_REVIEWS, (place_id,)).all()
+    lookup_us = (time.perf_counter() - start) * 1e6 / lookups
+    return tables, indexes, join_ms, lookup_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--places', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.db')
+    config = type('BenchConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+        'SLOW_QUERY_THRESHOLD_MS': float('inf'),
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as connection:
+            place_ids = fill(connection, args.users, args.places,
+                             args.reviews)
+            lookups = min(args.lookups, len(place_ids))
+            before = measure(connection, place_ids, lookups)
+            migrate_ids(connection)
+            blob_ids = [uuid.UUID(place_id).bytes
+                        for place_id in place_ids]
+            after = measure(connection, blob_ids, lookups)
+        db.engine.dispose()
+    os.remove(path)
+    os.rmdir(directory)
+
+    print("{:<8} {:>12} {:>12} {:>10} {:>14}".format(
+        'ids', 'tables B', 'id index B', 'join ms', 'lookup us'))
+    for name, result in (('text', before), ('binary', after)):
+        print("{:<8} {:>12} {:>12} {:>10.1f} {:>14.1f}".format(
+            name, *result))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,42 @@ import os
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOWEST_QUERIES_KEPT = 3
+    PASSWORD_HASH_SCHEME = os.getenv('PASSWORD_HASH_SCHEME', 'bcrypt')
+    BCRYPT_LOG_ROUNDS = 12
+    ARGON2_TIME_COST = 2
+    ARGON2_MEMORY_COST = 19456
+    ARGON2_PARALLELISM = 1
+    PASSWORD_HASH_WORKERS = 4
+    PASSWORD_HASH_MAX_PENDING = 64
+    PASSWORD_HASH_WAIT_TIMEOUT = 0.5
+    CURRENT_USER_CACHE_SIZE = 1024
+    CURRENT_USER_CACHE_TTL = 30
+    JWT_TRUST_ADMIN_CLAIM = os.getenv('JWT_TRUST_ADMIN_CLAIM') == '1'
+    OBJECT_CACHE_BACKEND = os.getenv('OBJECT_CACHE_BACKEND', 'lru')
+    OBJECT_CACHE_SIZE = 2048
+    OBJECT_CACHE_URL = os.getenv('OBJECT_CACHE_URL', 'redis://localhost:6379/0')
+    JSON_SERIALIZER = os.getenv('JSON_SERIALIZER', 'auto')
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_LEVEL = 5
+    COMPRESS_CACHE_SIZE = 256
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///development.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+class TestingConfig(Config):
+    TESTING = True
+    BCRYPT_LOG_ROUNDS = 4
+    ARGON2_MEMORY_COST = 1024
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
@@ -2,7 +2,8 @@ from app import create_app
 from flask_cors import CORS
 
 app = create_app()
-CORS(app)
+# The places listing returns its next page cursor in X-Next-Cursor
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
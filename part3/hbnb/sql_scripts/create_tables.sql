@@ -3,7 +3,7 @@
 -- tables structures 
 
 CREATE TABLE users (
-	id CHAR(36) PRIMARY KEY,
+	id BLOB PRIMARY KEY,
 	first_name VARCHAR(255),
 	last_name VARCHAR(255),
 	email VARCHAR(255) UNIQUE,
@@ -14,25 +14,41 @@ CREATE TABLE users (
 );
 
 CREATE TABLE places (
-	id CHAR(36) PRIMARY KEY,
+	id BLOB PRIMARY KEY,
 	title VARCHAR(255),
 	description TEXT,
 	price DECIMAL(10, 2),
 	latitude FLOAT,
 	longitude FLOAT,
-	owner_id CHAR(36),
+	owner_id BLOB,
+	image TEXT,
+	grid_cell INTEGER NOT NULL,
+	amenity_mask BIGINT NOT NULL DEFAULT 0,
+	review_count INT NOT NULL DEFAULT 0,
+	rating_sum INT NOT NULL DEFAULT 0,
+	rating_avg FLOAT NOT NULL DEFAULT 0,
+	rating_1 INT NOT NULL DEFAULT 0,
+	rating_2 INT NOT NULL DEFAULT 0,
+	rating_3 INT NOT NULL DEFAULT 0,
+	rating_4 INT NOT NULL DEFAULT 0,
+	rating_5 INT NOT NULL DEFAULT 0,
 	created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 	FOREIGN KEY (owner_id) REFERENCES users(id)
 );
 
+CREATE INDEX ix_places_created_at_id ON places (created_at, id);
+CREATE INDEX ix_places_price_id ON places (price, id);
+CREATE INDEX ix_places_rating_avg_id ON places (rating_avg, id);
+CREATE INDEX ix_places_grid_cell ON places (grid_cell);
+
 
 CREATE TABLE reviews (
-	   id CHAR(36) PRIMARY KEY,
+	   id BLOB PRIMARY KEY,
 	   text TEXT,
 	   rating INT CHECK (rating >= 1 AND rating <= 5),
-	   user_id CHAR(36),
-	   place_id CHAR(36),
+	   user_id BLOB,
+	   place_id BLOB,
 	   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 	   updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 	   UNIQUE (user_id, place_id),
@@ -41,16 +57,24 @@ CREATE TABLE reviews (
 );
 
 CREATE TABLE amenities (
-	id CHAR(36) PRIMARY KEY,
+	id BLOB PRIMARY KEY,
 	name VARCHAR(255) UNIQUE,
+	bit INTEGER,
 	created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE place_amenity (
-	   place_id CHAR(36),
-	   amenity_id CHAR(36),
+	   place_id BLOB,
+	   amenity_id BLOB,
 	   PRIMARY KEY (place_id, amenity_id),
 	   FOREIGN KEY (place_id) REFERENCES places(id),
 	   FOREIGN KEY (amenity_id) REFERENCES amenities(id)
-);
\ No newline at end of file
+);
+
+CREATE INDEX ix_users_updated_at ON users (updated_at);
+CREATE INDEX ix_places_updated_at ON places (updated_at);
+CREATE INDEX ix_reviews_updated_at ON reviews (updated_at);
+CREATE INDEX ix_reviews_place_id_updated_at ON reviews (place_id, updated_at, user_id);
+CREATE INDEX ix_amenities_updated_at ON amenities (updated_at);
+CREATE UNIQUE INDEX ix_amenities_bit ON amenities (bit);
@@ -6,7 +6,10 @@ reviews, and API communication with the Flask backend.
 
 
 let authToken = null;
-let allPlaces = [];
+// Places fetched per request; the next ones are loaded on demand.
+const PLACES_PAGE_SIZE = 20;
+// Number of the latest places request; older answers are ignored.
+let placesRequest = 0;
 
 /*
 Handles DOMContentLoaded event and sets up event listeners 
@@ -22,17 +25,10 @@ document.addEventListener('DOMContentLoaded', () => {
             <option value="100">100</option>
             <option value="All">All</option>
         `;
-        // Handles price filter changes and updates displayed places accordingly.
+        // Handles price filter changes: the API filters the places by price.
         document.getElementById('price-filter').addEventListener('change', (event) => {
             const selectedPrice = event.target.value;
-            
-            let filteredPlaces;
-            if (selectedPrice === "All") {
-                filteredPlaces = allPlaces;
-            } else {
-                filteredPlaces = allPlaces.filter(place => Number(place.price) <= Number(selectedPrice));
-            }
-            displayPlaces(filteredPlaces);
+            fetchPlaces(getCookie('token'), selectedPrice === "All" ? null : selectedPrice);
         });
     }
     // Handles login form submission and calls loginUser.
@@ -117,8 +113,11 @@ function checkAuthentication() {
 }
 
 
-// Fetches all places from the API and displays them.
-async function fetchPlaces(token) {
+// Fetches one page of places from the API, up to maxPrice if given.
+// Without a cursor the list shows the first page; with the X-Next-Cursor
+// of the previous page the next page is added below it. The "Load more"
+// button fetches the next page when the user asks for it.
+async function fetchPlaces(token, maxPrice = null, cursor = null) {
     const headers = {
         'Content-Type': 'application/json'
     };
@@ -127,18 +126,44 @@ async function fetchPlaces(token) {
         headers['Authorization'] = `Bearer ${token}`;
     }
     
-    const response = await fetch('http://127.0.0.1:5000/api/v1/places/', {
+    const params = new URLSearchParams({ sort: 'price', limit: PLACES_PAGE_SIZE });
+    if (maxPrice !== null) {
+        params.set('max_price', maxPrice);
+    }
+    if (cursor) {
+        params.set('after', cursor);
+    }
+
+    const request = ++placesRequest;
+    const loadMore = document.getElementById('load-more');
+    if (loadMore) {
+        loadMore.disabled = true;
+    }
+    const response = await fetch(`http://127.0.0.1:5000/api/v1/places/?${params}`, {
         method: 'GET',
         headers: headers
     });
-    
+
     const result = await handleApiResponse(response);
-    
+    if (request !== placesRequest) {
+        // The filter changed meanwhile: its own request fills the list
+        return;
+    }
+
     if (result.error) {
         alert('Failed to fetch places: ' + result.error);
-    } else {
-        allPlaces = result.places || result;
-        displayPlaces(result.places || result);
+        if (loadMore) {
+            loadMore.disabled = false;
+        }
+        return;
+    }
+    displayPlaces(result.places || result, cursor !== null);
+
+    const nextCursor = response.headers.get('X-Next-Cursor');
+    if (loadMore) {
+        loadMore.disabled = false;
+        loadMore.style.display = nextCursor ? 'block' : 'none';
+        loadMore.onclick = () => fetchPlaces(token, maxPrice, nextCursor);
     }
 }
 
@@ -198,13 +223,16 @@ function handleReviewResponse(result, reviewForm) {
 }
 
 
-// Displays the list of places on the page.
-function displayPlaces(places) {
+// Displays the list of places on the page, after the ones already shown
+// if append is true.
+function displayPlaces(places, append = false) {
     const placesList = document.getElementById('places-list');
     if (!placesList) {
         return;
     }
-    placesList.innerHTML = '';
+    if (!append) {
+        placesList.innerHTML = '';
+    }
     places.forEach(place => {
         const placeDiv = document.createElement('div');
         placeDiv.className = 'place-card';